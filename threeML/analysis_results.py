@@ -7,9 +7,8 @@ from builtins import object
 from past.utils import old_div
 import collections
 import datetime
-import functools
-import inspect
 import math
+import os
 
 import astromodels
 import astropy.units as u
@@ -35,6 +34,18 @@ else:
 
     has_chainconsumer = True
 
+try:
+
+    import h5py
+
+except ImportError:
+
+    has_h5py = False
+
+else:
+
+    has_h5py = True
+
 from threeML.exceptions.custom_exceptions import custom_warnings
 from threeML.io.file_utils import sanitize_filename
 from threeML.io.fits_file import fits, FITSFile, FITSExtension
@@ -43,7 +54,8 @@ from threeML.io.table import NumericMatrix
 from threeML.io.uncertainty_formatter import uncertainty_formatter
 from threeML.io.results_table import ResultsTable
 from threeML import __version__
-from threeML.random_variates import RandomVariates
+from threeML.random_variates import RandomVariates, summarize_samples
+from threeML.utils.propagation import propagate_on_samples
 from threeML.io.calculate_flux import _calculate_point_source_flux
 from threeML.config.config import threeML_config
 
@@ -57,6 +69,10 @@ _subs = (
     ("}", "_PARC_"),
 )
 
+# The maximum number of fitted point sources (computed for fluxes and plots) which are kept in the cache of
+# each analysis results
+_FITTED_POINT_SOURCES_CACHE_SIZE = 32
+
 
 def _escape_yaml_for_fits(yaml_code):
     for sub in _subs:
@@ -74,12 +90,20 @@ def _escape_back_yaml_from_fits(yaml_code):
 
 def load_analysis_results(fits_file):
     """
-    Load the results of one or more analysis from a FITS file produced by 3ML
+    Load the results of one or more analysis from a FITS (or HDF5) file produced by 3ML
+
+    The samples in HDF5 files are not read until they are used, one parameter (or range of samples) at a time
+    when possible. The file is opened again each time samples are read, so it must not be removed or modified as
+    long as the results are in use.
 
     :param fits_file: path to the FITS file containing the results, as output by MLEResults or BayesianResults
     :return: a new instance of either MLEResults or Bayesian results dending on the type of the input FITS file
     """
 
+    if has_h5py and h5py.is_hdf5(sanitize_filename(fits_file)):
+
+        return _load_hdf5_results(fits_file)
+
     with fits.open(fits_file) as f:
 
         n_results = [x.name for x in f].count("ANALYSIS_RESULTS")
@@ -148,6 +172,29 @@ def _load_one_results(fits_extension):
         # Gather samples
         samples = fits_extension.data.field("SAMPLES")
 
+        # Gather the convergence diagnostics (if any)
+
+        convergence_diagnostics = None
+
+        diagnostics = collections.OrderedDict()
+
+        i = 0
+
+        while "DN%i" % i in fits_extension.header:
+
+            diagnostics[fits_extension.header.get("DN%i" % i)] = np.array(
+                fits_extension.data.field("DIAG%i" % i),
+                np.dtype(fits_extension.header.get("DT%i" % i)),
+            )
+
+            i += 1
+
+        if diagnostics:
+
+            convergence_diagnostics = pd.DataFrame(
+                diagnostics, index=list(fits_extension.data.field("NAME"))
+            )
+
         # Instance and return
 
         return BayesianResults(
@@ -155,6 +202,7 @@ def _load_one_results(fits_extension):
             samples.T,
             statistic_values,
             statistical_measures=measure_values,
+            convergence_diagnostics=convergence_diagnostics,
         )
 
 
@@ -195,6 +243,346 @@ def _load_set_of_results(open_fits_file, n_results):
     return this_set
 
 
+# File extensions which select the HDF5 format when writing results
+
+_HDF5_EXTENSIONS = (".h5", ".hdf5")
+
+
+def _has_hdf5_extension(filename):
+
+    return os.path.splitext(filename)[1].lower() in _HDF5_EXTENSIONS
+
+
+class _LazySamples(object):
+    """
+    A read-only, array-like view of the samples stored in an HDF5 dataset (one row per parameter). Rows, slices
+    and ranges of samples are read from the file only when they are accessed, while numpy functions receive the
+    full array. The file is opened only for the time needed to read the samples.
+
+    :param filename: the HDF5 file
+    :param name: the name of the dataset in the file
+    :param shape: the shape of the dataset
+    :param transposed: whether this is a view of the transposed samples
+    """
+
+    def __init__(self, filename, name, shape, transposed=False):
+
+        self._filename = filename
+        self._name = name
+        self._dataset_shape = tuple(shape)
+        self._transposed = transposed
+
+    @property
+    def shape(self):
+
+        if self._transposed:
+
+            return self._dataset_shape[::-1]
+
+        return self._dataset_shape
+
+    @property
+    def ndim(self):
+
+        return len(self._dataset_shape)
+
+    @property
+    def T(self):
+
+        return _LazySamples(
+            self._filename, self._name, self._dataset_shape, not self._transposed
+        )
+
+    def __len__(self):
+
+        return self.shape[0]
+
+    def _read(self, item):
+
+        with h5py.File(self._filename, "r") as f:
+
+            dataset = f[self._name]
+
+            try:
+
+                return dataset[item]
+
+            except (TypeError, ValueError):
+
+                # h5py supports only some kinds of fancy indexing
+
+                return dataset[()][item]
+
+    def __getitem__(self, item):
+
+        if not isinstance(item, tuple):
+
+            item = (item,)
+
+        assert len(item) <= 2, "The samples have only two dimensions"
+
+        item = item + (slice(None),) * (2 - len(item))
+
+        if not self._transposed:
+
+            return self._read(item)
+
+        # read only the requested part of the stored samples, and transpose it
+
+        return np.transpose(self._read(item[::-1]))
+
+    def __array__(self, dtype=None):
+
+        samples = self._read(())
+
+        if self._transposed:
+
+            samples = samples.T
+
+        return samples if dtype is None else samples.astype(dtype)
+
+
+def _write_hdf5_results(
+    filename, analysis_results, overwrite, sequence_name=None, sequence_tuple=None
+):
+    """
+    Write one or more results to an HDF5 file, with one group per results. The samples are stored with one
+    compressed chunk per parameter, so that they can be read back one parameter at a time.
+
+    :param filename: name for the output file
+    :param analysis_results: list of results
+    :param overwrite: True or False
+    :param sequence_name: name of the sequence, for a set of results
+    :param sequence_tuple: the data tuple characterizing the sequence, for a set of results
+    :return: None
+    """
+
+    assert has_h5py, "You need to install h5py to write results in HDF5 format"
+
+    filename = sanitize_filename(filename)
+
+    if os.path.exists(filename) and not overwrite:
+
+        raise IOError(
+            "File %s already exists. Use overwrite=True to overwrite it" % filename
+        )
+
+    with h5py.File(filename, "w") as f:
+
+        f.attrs["ORIGIN"] = "3ML"
+        f.attrs["VERSION"] = __version__
+        f.attrs["DATE"] = datetime.datetime.now().isoformat()
+        f.attrs["N_RESULTS"] = len(analysis_results)
+
+        for i, this_results in enumerate(analysis_results):
+
+            _write_one_hdf5_results(
+                f.create_group("ANALYSIS_RESULTS_%i" % i), this_results
+            )
+
+        if sequence_name is not None:
+
+            group = f.create_group("SEQUENCE")
+
+            group.attrs["SEQ_TYPE"] = sequence_name
+            group.attrs["COLUMNS"] = np.array([x[0] for x in sequence_tuple], "S")
+
+            for column_name, values in sequence_tuple:
+
+                data = np.array(getattr(values, "value", values))
+
+                if data.dtype.kind == "U":
+
+                    data = data.astype("S")
+
+                dataset = group.create_dataset(column_name, data=data)
+
+                if isinstance(values, u.Quantity):
+
+                    dataset.attrs["UNIT"] = values.unit.to_string()
+
+
+def _write_one_hdf5_results(group, this_results):
+    """
+    Write one results in a group of an HDF5 file
+
+    :param group: the h5py group
+    :param this_results: the results
+    :return: None
+    """
+
+    group.attrs["RESUTYPE"] = this_results.analysis_type
+    group.attrs["MODEL"] = my_yaml.dump(
+        this_results.optimized_model.to_dict_with_types()
+    )
+
+    parameter_names = list(this_results.optimized_model.free_parameters.keys())
+
+    group.create_dataset("FREE_PARAMETERS", data=np.array(parameter_names, "S"))
+
+    for name, series in (
+        ("STATISTIC", this_results.optimal_statistic_values),
+        ("MEASURE", this_results.statistical_measures),
+    ):
+
+        names = np.array([str(x) for x in series.index], "S")
+
+        group.create_dataset("%s_NAMES" % name, data=names)
+        group.create_dataset("%s_VALUES" % name, data=np.array(series, float))
+
+    if this_results.analysis_type == "MLE":
+
+        group.create_dataset("COVARIANCE", data=this_results.covariance_matrix)
+
+    else:
+
+        # write one parameter at a time, so that lazily-loaded samples are never
+        # read all at once
+
+        samples = this_results._samples_transposed
+
+        n_parameters, n_samples = samples.shape
+
+        dataset = group.create_dataset(
+            "SAMPLES",
+            shape=(n_parameters, n_samples),
+            dtype=float,
+            chunks=(1, max(min(n_samples, 65536), 1)),
+            compression="gzip",
+            shuffle=True,
+        )
+
+        for j in range(n_parameters):
+
+            dataset[j] = samples[j]
+
+        if this_results.convergence_diagnostics is not None:
+
+            diagnostics = this_results.convergence_diagnostics
+
+            diagnostics_group = group.create_group("CONVERGENCE_DIAGNOSTICS")
+
+            diagnostics_group.attrs["COLUMNS"] = np.array(
+                [str(x) for x in diagnostics.columns], "S"
+            )
+
+            for column_name in diagnostics.columns:
+
+                diagnostics_group.create_dataset(
+                    str(column_name), data=diagnostics[column_name].values
+                )
+
+
+def _load_hdf5_results(filename):
+    """
+    Load the results of one or more analysis from an HDF5 file produced by 3ML. The samples are read lazily.
+
+    :param filename: path to the HDF5 file
+    :return: a new instance of either MLEResults or Bayesian results, or an AnalysisResultsSet
+    """
+
+    assert has_h5py, "You need to install h5py to read results in HDF5 format"
+
+    # the absolute path, since the samples are read from the file later on
+
+    filename = sanitize_filename(filename, abspath=True)
+
+    with h5py.File(filename, "r") as f:
+
+        all_results = [
+            _load_one_hdf5_results(f["ANALYSIS_RESULTS_%i" % i], filename)
+            for i in range(int(f.attrs["N_RESULTS"]))
+        ]
+
+        if "SEQUENCE" not in f:
+
+            return all_results[0]
+
+        this_set = AnalysisResultsSet(all_results)
+
+        group = f["SEQUENCE"]
+
+        data_list = []
+
+        for column_name in group.attrs["COLUMNS"]:
+
+            column_name = column_name.decode()
+
+            values = group[column_name][()]
+
+            if values.dtype.kind == "S":
+
+                values = values.astype("U")
+
+            if "UNIT" in group[column_name].attrs:
+
+                values = values * u.Unit(group[column_name].attrs["UNIT"])
+
+            data_list.append((column_name, values))
+
+        seq_type = str(group.attrs["SEQ_TYPE"])
+
+    this_set.characterize_sequence(seq_type, tuple(data_list))
+
+    return this_set
+
+
+def _load_one_hdf5_results(group, filename):
+
+    analysis_type = str(group.attrs["RESUTYPE"])
+
+    model_dict = my_yaml.load(str(group.attrs["MODEL"]))
+
+    optimized_model = ModelParser(model_dict=model_dict).get_model()
+
+    statistic_values, measure_values = [
+        collections.OrderedDict(
+            (key.decode(), float(value))
+            for key, value in zip(
+                group["%s_NAMES" % name][()], group["%s_VALUES" % name][()]
+            )
+        )
+        for name in ("STATISTIC", "MEASURE")
+    ]
+
+    if analysis_type == "MLE":
+
+        return MLEResults(
+            optimized_model,
+            group["COVARIANCE"][()],
+            statistic_values,
+            statistical_measures=measure_values,
+        )
+
+    else:
+
+        # the samples are stored with one row per parameter, as _samples_transposed
+
+        samples = _LazySamples(filename, group["SAMPLES"].name, group["SAMPLES"].shape)
+
+        convergence_diagnostics = None
+
+        if "CONVERGENCE_DIAGNOSTICS" in group:
+
+            diagnostics_group = group["CONVERGENCE_DIAGNOSTICS"]
+
+            convergence_diagnostics = pd.DataFrame(
+                collections.OrderedDict(
+                    (column_name.decode(), diagnostics_group[column_name.decode()][()])
+                    for column_name in diagnostics_group.attrs["COLUMNS"]
+                ),
+                index=[x.decode() for x in group["FREE_PARAMETERS"][()]],
+            )
+
+        return BayesianResults(
+            optimized_model,
+            samples.T,
+            statistic_values,
+            statistical_measures=measure_values,
+            convergence_diagnostics=convergence_diagnostics,
+        )
+
+
 class SEQUENCE(FITSExtension):
     """
     Represents the SEQUENCE extension of a FITS file containing a set of results from a set of analysis
@@ -273,7 +661,7 @@ class ANALYSIS_RESULTS(FITSExtension):
             covariance_matrix = np.zeros(n_parameters)
 
             # Gather the samples
-            samples = analysis_results._samples_transposed
+            samples = np.asarray(analysis_results._samples_transposed)
 
         # Serialize the model so it can be placed in the header
 
@@ -299,10 +687,41 @@ class ANALYSIS_RESULTS(FITSExtension):
             ("SAMPLES", samples),
         ]
 
+        # Add the convergence diagnostics of the sampler (if any), one column per diagnostic. They are
+        # stored as floating point numbers, and their names and types are kept in the header
+
+        convergence_diagnostics = getattr(
+            analysis_results, "convergence_diagnostics", None
+        )
+
+        if convergence_diagnostics is not None:
+
+            for i, column_name in enumerate(convergence_diagnostics.columns):
+
+                data_tuple.append(
+                    (
+                        "DIAG%i" % i,
+                        np.array(convergence_diagnostics[column_name].values, float),
+                    )
+                )
+
         # Init FITS extension
 
         super(ANALYSIS_RESULTS, self).__init__(data_tuple, self._HEADER_KEYWORDS)
 
+        if convergence_diagnostics is not None:
+
+            for i, column_name in enumerate(convergence_diagnostics.columns):
+
+                self.hdu.header.set(
+                    "DN%i" % i, str(column_name), comment="Name of diagnostic %i" % i
+                )
+                self.hdu.header.set(
+                    "DT%i" % i,
+                    convergence_diagnostics[column_name].dtype.str,
+                    comment="Type of diagnostic %i" % i,
+                )
+
         # Update keywords with their values for this instance
         self.hdu.header.set("MODEL", yaml_model_serialization)
         self.hdu.header.set("RESUTYPE", analysis_results.analysis_type)
@@ -437,6 +856,12 @@ class _AnalysisResults(object):
         # Set the analysis type
         self._analysis_type = analysis_type
 
+        # Cache of the fitted point sources computed for fluxes and plots, which are costly
+        # to compute (see threeML.io.calculate_flux). The least recently used are dropped first.
+        # The cache is emptied if the samples or the optimized model are replaced
+        self._fitted_point_sources_cache = collections.OrderedDict()
+        self._fitted_point_sources_cache_state = None
+
     @property
     def samples(self):
         """
@@ -452,15 +877,77 @@ class _AnalysisResults(object):
 
         return self._analysis_type
 
+    def clear_fitted_point_sources_cache(self):
+        """
+        Remove the fitted point sources cached by the flux calculations and the plots of these results, so
+        that they are computed again the next time they are needed
+
+        :return: none
+        """
+
+        self._fitted_point_sources_cache.clear()
+
+    def _check_fitted_point_sources_cache(self):
+
+        # the cached fitted point sources are valid only for these samples and optimized model
+
+        state = self._fitted_point_sources_cache_state
+
+        if (
+            state is None
+            or state[0] is not self._samples_transposed
+            or state[1] is not self._optimized_model
+        ):
+
+            self._fitted_point_sources_cache.clear()
+
+            self._fitted_point_sources_cache_state = (
+                self._samples_transposed,
+                self._optimized_model,
+            )
+
+    def _get_cached_fitted_point_source(self, key):
+        """
+        Return the cached fitted point source with the given key (see threeML.io.calculate_flux), or None
+        """
+
+        self._check_fitted_point_sources_cache()
+
+        fitted_point_source = self._fitted_point_sources_cache.pop(key, None)
+
+        if fitted_point_source is not None:
+
+            # move it to the end, with the most recently used ones
+
+            self._fitted_point_sources_cache[key] = fitted_point_source
+
+        return fitted_point_source
+
+    def _cache_fitted_point_source(self, key, fitted_point_source):
+
+        self._check_fitted_point_sources_cache()
+
+        self._fitted_point_sources_cache[key] = fitted_point_source
+
+        while len(self._fitted_point_sources_cache) > _FITTED_POINT_SOURCES_CACHE_SIZE:
+
+            self._fitted_point_sources_cache.popitem(last=False)
+
     def write_to(self, filename, overwrite=False):
         """
-        Write results to a FITS file
+        Write results to a FITS file, or to an HDF5 file if the name ends with .h5 or .hdf5
 
         :param filename:
         :param overwrite:
         :return: None
         """
 
+        if _has_hdf5_extension(filename):
+
+            _write_hdf5_results(filename, [self], overwrite)
+
+            return
+
         fits_file = AnalysisResultsFITS(self)
 
         fits_file.writeto(sanitize_filename(filename), overwrite=overwrite)
@@ -513,26 +1000,16 @@ class _AnalysisResults(object):
         :return: a new function, wrapping function, which can be used to propagate errors
         """
 
-        # Get calling sequence of input function
-        # arguments will be a list of names, like ['a','b']
-        arguments, _, _, _ = inspect.getargspec(function)
+        # The function is evaluated on all the samples at once if it can be broadcast, otherwise once per
+        # sample (see propagate_on_samples). Arguments which are not specified in kwargs are passed as they are
 
-        # Get the arguments of function which have not been specified
-        # in the calling sequence (the **kwargs dictionary)
-        # (they will be excluded from the vectorization)
-        to_be_excluded = [item for item in arguments if item not in list(kwargs.keys())]
+        def wrapper(*args, **other_kwargs):
 
-        # Vectorize the function
-        vectorized = np.vectorize(function, excluded=to_be_excluded)
-
-        # Make a wrapper so we are sure that the arguments are used in the
-        # right order, as they will be taken from the kwargs
-        wrapper = functools.partial(vectorized, **kwargs)
-
-        # Finally make so that the result is always a RandomVariate
-        wrapper2 = lambda *args, **kwargs: RandomVariates(wrapper(*args, **kwargs))
+            return RandomVariates(
+                propagate_on_samples(function, kwargs, *args, **other_kwargs)
+            )
 
-        return wrapper2
+        return wrapper
 
     @property
     def optimized_model(self):
@@ -642,13 +1119,15 @@ class _AnalysisResults(object):
 
     def _get_results_table(self, error_type, cl, covariance=None):
 
-        if error_type == "equal tail":
+        if error_type in ("equal tail", "hpd"):
 
-            errors_gatherer = RandomVariates.equal_tail_interval
+            # compute the intervals for all parameters at once
 
-        elif error_type == "hpd":
+            _, equal_tail_bounds, hpd_bounds = summarize_samples(
+                self._samples_transposed, cl
+            )
 
-            errors_gatherer = RandomVariates.highest_posterior_density_interval
+            bounds = equal_tail_bounds if error_type == "equal tail" else hpd_bounds
 
         elif error_type == "covariance":
 
@@ -656,7 +1135,7 @@ class _AnalysisResults(object):
                 covariance is not None
             ), "If you use error_type='covariance' you have to provide a cov. matrix"
 
-            errors_gatherer = None
+            bounds = None
 
         else:
 
@@ -675,19 +1154,15 @@ class _AnalysisResults(object):
 
             parameter_paths.append(this_par.path)
 
-            this_phys_q = self.get_variates(parameter_paths[-1])
-
-            values.append(this_phys_q.value)
+            values.append(float(self._values[i]))
 
             units_dict.append(this_par.unit)
 
             if error_type != "covariance":
 
-                low_bound, hi_bound = errors_gatherer(this_phys_q, cl)
-
-                negative_errors.append(low_bound - values[-1])
+                negative_errors.append(bounds[0][i] - values[-1])
 
-                positive_errors.append(hi_bound - values[-1])
+                positive_errors.append(bounds[1][i] - values[-1])
 
             else:
 
@@ -855,16 +1330,36 @@ class BayesianResults(_AnalysisResults):
     :type samples: np.ndarray
     :param posterior_values: a dictionary containing the posterior values for the different datasets at the HPD
     :type posterior_values: dict
+    :param convergence_diagnostics: (optional) a pandas DataFrame with the convergence diagnostics of the sampler
+    :type convergence_diagnostics: pd.DataFrame
     """
 
     def __init__(
-        self, optimized_model, samples, posterior_values, statistical_measures
+        self,
+        optimized_model,
+        samples,
+        posterior_values,
+        statistical_measures,
+        convergence_diagnostics=None,
     ):
 
         super(BayesianResults, self).__init__(
             optimized_model, samples, posterior_values, "Bayesian", statistical_measures
         )
 
+        self._convergence_diagnostics = convergence_diagnostics
+
+    @property
+    def convergence_diagnostics(self):
+        """
+        The convergence diagnostics of the sampler (for example the autocorrelation time of each parameter for MCMC
+        samplers), or None if not available
+
+        :return: a pandas DataFrame or None
+        """
+
+        return self._convergence_diagnostics
+
     def get_correlation_matrix(self):
         """
         Estimate the covariance matrix from the samples
@@ -909,6 +1404,12 @@ class BayesianResults(_AnalysisResults):
 
         display(self.get_statistic_measure_frame())
 
+        if self._convergence_diagnostics is not None:
+
+            print("\nConvergence diagnostics:\n")
+
+            display(self._convergence_diagnostics)
+
     def corner_plot(self, renamed_parameters=None, **kwargs):
         """
         Produce the corner plot showing the marginal distributions in one and two directions.
@@ -1667,7 +2168,7 @@ class AnalysisResultsSet(collections.Sequence):
 
     def write_to(self, filename, overwrite=False):
         """
-        Write this set of results to a FITS file.
+        Write this set of results to a FITS file, or to an HDF5 file if the name ends with .h5 or .hdf5
 
         :param filename: name for the output file
         :param overwrite: True or False
@@ -1682,6 +2183,18 @@ class AnalysisResultsSet(collections.Sequence):
 
             self.characterize_sequence("unspecified", frame_tuple)
 
+        if _has_hdf5_extension(filename):
+
+            _write_hdf5_results(
+                filename,
+                list(self),
+                overwrite,
+                sequence_name=self._sequence_name,
+                sequence_tuple=self._sequence_tuple,
+            )
+
+            return
+
         fits = AnalysisResultsFITS(
             *self,
             sequence_tuple=self._sequence_tuple,
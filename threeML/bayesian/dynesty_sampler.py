@@ -81,8 +81,17 @@ class DynestyNestedSampler(UnitCubeSampler):
         fmove=0.9,
         max_move=100,
         update_func=None,
+        checkpoint=None,
+        resume=False,
         **kwargs
     ):
+        """
+        Setup the dynesty nested sampler. The arguments are passed to dynesty.NestedSampler and to its
+        run_nested() method. Checkpoints are not supported: dynesty pickles the likelihood into them, and the
+        likelihood used here cannot be pickled
+        """
+
+        self._setup_checkpoint(checkpoint, resume)
 
         self._sampler_kwargs = {}
         self._sampler_kwargs["maxiter"] = maxiter
@@ -304,8 +313,17 @@ class DynestyDynamicSampler(UnitCubeSampler):
         fmove=0.9,
         max_move=100,
         update_func=None,
+        checkpoint=None,
+        resume=False,
         **kwargs
     ):
+        """
+        Setup the dynesty dynamic nested sampler. The arguments are passed to dynesty.DynamicNestedSampler and
+        to its run_nested() method. Checkpoints are not supported: dynesty pickles the likelihood into them, and
+        the likelihood used here cannot be pickled
+        """
+
+        self._setup_checkpoint(checkpoint, resume)
 
         self._sampler_kwargs = {}
         self._sampler_kwargs["nlive_init"] = nlive_init
@@ -2,12 +2,16 @@ import emcee
 import numpy as np
 
 from threeML.bayesian.sampler_base import MCMCSampler
-from threeML.config.config import threeML_config
-from threeML.parallel.parallel_client import ParallelClient
+from threeML.exceptions.custom_exceptions import custom_warnings
 from astromodels import ModelAssertionViolation, use_astromodels_memoization
 
 
 class EmceeSampler(MCMCSampler):
+
+    _supports_checkpoint = True
+
+    _stores_pointwise_log_likes = True
+
     def __init__(self, likelihood_model=None, data_list=None, **kwargs):
         """
         Sample using the emcee sampler. For details:
@@ -22,7 +26,40 @@ class EmceeSampler(MCMCSampler):
 
         super(EmceeSampler, self).__init__(likelihood_model, data_list, **kwargs)
 
-    def setup(self, n_iterations, n_burn_in=None, n_walkers=20, seed=None):
+    def setup(
+        self,
+        n_iterations,
+        n_burn_in=None,
+        n_walkers=20,
+        seed=None,
+        checkpoint=None,
+        resume=False,
+        target_effective_samples=None,
+        check_interval=100,
+        pool=None,
+        n_workers=None,
+    ):
+        """
+        Setup the emcee sampler
+
+        :param n_iterations: number of iterations (after the burn in). In the adaptive mode, the maximum number of
+        iterations (including the burn in)
+        :param n_burn_in: number of iterations of burn in (default: n_iterations / 4). Ignored in the adaptive mode
+        :param n_walkers: number of walkers
+        :param seed: seed for the random number generator
+        :param checkpoint: an HDF5 file where the chains are written at each step (using the HDF backend of emcee)
+        :param resume: continue the burn in and the sampling from the last step saved in the checkpoint
+        :param target_effective_samples: if provided, use the adaptive mode: the burn in is set from the
+        autocorrelation time of the chains, and the sampling stops as soon as this number of effective samples is reached
+        :param check_interval: number of iterations between two estimates of the autocorrelation time in the adaptive mode
+        :param pool: how to parallelize the evaluation of the posterior: "serial", "multiprocessing" (local
+        processes), "mpi" or "ipyparallel". If None, use ipyparallel if the parallel computation is active, MPI if
+        running under MPI, serial otherwise
+        :param n_workers: number of workers for multiprocessing and MPI pools (default: all the available CPUs)
+        :returns:
+        :rtype:
+
+        """
 
         self._n_iterations = int(n_iterations)
 
@@ -38,6 +75,12 @@ class EmceeSampler(MCMCSampler):
 
         self._seed = seed
 
+        self._setup_checkpoint(checkpoint, resume)
+
+        self._setup_convergence(target_effective_samples, check_interval)
+
+        self._setup_pool(pool, n_workers)
+
         self._is_setup = True
 
     def sample(self, quiet=False):
@@ -55,65 +98,101 @@ class EmceeSampler(MCMCSampler):
         p0 = emcee.State(self._get_starting_points(self._n_walkers))
 
         # Deactivate memoization in astromodels, which is useless in this case since we will never use twice the
-        # same set of parameters
-        with use_astromodels_memoization(False):
+        # same set of parameters. The log-likelihood of each dataset (and of each data point, if available) is
+        # stored as blobs, to compute the statistical measures afterwards
 
-            if threeML_config["parallel"]["use-parallel"]:
+        self._setup_pointwise_log_likes()
 
-                c = ParallelClient()
-                view = c[:]
+        log_prob_fn = self._get_posterior_and_log_likes
 
-                sampler = emcee.EnsembleSampler(
-                    self._n_walkers, n_dim, self.get_posterior, pool=view
+        with use_astromodels_memoization(False), self._get_pool(log_prob_fn) as pool:
+
+            if pool.kind != "serial":
+
+                sampler_kwargs = {"pool": pool}
+
+            else:
+
+                sampler_kwargs = {}
+
+            if self._checkpoint is not None:
+
+                sampler, burn_in = self._sample_with_checkpoint(
+                    n_dim, p0, loud, sampler_kwargs
                 )
 
             else:
 
                 sampler = emcee.EnsembleSampler(
-                    self._n_walkers, n_dim, self.get_posterior
+                    self._n_walkers, n_dim, log_prob_fn, **sampler_kwargs
                 )
 
-            # If a seed is provided, set the random number seed
-            if self._seed is not None:
+                # If a seed is provided, set the random number seed
+                if self._seed is not None:
 
-                sampler._random.seed(self._seed)
+                    sampler._random.seed(self._seed)
 
-            # Sample the burn-in
-            pos, prob, state = sampler.run_mcmc(
-                initial_state=p0, nsteps=self._n_burn_in, progress=loud
-            )
+                if self._target_effective_samples is not None:
 
-            # Reset sampler
+                    burn_in = self._sample_until_converged(sampler, p0, loud)
 
-            sampler.reset()
+                else:
 
-            state = emcee.State(pos, prob, random_state=state)
+                    # Sample the burn-in (the final state includes the blobs)
+                    state = sampler.run_mcmc(
+                        initial_state=p0, nsteps=self._n_burn_in, progress=loud
+                    )
 
-            # Run the true sampling
+                    # Reset sampler
 
-            _ = sampler.run_mcmc(
-                initial_state=state, nsteps=self._n_iterations, progress=loud
-            )
+                    sampler.reset()
+
+                    # Run the true sampling
+
+                    _ = sampler.run_mcmc(
+                        initial_state=state, nsteps=self._n_iterations, progress=loud
+                    )
+
+                    burn_in = 0
 
         acc = np.mean(sampler.acceptance_fraction)
 
         print("\nMean acceptance fraction: %s\n" % acc)
 
         self._sampler = sampler
-        self._raw_samples = sampler.get_chain(flat=True)
+        self._raw_samples = sampler.get_chain(flat=True, discard=burn_in)
+
+        # in the adaptive mode the burn in is still in the chains, otherwise it has been run separately
+
+        self._store_convergence_diagnostics(
+            sampler.get_chain(discard=burn_in),
+            burn_in if self._target_effective_samples is not None else self._n_burn_in,
+        )
+
+        # The log-likelihood values are the sum of those of the datasets, stored as blobs followed by
+        # those of the data points (if available)
+
+        blobs = sampler.get_blobs(flat=True, discard=burn_in)
+
+        blobs = blobs.reshape(self._raw_samples.shape[0], -1)
+
+        n_datasets = len(list(self._data_list.values()))
+
+        self._log_like_per_dataset = blobs[:, :n_datasets]
 
-        # Compute the corresponding values of the likelihood
+        if self._n_pointwise_log_likes is not None:
 
-        # First we need the prior
-        log_prior = [self._log_prior(x) for x in self._raw_samples]
+            self._pointwise_log_likes = blobs[:, n_datasets:]
 
-        # Now we get the log posterior and we remove the log prior
+        else:
+
+            self._pointwise_log_likes = None
 
-        self._log_like_values = sampler.get_log_prob(flat=True) - log_prior
+        self._log_like_values = np.sum(self._log_like_per_dataset, axis=1)
 
         # we also want to store the log probability
 
-        self._log_probability_values = sampler.get_log_prob(flat=True)
+        self._log_probability_values = sampler.get_log_prob(flat=True, discard=burn_in)
 
         self._marginal_likelihood = None
 
@@ -126,3 +205,97 @@ class EmceeSampler(MCMCSampler):
             self._results.display()
 
         return self.samples
+
+    def _sample_with_checkpoint(self, n_dim, p0, loud, sampler_kwargs):
+        """
+        Run the burn in and the sampling storing the chains in the checkpoint file, in two different groups
+        (only one in the adaptive mode, where the burn in is discarded at the end). Both phases restart from
+        the last saved step when resuming.
+
+        :return: the emcee sampler used for the sampling (after the burn in), and the number of steps to discard
+        """
+
+        state = p0
+
+        burn_in = 0
+
+        if self._target_effective_samples is not None:
+
+            phases = (("samples", None),)
+
+        else:
+
+            phases = (("burn_in", self._n_burn_in), ("samples", self._n_iterations))
+
+        for name, n_steps in phases:
+
+            backend = emcee.backends.HDFBackend(self._checkpoint, name=name)
+
+            if not self._resume or not backend.initialized:
+
+                backend.reset(self._n_walkers, n_dim)
+
+            sampler = emcee.EnsembleSampler(
+                self._n_walkers,
+                n_dim,
+                self._get_posterior_and_log_likes,
+                backend=backend,
+                **sampler_kwargs
+            )
+
+            n_done = backend.iteration
+
+            if n_done > 0:
+
+                # the saved state includes the state of the random number generator
+
+                state = backend.get_last_sample()
+
+            elif self._seed is not None and name == phases[0][0]:
+
+                sampler._random.seed(self._seed)
+
+            if n_steps is None:
+
+                burn_in = self._sample_until_converged(sampler, state, loud)
+
+            elif n_steps > n_done:
+
+                state = sampler.run_mcmc(
+                    initial_state=state, nsteps=n_steps - n_done, progress=loud
+                )
+
+        return sampler, burn_in
+
+    def _sample_until_converged(self, sampler, state, loud):
+        """
+        Run the sampler check_interval iterations at a time, until the chains have converged to the target number of
+        effective samples or the maximum number of iterations is reached
+
+        :return: the number of steps to discard as burn in
+        """
+
+        if sampler.iteration > 0:
+
+            converged, burn_in, _ = self._convergence_status(sampler.get_chain())
+
+        else:
+
+            converged, burn_in = False, 0
+
+        while not converged and sampler.iteration < self._n_iterations:
+
+            n_steps = min(self._check_interval, self._n_iterations - sampler.iteration)
+
+            state = sampler.run_mcmc(initial_state=state, nsteps=n_steps, progress=loud)
+
+            converged, burn_in, _ = self._convergence_status(sampler.get_chain())
+
+        if not converged:
+
+            custom_warnings.warn(
+                "The target of %d effective samples was not reached in %d iterations"
+                % (self._target_effective_samples, self._n_iterations)
+            )
+
+        return burn_in
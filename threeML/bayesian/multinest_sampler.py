@@ -42,6 +42,9 @@ except:
 
 
 class MultiNestSampler(UnitCubeSampler):
+
+    _supports_checkpoint = True
+
     def __init__(self, likelihood_model=None, data_list=None, **kwargs):
         """
         Implements the MultiNest sampler of https://github.com/farhanferoz/MultiNest
@@ -71,7 +74,8 @@ class MultiNestSampler(UnitCubeSampler):
         
 
         :param n_live_points: number of live points for the evaluation
-        :param chain_name: the chain name
+        :param chain_name: the chain name (MultiNest saves its state there while sampling)
+        :param resume: continue the run saved with the same chain name, if any
         :param importance_nested_sampling: use INS 
         :returns: 
         :rtype: 
@@ -85,6 +89,8 @@ class MultiNestSampler(UnitCubeSampler):
         self._kwargs["chain_name"] = chain_name
         self._kwargs["resume"] = resume
 
+        self._setup_checkpoint(chain_name, resume)
+
         for k, v in kwargs.items():
 
             self._kwargs[k] = v
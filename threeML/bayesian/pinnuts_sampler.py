@@ -36,7 +36,19 @@ class NUTSSampler(MCMCSampler):
 
         super(NUTSSampler, self).__init__(likelihood_model, data_list, **kwargs)
 
-    def setup(self, n_iterations, n_adapt=None, delta=0.6, seed=None):
+    def setup(
+        self,
+        n_iterations,
+        n_adapt=None,
+        delta=0.6,
+        seed=None,
+        checkpoint=None,
+        resume=False,
+    ):
+
+        # checkpoints are not supported
+
+        self._setup_checkpoint(checkpoint, resume)
 
         self._n_iterations = int(n_iterations)
 
@@ -2,6 +2,7 @@ import numpy as np
 import abc
 import collections
 import math
+import pandas as pd
 from future.utils import with_metaclass
 
 
@@ -26,12 +27,29 @@ except:
 
 
 from threeML.analysis_results import BayesianResults
-from threeML.utils.statistics.stats_tools import aic, bic, dic
+from threeML.utils.statistics.stats_tools import (
+    aic,
+    bic,
+    dic,
+    waic,
+    integrated_autocorrelation_time,
+)
 from threeML.exceptions.custom_exceptions import LikelihoodIsInfinite, custom_warnings
+from threeML.io.file_utils import sanitize_filename
+from threeML.parallel.pools import WorkerPool
 from astromodels.functions.function import ModelAssertionViolation
 
 
 class SamplerBase(with_metaclass(abc.ABCMeta, object)):
+
+    # whether the sampler can save its state while sampling and resume from it (see _setup_checkpoint)
+
+    _supports_checkpoint = False
+
+    # whether the sampler stores the log-likelihood of each data point while sampling, needed for the WAIC
+
+    _stores_pointwise_log_likes = False
+
     def __init__(self, likelihood_model, data_list, **kwargs):
         """
 
@@ -51,13 +69,17 @@ class SamplerBase(with_metaclass(abc.ABCMeta, object)):
         self._sampler = None
         self._log_like_values = None
         self._log_probability_values = None
+        self._log_like_per_dataset = None
+        self._pointwise_log_likes = None
+        self._n_pointwise_log_likes = None
         self._results = None
         self._is_setup = False
         self._is_registered = False
         self._likelihood_model = likelihood_model
         self._data_list = data_list
-        
-
+        self._checkpoint = None
+        self._resume = False
+        self._convergence_diagnostics = None
 
 
     @abc.abstractmethod
@@ -68,6 +90,40 @@ class SamplerBase(with_metaclass(abc.ABCMeta, object)):
     def sample(self):
         pass
 
+    def _setup_checkpoint(self, checkpoint, resume):
+        """
+        Store the checkpoint settings, which all samplers accept in their setup(). Samplers which cannot save
+        their state refuse a checkpoint
+
+        :param checkpoint: path of the file (or directory) where the sampler saves its state while sampling. If None,
+        everything is kept in memory until the end
+        :param resume: if True, continue sampling from the state saved in the checkpoint (if it exists)
+        :return: none
+        """
+
+        if checkpoint is not None and not self._supports_checkpoint:
+
+            raise RuntimeError(
+                "The %s cannot save checkpoints nor resume from them. Use emcee, UltraNest or MultiNest "
+                "to checkpoint the sampling" % type(self).__name__
+            )
+
+        assert (
+            checkpoint is not None or not resume
+        ), "You need to provide a checkpoint to resume from"
+
+        self._checkpoint = None if checkpoint is None else sanitize_filename(checkpoint)
+
+        self._resume = bool(resume)
+
+    @property
+    def checkpoint(self):
+        """
+        The file (or directory) where the state of the sampler is saved while sampling (None if not used)
+        """
+
+        return self._checkpoint
+
     @property
     def results(self):
 
@@ -118,6 +174,31 @@ class SamplerBase(with_metaclass(abc.ABCMeta, object)):
 
         return self._log_probability_values
 
+    @property
+    def log_like_per_dataset(self):
+        """
+        Returns the value of the log_likelihood of each dataset for each sample, if the sampler stored them while
+        sampling (currently only emcee). The samples are in the same order as in .raw_samples, and the datasets in
+        the same order as in the data list.
+
+        :return: an array with shape (n_samples, n_datasets), or None
+        """
+
+        return self._log_like_per_dataset
+
+    @property
+    def pointwise_log_likes(self):
+        """
+        Returns the value of the log_likelihood of each data point (e.g. each channel of a spectrum) for each sample,
+        if the sampler stored them while sampling (currently only emcee) and all the plugins can provide them (see
+        PluginPrototype.get_pointwise_log_like). The data points are in the same order as the datasets in the data
+        list. They are used for the WAIC.
+
+        :return: an array with shape (n_samples, n_data_points), or None
+        """
+
+        return self._pointwise_log_likes
+
     @property
     def log_marginal_likelihood(self):
         """
@@ -177,6 +258,18 @@ class SamplerBase(with_metaclass(abc.ABCMeta, object)):
 
         log_prior = self._log_prior(approximate_MAP_point)
 
+        # use the log-likelihood of the datasets stored while sampling, if available
+
+        if self._log_like_per_dataset is not None:
+
+            log_likes_at_MAP = self._log_like_per_dataset[idx]
+
+        else:
+
+            log_likes_at_MAP = [
+                dataset.get_log_like() for dataset in list(self._data_list.values())
+            ]
+
         # keep track of the total number of data points
         # and the total posterior
 
@@ -184,9 +277,9 @@ class SamplerBase(with_metaclass(abc.ABCMeta, object)):
 
         total_log_posterior = 0
 
-        for dataset in list(self._data_list.values()):
+        for dataset, log_like in zip(list(self._data_list.values()), log_likes_at_MAP):
 
-            log_posterior = dataset.get_log_like() + log_prior
+            log_posterior = log_like + log_prior
 
             log_posteriors[dataset.name] = log_posterior
 
@@ -214,12 +307,24 @@ class SamplerBase(with_metaclass(abc.ABCMeta, object)):
         statistical_measures["DIC"] = this_dic
         statistical_measures["PDIC"] = pdic
 
+        if self._pointwise_log_likes is not None:
+
+            this_waic, pwaic = waic(self._pointwise_log_likes)
+
+            statistical_measures["WAIC"] = this_waic
+            statistical_measures["PWAIC"] = pwaic
+
+        elif not self._stores_pointwise_log_likes:
+
+            custom_warnings.warn(
+                "The WAIC is not computed: the %s does not store the log-likelihood of each data point "
+                "while sampling (use emcee for the WAIC)" % type(self).__name__
+            )
+
         if self._marginal_likelihood is not None:
 
             statistical_measures["log(Z)"] = self._marginal_likelihood
 
-        # TODO: add WAIC
-
         # Instance the result
 
         self._results = BayesianResults(
@@ -227,6 +332,7 @@ class SamplerBase(with_metaclass(abc.ABCMeta, object)):
             self._raw_samples,
             log_posteriors,
             statistical_measures=statistical_measures,
+            convergence_diagnostics=self._convergence_diagnostics,
         )
 
     def _update_free_parameters(self):
@@ -240,6 +346,50 @@ class SamplerBase(with_metaclass(abc.ABCMeta, object)):
     def get_posterior(self, trial_values):
         """Compute the posterior for the normal sampler"""
 
+        log_posterior, _ = self._get_posterior_and_log_likes(trial_values)
+
+        return log_posterior
+
+    def _setup_pointwise_log_likes(self):
+        """
+        Check whether all the datasets can provide the log-likelihood of each of their data points, and how many
+        points there are, so that the samplers supporting it can store them for each sample (see
+        _get_posterior_and_log_likes). This costs one evaluation, at the current values of the parameters
+
+        :return: none
+        """
+
+        self._n_pointwise_log_likes = None
+
+        n_points = 0
+
+        for dataset in list(self._data_list.values()):
+
+            pointwise_log_like = dataset.get_pointwise_log_like()
+
+            if pointwise_log_like is None:
+
+                custom_warnings.warn(
+                    "The plugin %s cannot provide the log-likelihood of each data point: the WAIC will "
+                    "not be computed" % dataset.name
+                )
+
+                return
+
+            n_points += len(pointwise_log_like)
+
+        self._n_pointwise_log_likes = n_points
+
+    def _get_posterior_and_log_likes(self, trial_values):
+        """
+        Compute the posterior and the log-likelihood of each dataset, followed by the log-likelihood of each data
+        point if _setup_pointwise_log_likes found that they are available. The samplers supporting it (e.g. as
+        emcee blobs) store them for each sample
+
+        :param trial_values: the values of the free parameters
+        :return: (log posterior, array with the log-likelihoods)
+        """
+
         # Assign this trial values to the parameters and
         # store the corresponding values for the priors
 
@@ -250,30 +400,33 @@ class SamplerBase(with_metaclass(abc.ABCMeta, object)):
             "do not match the number of trial values."
         )
 
-        log_prior = 0
+        log_prior = self._log_prior(trial_values)
 
-        # with use_
+        if log_prior == -np.inf:
 
-        for i, (parameter_name, parameter) in enumerate(self._free_parameters.items()):
+            # Outside allowed region of parameter space
 
-            prior_value = parameter.prior(trial_values[i])
+            return -np.inf, np.full(self._get_number_of_log_likes(), -np.inf)
 
-            if prior_value == 0:
-                # Outside allowed region of parameter space
+        log_likes = self._log_like_of_datasets(trial_values)
 
-                return -np.inf
+        # print("Log like is %s, log_prior is %s, for trial values %s" % (log_like, log_prior,trial_values))
 
-            else:
+        n_datasets = len(list(self._data_list.values()))
 
-                parameter.value = trial_values[i]
+        return np.sum(log_likes[:n_datasets]) + log_prior, log_likes
 
-                log_prior += math.log10(prior_value)
+    def _get_number_of_log_likes(self):
 
-        log_like = self._log_like(trial_values)
+        # one for each dataset, plus one for each data point if they are stored
 
-        # print("Log like is %s, log_prior is %s, for trial values %s" % (log_like, log_prior,trial_values))
+        n_log_likes = len(list(self._data_list.values()))
+
+        if self._n_pointwise_log_likes is not None:
+
+            n_log_likes += self._n_pointwise_log_likes
 
-        return log_like + log_prior
+        return n_log_likes
 
     def _log_prior(self, trial_values):
         """Compute the sum of log-priors, used in the parallel tempering sampling"""
@@ -302,21 +455,49 @@ class SamplerBase(with_metaclass(abc.ABCMeta, object)):
     def _log_like(self, trial_values):
         """Compute the log-likelihood"""
 
+        n_datasets = len(list(self._data_list.values()))
+
+        return np.sum(self._log_like_of_datasets(trial_values)[:n_datasets])
+
+    def _log_like_of_datasets(self, trial_values):
+        """
+        Compute the log-likelihood of each dataset, followed by the log-likelihood of each data point if
+        _setup_pointwise_log_likes found that they are available (all -inf if any of them is not finite)
+        """
+
         # Get the value of the log-likelihood for this parameters
 
+        n_log_likes = self._get_number_of_log_likes()
+
         try:
 
             # Loop over each dataset and get the likelihood values for each set
 
-            log_like_values = [
-                dataset.get_log_like() for dataset in list(self._data_list.values())
-            ]
+            if self._n_pointwise_log_likes is None:
+
+                log_like_values = np.array(
+                    [dataset.get_log_like() for dataset in list(self._data_list.values())],
+                    dtype=float,
+                )
+
+            else:
+
+                # the log-likelihood of each dataset is the sum of those of its data points
+
+                pointwise_log_likes = [
+                    np.array(dataset.get_pointwise_log_like(), dtype=float)
+                    for dataset in list(self._data_list.values())
+                ]
+
+                log_like_values = np.concatenate(
+                    [[np.sum(x) for x in pointwise_log_likes]] + pointwise_log_likes
+                )
 
         except ModelAssertionViolation:
 
             # Fit engine or sampler outside of allowed zone
 
-            return -np.inf
+            return np.full(n_log_likes, -np.inf)
 
         except:
 
@@ -324,11 +505,7 @@ class SamplerBase(with_metaclass(abc.ABCMeta, object)):
 
             raise
 
-        # Sum the values of the log-like
-
-        log_like = np.sum(log_like_values)
-
-        if not np.isfinite(log_like):
+        if not np.all(np.isfinite(log_like_values)):
             # Issue warning
 
             custom_warnings.warn(
@@ -336,9 +513,19 @@ class SamplerBase(with_metaclass(abc.ABCMeta, object)):
                 LikelihoodIsInfinite,
             )
 
-            return -np.inf
+            return np.full(n_log_likes, -np.inf)
+
+        return log_like_values
+
+
+# Number of autocorrelation times discarded as burn in when the burn in is set automatically
+
+_BURN_IN_AUTOCORRELATION_TIMES = 2.0
 
-        return log_like
+# Minimum length of the chains (in autocorrelation times) for the estimate of the
+# autocorrelation time to be reliable
+
+_MIN_AUTOCORRELATION_TIMES = 50.0
 
 
 class MCMCSampler(SamplerBase):
@@ -346,6 +533,133 @@ class MCMCSampler(SamplerBase):
 
         super(MCMCSampler, self).__init__(likelihood_model, data_list, **kwargs)
 
+        self._target_effective_samples = None
+        self._check_interval = 100
+        self._pool_kind = None
+        self._n_workers = None
+
+    def _setup_pool(self, pool, n_workers):
+        """
+        Store the settings of the pool of workers used to evaluate the posterior
+
+        :param pool: "serial", "multiprocessing", "mpi" or "ipyparallel". If None, use ipyparallel if the parallel
+        computation is active, MPI if running under MPI, serial otherwise
+        :param n_workers: number of workers for multiprocessing and MPI pools (default: all the available CPUs)
+        :return: none
+        """
+
+        # check the settings now rather than when sampling
+
+        _ = WorkerPool(self.get_posterior, pool, n_workers)
+
+        self._pool_kind = pool
+        self._n_workers = n_workers
+
+    def _get_pool(self, function=None):
+        """
+        Build the pool of workers evaluating the posterior (to be used as a context manager). The workers get a copy
+        of the sampler (with the likelihood model and the data) once, when the pool starts
+
+        :param function: the function evaluated by the workers (default: get_posterior). It must be the same as the
+        one used by the sampler
+        :return: a WorkerPool instance
+        """
+
+        if function is None:
+
+            function = self.get_posterior
+
+        return WorkerPool(function, self._pool_kind, self._n_workers)
+
+    def _setup_convergence(self, target_effective_samples, check_interval):
+        """
+        Store the settings of the adaptive mode, in which the sampling stops as soon as the chains are long enough to
+        provide the requested number of effective samples
+
+        :param target_effective_samples: number of effective samples to reach (None: run a fixed number of iterations)
+        :param check_interval: number of iterations between two checks of the autocorrelation time
+        :return: none
+        """
+
+        if target_effective_samples is not None:
+
+            assert (
+                target_effective_samples > 0
+            ), "The target number of effective samples must be positive"
+
+            target_effective_samples = int(target_effective_samples)
+
+        assert check_interval > 0, "The check interval must be positive"
+
+        self._target_effective_samples = target_effective_samples
+        self._check_interval = int(check_interval)
+
+    def _convergence_status(self, chain):
+        """
+        Check whether the chains have converged, using the integrated autocorrelation time of the parameters.
+        The burn in is a few times the largest autocorrelation time, and the chains have converged when they are long
+        enough for the autocorrelation time to be reliable and for the samples after the burn in to amount to the
+        target number of effective samples
+
+        :param chain: the chains, as an array with shape (n_steps, n_walkers, n_parameters)
+        :return: (converged, burn in, autocorrelation times)
+        """
+
+        n_steps, n_walkers = chain.shape[:2]
+
+        taus = integrated_autocorrelation_time(chain)
+
+        max_tau = np.max(taus)
+
+        # keep at least half of the chains, in case they have not converged
+
+        burn_in = min(
+            int(np.ceil(_BURN_IN_AUTOCORRELATION_TIMES * max_tau)), n_steps // 2
+        )
+
+        converged = n_steps >= _MIN_AUTOCORRELATION_TIMES * max_tau
+
+        if self._target_effective_samples is not None:
+
+            n_effective = n_walkers * (n_steps - burn_in) / max_tau
+
+            converged = converged and n_effective >= self._target_effective_samples
+
+        return converged, burn_in, taus
+
+    def _store_convergence_diagnostics(self, chain, burn_in):
+        """
+        Compute the autocorrelation time and the effective number of samples of each parameter
+
+        :param chain: the chains after the burn in, as an array with shape (n_steps, n_walkers, n_parameters)
+        :param burn_in: the number of steps which have been discarded as burn in
+        :return: none
+        """
+
+        n_steps, n_walkers = chain.shape[:2]
+
+        taus = integrated_autocorrelation_time(chain)
+
+        self._convergence_diagnostics = pd.DataFrame(
+            collections.OrderedDict(
+                (
+                    ("autocorr. time", taus),
+                    ("effective samples", n_walkers * n_steps / taus),
+                    ("burn in", burn_in),
+                    ("reliable", n_steps >= _MIN_AUTOCORRELATION_TIMES * taus),
+                )
+            ),
+            index=list(self._free_parameters.keys()),
+        )
+
+        if not np.all(self._convergence_diagnostics["reliable"]):
+
+            custom_warnings.warn(
+                "The chains are shorter than %d times the autocorrelation time of some parameters: "
+                "the estimate of the autocorrelation time might not be reliable, and the chains might "
+                "not have converged" % _MIN_AUTOCORRELATION_TIMES
+            )
+
     def _get_starting_points(self, n_walkers, variance=0.1):
 
         # Generate the starting points for the walkers by getting random
@@ -41,6 +41,9 @@ except:
 
 
 class UltraNestSampler(UnitCubeSampler):
+
+    _supports_checkpoint = True
+
     def __init__(self, likelihood_model=None, data_list=None, **kwargs):
 
         assert has_ultranest, "You must install UltraNest to use this sampler"
@@ -53,8 +56,24 @@ class UltraNestSampler(UnitCubeSampler):
         dlogz=0.5,
         chain_name=None,
         wrapped_params=None,
+        resume=False,
         **kwargs
     ):
+        """
+        Setup the UltraNest sampler. UltraNest saves its state in the directory of the chains while sampling,
+        so that an interrupted run can be resumed
+
+        :param min_num_live_points: minimum number of live points
+        :param dlogz: target evidence uncertainty
+        :param chain_name: the directory where UltraNest writes its output and state (None: keep everything in memory)
+        :param wrapped_params: list of booleans, True for circular parameters
+        :param resume: continue the run saved in chain_name, if any
+        :returns:
+        :rtype:
+
+        """
+
+        self._setup_checkpoint(chain_name, resume)
 
         self._kwargs = {}
         self._kwargs["min_num_live_points"] = min_num_live_points
@@ -137,6 +156,10 @@ class UltraNestSampler(UnitCubeSampler):
 
         else:
 
+            # by default UltraNest starts a new run in a new subfolder of log_dir
+
+            resume_kwargs = {"resume": "resume"} if self._resume else {}
+
             sampler = ultranest.ReactiveNestedSampler(
                 param_names,
                 loglike,
@@ -144,6 +167,7 @@ class UltraNestSampler(UnitCubeSampler):
                 log_dir=chain_name,
                 vectorized=False,
                 wrapped_params=self._wrapped_params,
+                **resume_kwargs
             )
 
             with use_astromodels_memoization(False):
@@ -1,10 +1,8 @@
+import itertools
 import numpy as np
 
 
 from threeML.bayesian.sampler_base import MCMCSampler
-from threeML.config.config import threeML_config
-
-from threeML.parallel.parallel_client import ParallelClient
 from astromodels import use_astromodels_memoization
 
 
@@ -21,28 +19,6 @@ else:
     has_zeus = True
 
 
-try:
-
-    # see if we have mpi and/or are using parallel
-
-    from mpi4py import MPI
-
-    if MPI.COMM_WORLD.Get_size() > 1:  # need parallel capabilities
-        using_mpi = True
-
-        comm = MPI.COMM_WORLD
-        rank = comm.Get_rank()
-
-        from mpi4py.futures import MPIPoolExecutor
-
-    else:
-
-        using_mpi = False
-except:
-
-    using_mpi = False
-
-
 class ZeusSampler(MCMCSampler):
     def __init__(self, likelihood_model=None, data_list=None, **kwargs):
 
@@ -50,7 +26,42 @@ class ZeusSampler(MCMCSampler):
 
         super(ZeusSampler, self).__init__(likelihood_model, data_list, **kwargs)
 
-    def setup(self, n_iterations, n_burn_in=None, n_walkers=20, seed=None):
+    def setup(
+        self,
+        n_iterations,
+        n_burn_in=None,
+        n_walkers=20,
+        seed=None,
+        target_effective_samples=None,
+        check_interval=100,
+        pool=None,
+        n_workers=None,
+        checkpoint=None,
+        resume=False,
+    ):
+        """
+        Setup the zeus sampler
+
+        :param n_iterations: number of iterations (after the burn in). In the adaptive mode, the maximum number of
+        iterations (including the burn in)
+        :param n_burn_in: number of iterations of burn in (default: n_iterations / 4). Ignored in the adaptive mode
+        :param n_walkers: number of walkers
+        :param seed: seed for the random number generator
+        :param target_effective_samples: if provided, use the adaptive mode: the burn in is set from the
+        autocorrelation time of the chains, and the sampling stops as soon as this number of effective samples is reached
+        :param check_interval: number of iterations between two estimates of the autocorrelation time in the adaptive mode
+        :param pool: how to parallelize the evaluation of the posterior: "serial", "multiprocessing" (local
+        processes), "mpi" or "ipyparallel". If None, use ipyparallel if the parallel computation is active, MPI if
+        running under MPI, serial otherwise
+        :param n_workers: number of workers for multiprocessing and MPI pools (default: all the available CPUs)
+        :param checkpoint: not supported: zeus can save its chains, but not the state needed to resume them
+        :param resume: not supported
+        :returns:
+        :rtype:
+
+        """
+
+        self._setup_checkpoint(checkpoint, resume)
 
         self._n_iterations = int(n_iterations)
 
@@ -66,6 +77,10 @@ class ZeusSampler(MCMCSampler):
 
         self._seed = seed
 
+        self._setup_convergence(target_effective_samples, check_interval)
+
+        self._setup_pool(pool, n_workers)
+
         self._is_setup = True
 
     def sample(self, quiet=False):
@@ -82,67 +97,64 @@ class ZeusSampler(MCMCSampler):
 
         p0 = self._get_starting_points(self._n_walkers)
 
-        # Deactivate memoization in astromodels, which is useless in this case since we will never use twice the
-        # same set of parameters
-        with use_astromodels_memoization(False):
-
-            if using_mpi:
+        if self._target_effective_samples is not None:
 
-                with MPIPoolExecutor() as executor:
+            # stop as soon as the chains have converged (checked every check_interval iterations)
 
-                    sampler = zeus.sampler(
-                        logprob_fn=self.get_posterior,
-                        nwalkers=self._n_walkers,
-                        ndim=n_dim,
-                        pool=executor,
-                    )
+            n_steps = self._n_iterations
 
-                    # if self._seed is not None:
+            run_kwargs = {"callbacks": self._get_convergence_callback()}
 
-                    #     sampler._random.seed(self._seed)
+        else:
 
-                    # Run the true sampling
+            n_steps = self._n_iterations + self._n_burn_in
 
-                    _ = sampler.run(
-                        p0, self._n_iterations + self._n_burn_in, progress=loud,
-                    )
+            run_kwargs = {}
 
-            elif threeML_config["parallel"]["use-parallel"]:
+        # Deactivate memoization in astromodels, which is useless in this case since we will never use twice the
+        # same set of parameters
+        with use_astromodels_memoization(False), self._get_pool() as pool:
 
-                c = ParallelClient()
-                view = c[:]
+            if pool.kind != "serial":
 
-                sampler = zeus.sampler(
-                    logprob_fn=self.get_posterior,
-                    nwalkers=self._n_walkers,
-                    ndim=n_dim,
-                    pool=view,
-                )
+                sampler_kwargs = {"pool": pool}
 
             else:
 
-                sampler = zeus.sampler(
-                    logprob_fn=self.get_posterior, nwalkers=self._n_walkers, ndim=n_dim
-                )
+                sampler_kwargs = {}
+
+            sampler = zeus.sampler(
+                logprob_fn=self.get_posterior,
+                nwalkers=self._n_walkers,
+                ndim=n_dim,
+                **sampler_kwargs
+            )
 
             # If a seed is provided, set the random number seed
             # if self._seed is not None:
 
             #     sampler._random.seed(self._seed)
 
-            # Sample the burn-in
-            if not using_mpi:
+            _ = sampler.run(p0, n_steps, progress=loud, **run_kwargs)
+
+        if self._target_effective_samples is not None:
 
-                _ = sampler.run(p0, self._n_iterations + self._n_burn_in, progress=loud)
+            _, burn_in, _ = self._convergence_status(sampler.get_chain())
+
+        else:
+
+            burn_in = self._n_burn_in
 
         self._sampler = sampler
-        self._raw_samples = sampler.flatten(discard=self._n_burn_in)
+        self._raw_samples = sampler.flatten(discard=burn_in)
+
+        self._store_convergence_diagnostics(sampler.get_chain(discard=burn_in), burn_in)
 
         # Compute the corresponding values of the likelihood
 
         # First we need the prior
         log_prior = np.array([self._log_prior(x) for x in self._raw_samples])
-        self._log_probability_values = sampler.get_log_prob(flat=True, discard=self._n_burn_in)
+        self._log_probability_values = sampler.get_log_prob(flat=True, discard=burn_in)
 
 
 
@@ -168,3 +180,24 @@ class ZeusSampler(MCMCSampler):
             self._results.display()
 
         return self.samples
+
+    def _get_convergence_callback(self):
+        """
+        Build the callback used by zeus to stop the sampling as soon as the chains have converged
+
+        :return: a callable which takes the zeus sampler and returns True to stop
+        """
+
+        iterations = itertools.count(1)
+
+        def callback(sampler):
+
+            if next(iterations) % self._check_interval != 0:
+
+                return False
+
+            converged, _, _ = self._convergence_status(sampler.get_chain())
+
+            return converged
+
+        return callback
@@ -2,7 +2,11 @@ from builtins import object
 import collections
 import numpy as np
 
-from threeML.classicMLE.joint_likelihood_set import JointLikelihoodSet
+from threeML.classicMLE.joint_likelihood_set import (
+    JointLikelihoodSet,
+    fit_simulated_counts,
+    simulate_dataset,
+)
 from threeML.data_list import DataList
 from astromodels import clone_model
 
@@ -29,7 +33,7 @@ class GoodnessOfFit(object):
         # Store best model
         self._best_fit_model = clone_model(self._jl_instance.likelihood_model)
 
-    def get_simulated_data(self, id):
+    def get_simulated_data(self, id, random_generator=None):
 
         # Make sure we start from the best fit model
         self._jl_instance.restore_best_fit()
@@ -40,7 +44,9 @@ class GoodnessOfFit(object):
 
         for dataset in list(self._jl_instance.data_list.values()):
 
-            new_data = dataset.get_simulated_dataset("%s_sim" % dataset.name)
+            new_data = simulate_dataset(
+                dataset, "%s_sim" % dataset.name, random_generator=random_generator
+            )
 
             new_datas.append(new_data)
 
@@ -57,7 +63,15 @@ class GoodnessOfFit(object):
 
         return new_model
 
-    def by_mc(self, n_iterations=1000, continue_on_failure=False):
+    def by_mc(
+        self,
+        n_iterations=1000,
+        continue_on_failure=False,
+        in_place=False,
+        seed=None,
+        checkpoint_file=None,
+        resume=False,
+    ):
         """
         Compute goodness of fit by generating Monte Carlo datasets and fitting the current model on them. The fraction
         of synthetic datasets which have a value for the likelihood larger or equal to the observed one is a measure
@@ -65,24 +79,98 @@ class GoodnessOfFit(object):
 
         :param n_iterations: number of MC iterations to perform (default: 1000)
         :param continue_of_failure: whether to continue in the case a fit fails (False by default)
+        :param in_place: if True, draw all the simulated counts at once and swap them into the existing plugins
+        instead of building new plugins for each iteration, reusing the same fitter (much faster for small spectra).
+        Only for plugins supporting it, like SpectrumLike and its children, and not for plugins whose background is
+        modeled with another plugin (background_plugin), which raise NotImplementedError (False by default)
+        :param seed: (optional) seed for the random numbers. The simulations are reproducible with the same seed,
+        also when running in parallel (default: use the global numpy random state, as set by np.random.seed)
+        :param checkpoint_file: (optional) HDF5 file where the completed simulations are stored during the run (not
+        with in_place=True). See JointLikelihoodSet.go
+        :param resume: continue a run interrupted while using checkpoint_file. Use the same seed to get the same
+        simulations (default: False)
         :return: tuple (goodness of fit, frame with all results, frame with all likelihood values)
         """
 
-        # Create the joint likelihood set
-        jl_set = JointLikelihoodSet(
-            self.get_simulated_data,
-            self.get_model,
-            n_iterations,
-            iteration_name="simulation",
-        )
+        assert not (
+            in_place and checkpoint_file is not None
+        ), "The checkpoint_file cannot be used with in_place=True"
+
+        if in_place:
+
+            # The nuisance parameters of the plugins (e.g., an effective area correction) are shared with the
+            # models used for the fits, so the current values of all the free parameters are restored at the end
+
+            data_list = self._jl_instance.data_list
+
+            saved_values = [
+                (parameter, parameter.value)
+                for parameter in list(
+                    self._jl_instance.likelihood_model.free_parameters.values()
+                )
+            ]
+
+            for dataset in list(data_list.values()):
+
+                saved_values.extend(
+                    (parameter, parameter.value)
+                    for parameter in list(dataset.nuisance_parameters.values())
+                )
+
+            # Simulate from the best fit model
+
+            self._jl_instance.restore_best_fit()
+
+            # without a seed, the plugins use the global numpy random state (e.g., as set by np.random.seed)
+
+            random_generator = None if seed is None else np.random.default_rng(seed)
+
+            try:
 
-        # Use the same minimizer as in the joint likelihood object
-        # NOTE: we use a clone so that the original best fit will not be touched
+                data_frame, like_data_frame = fit_simulated_counts(
+                    data_list,
+                    [self._best_fit_model],
+                    n_iterations,
+                    self._jl_instance.minimizer_in_use,
+                    continue_on_failure=continue_on_failure,
+                    random_generator=random_generator,
+                )
 
-        jl_set.set_minimizer(self._jl_instance.minimizer_in_use)
+            finally:
 
-        # Run the set
-        data_frame, like_data_frame = jl_set.go(continue_on_failure=continue_on_failure)
+                # the plugins have been assigned to the models used for the fits
+
+                for dataset in list(data_list.values()):
+
+                    dataset.set_model(self._jl_instance.likelihood_model)
+
+                for parameter, value in saved_values:
+
+                    parameter.value = value
+
+        else:
+
+            # Create the joint likelihood set
+            jl_set = JointLikelihoodSet(
+                self.get_simulated_data,
+                self.get_model,
+                n_iterations,
+                iteration_name="simulation",
+                seed=seed,
+            )
+
+            # Use the same minimizer as in the joint likelihood object
+            # NOTE: we use a clone so that the original best fit will not be touched
+
+            jl_set.set_minimizer(self._jl_instance.minimizer_in_use)
+
+            # Run the set
+            data_frame, like_data_frame = jl_set.go(
+                continue_on_failure=continue_on_failure,
+                keep_analysis_results=False,
+                checkpoint_file=checkpoint_file,
+                resume=resume,
+            )
 
         # Compute goodness of fit
 
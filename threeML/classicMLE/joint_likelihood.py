@@ -6,6 +6,7 @@ from builtins import object
 from past.utils import old_div
 import collections
 import sys
+from contextlib import contextmanager
 import astromodels.core.model
 import matplotlib.pyplot as plt
 import numpy as np
@@ -67,6 +68,11 @@ class JointLikelihood(object):
         self._ncalls = 0
         self._record_calls = {}
 
+        # Cache of the last log-likelihood of each dataset (active only during minimizations, see
+        # _memoized_log_likes)
+        self._log_like_cache = None
+        self._dependencies = None
+
         # Pre-defined minimizer
         default_minimizer = minimization.LocalMinimization(
             threeML_config["mle"]["default minimizer"]
@@ -227,6 +233,10 @@ class JointLikelihood(object):
 
         else:
 
+            # Use the analytic gradient of the likelihood if requested and if all plugins can provide it
+
+            gradient = self._get_gradient_function()
+
             # Instance the minimizer
 
             # If we have a global minimizer, use that first (with no covariance)
@@ -235,12 +245,16 @@ class JointLikelihood(object):
                 # Do global minimization first
 
                 global_minimizer = self._get_minimizer(
-                    self.minus_log_like_profile, self._free_parameters
+                    self.minus_log_like_profile,
+                    self._free_parameters,
+                    gradient=gradient,
                 )
 
-                xs, global_log_likelihood_minimum = global_minimizer.minimize(
-                    compute_covar=False
-                )
+                with self._memoized_log_likes():
+
+                    xs, global_log_likelihood_minimum = global_minimizer.minimize(
+                        compute_covar=False
+                    )
 
                 # Gather global results
                 paths = []
@@ -272,7 +286,9 @@ class JointLikelihood(object):
 
                 # Now set up secondary minimizer
                 self._minimizer = self._minimizer_type.get_second_minimization_instance(
-                    self.minus_log_like_profile, self._free_parameters
+                    self.minus_log_like_profile,
+                    self._free_parameters,
+                    gradient=gradient,
                 )
 
             else:
@@ -280,16 +296,20 @@ class JointLikelihood(object):
                 # Only local minimization to be performed
 
                 self._minimizer = self._get_minimizer(
-                    self.minus_log_like_profile, self._free_parameters
+                    self.minus_log_like_profile,
+                    self._free_parameters,
+                    gradient=gradient,
                 )
 
             # Perform the fit, but first flush stdout (so if we have verbose=True the messages there will follow
             # what is already in the buffer)
             sys.stdout.flush()
 
-            xs, log_likelihood_minimum = self._minimizer.minimize(
-                compute_covar=compute_covariance
-            )
+            with self._memoized_log_likes():
+
+                xs, log_likelihood_minimum = self._minimizer.minimize(
+                    compute_covar=compute_covariance
+                )
 
             if log_likelihood_minimum == minimization.FIT_FAILED:
 
@@ -382,7 +402,9 @@ class JointLikelihood(object):
             self._current_minimum is not None
         ), "You have to run the .fit method before calling errors."
 
-        errors = self._minimizer.get_errors()
+        with self._memoized_log_likes():
+
+            errors = self._minimizer.get_errors()
 
         # Set the parameters back to the best fit value
         self.restore_best_fit()
@@ -525,18 +547,20 @@ class JointLikelihood(object):
 
         if not threeML_config["parallel"]["use-parallel"]:
 
-            a, b, cc = self.minimizer.contours(
-                param_1,
-                param_1_minimum,
-                param_1_maximum,
-                param_1_n_steps,
-                param_2,
-                param_2_minimum,
-                param_2_maximum,
-                param_2_n_steps,
-                progress,
-                **options
-            )
+            with self._memoized_log_likes():
+
+                a, b, cc = self.minimizer.contours(
+                    param_1,
+                    param_1_minimum,
+                    param_1_maximum,
+                    param_1_n_steps,
+                    param_2,
+                    param_2_minimum,
+                    param_2_maximum,
+                    param_2_n_steps,
+                    progress,
+                    **options
+                )
 
             # Collapse the second dimension of the results if we are doing a 1d contour
 
@@ -633,18 +657,20 @@ class JointLikelihood(object):
 
                 # print("From %s to %s" % (this_p1min, this_p1max))
 
-                aa, bb, ccc = this_minimizer.contours(
-                    param_1,
-                    this_p1min,
-                    this_p1max,
-                    p1_split_steps,
-                    param_2,
-                    param_2_minimum,
-                    param_2_maximum,
-                    param_2_n_steps,
-                    progress=True,
-                    **options
-                )
+                with self._memoized_log_likes():
+
+                    aa, bb, ccc = this_minimizer.contours(
+                        param_1,
+                        this_p1min,
+                        this_p1max,
+                        p1_split_steps,
+                        param_2,
+                        param_2_minimum,
+                        param_2_maximum,
+                        param_2_n_steps,
+                        progress=True,
+                        **options
+                    )
 
                 # Restore best fit values
 
@@ -886,8 +912,30 @@ class JointLikelihood(object):
 
         summed_log_likelihood = 0
 
+        # Number of datasets whose log-likelihood has been taken from the cache
+
+        n_skipped = 0
+
         for dataset in list(self._data_list.values()):
 
+            if self._log_like_cache is not None:
+
+                # Only the free parameters this dataset depends on matter
+
+                key = tuple(trial_values[self._dependencies[dataset.name]])
+
+                cached_key, cached_log_like = self._log_like_cache.get(
+                    dataset.name, (None, None)
+                )
+
+                if cached_key == key:
+
+                    summed_log_likelihood += cached_log_like
+
+                    n_skipped += 1
+
+                    continue
+
             try:
 
                 this_log_like = dataset.inner_fit()
@@ -910,6 +958,10 @@ class JointLikelihood(object):
 
                 raise
 
+            if self._log_like_cache is not None:
+
+                self._log_like_cache[dataset.name] = (key, this_log_like)
+
             summed_log_likelihood += this_log_like
 
         # Check that the global like is not NaN
@@ -933,15 +985,139 @@ class JointLikelihood(object):
         # Record this call
         if self._record:
 
-            self._record_calls[tuple(trial_values)] = summed_log_likelihood
+            self._record_calls[tuple(trial_values)] = (
+                summed_log_likelihood,
+                n_skipped,
+            )
 
         # Return the minus log likelihood
 
         return summed_log_likelihood * (-1)
 
+    def minus_log_like_gradient(self, *trial_values):
+        """
+        Return the gradient of the minus log likelihood with respect to the (internal values of the) free
+        parameters, for a given set of trial values. All plugins must be able to compute their gradient
+        (see PluginPrototype.get_log_like_gradient).
+
+        :param trial_values: the trial values. Must be in the same number as the free parameters in the model
+        :return: array with the gradient of the minus log likelihood
+        """
+
+        trial_values = np.array(trial_values)
+
+        for i, parameter in enumerate(self._free_parameters.values()):
+
+            parameter._set_internal_value(trial_values[i])
+
+        gradient = np.zeros(len(self._free_parameters))
+
+        for dataset in list(self._data_list.values()):
+
+            indexes, parameters = self._get_parameters_affecting(dataset)
+
+            try:
+
+                this_gradient = dataset.get_log_like_gradient(parameters)
+
+            except ModelAssertionViolation:
+
+                # Forbidden zone of the parameter space. The likelihood is FIT_FAILED here, so the engine will
+                # stay away from it no matter what the gradient is
+
+                return np.zeros(len(self._free_parameters))
+
+            gradient[indexes] += this_gradient
+
+        return gradient * (-1)
+
+    def _get_parameters_affecting(self, dataset):
+
+        # The nuisance parameters of the other datasets cannot affect this one, and the dataset itself might
+        # know that some other parameters do not affect it
+
+        indexes = []
+        parameters = collections.OrderedDict()
+
+        for i, (parameter_name, parameter) in enumerate(
+            self._free_parameters.items()
+        ):
+
+            if parameter_name in dataset.nuisance_parameters or (
+                not any(
+                    parameter_name in other.nuisance_parameters
+                    for other in self._data_list.values()
+                )
+                and dataset.depends_on_parameter(parameter_name)
+            ):
+
+                indexes.append(i)
+                parameters[parameter_name] = parameter
+
+        return np.array(indexes, dtype=int), parameters
+
+    def _get_gradient_function(self):
+        """
+        Return the function computing the gradient of the minus log likelihood if all plugins declare that
+        they can provide their gradient (see PluginPrototype.has_log_like_gradient) and the use of the analytic
+        gradient is enabled in the configuration, None otherwise (in which case minimizers will use numerical
+        derivatives)
+        """
+
+        if not threeML_config["mle"]["use analytic gradient"]:
+
+            return None
+
+        if not all(
+            dataset.has_log_like_gradient() for dataset in self._data_list.values()
+        ):
+
+            return None
+
+        return self.minus_log_like_gradient
+
+    @contextmanager
+    def _memoized_log_likes(self):
+        """
+        Within this context the log-likelihood of a dataset is re-computed only if at least one of the free
+        parameters it depends on has changed since the last call (see PluginPrototype.depends_on_parameter).
+        The data and the fixed parameters must not change within the context.
+        """
+
+        self._dependencies = collections.OrderedDict()
+
+        for dataset in list(self._data_list.values()):
+
+            indexes, _ = self._get_parameters_affecting(dataset)
+
+            self._dependencies[dataset.name] = indexes
+
+        self._log_like_cache = {}
+
+        try:
+
+            yield
+
+        finally:
+
+            self._log_like_cache = None
+
     @property
     def fit_trace(self):
-        return pd.DataFrame(self._record_calls)
+        """
+        A pandas DataFrame with the trial values of the free parameters for each call to the likelihood in the
+        last fit, the corresponding log-likelihood and the number of datasets whose log-likelihood did not need
+        to be re-computed because none of their parameters changed
+        """
+
+        return pd.DataFrame(
+            [
+                list(trial_values) + list(record)
+                for trial_values, record in self._record_calls.items()
+            ],
+            columns=list(self._free_parameters.keys())
+            + ["log_like", "skipped_datasets"],
+        )
 
     def set_minimizer(self, minimizer):
         """
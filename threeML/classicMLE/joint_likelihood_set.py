@@ -1,7 +1,10 @@
 from builtins import range
 from builtins import object
+import collections
+import inspect
 import logging
 import numpy as np
+import os
 import warnings
 
 log = logging.getLogger(__name__)
@@ -10,13 +13,420 @@ from threeML.classicMLE.joint_likelihood import JointLikelihood
 from threeML.parallel.parallel_client import ParallelClient
 from threeML.config.config import threeML_config
 from threeML.data_list import DataList
+from threeML.io.file_utils import sanitize_filename
 from threeML.io.progress_bar import progress_bar
-from threeML.analysis_results import AnalysisResultsSet
+from threeML.analysis_results import (
+    AnalysisResultsSet,
+    _load_one_hdf5_results,
+    _write_one_hdf5_results,
+)
 from threeML.minimizer.minimization import _Minimization, LocalMinimization, _minimizers
 
-from astromodels import Model
+from astromodels import Model, clone_model
 import pandas as pd
 
+try:
+
+    import h5py
+
+except ImportError:
+
+    has_h5py = False
+
+else:
+
+    has_h5py = True
+
+
+def _fit(
+    jl,
+    minimization,
+    compute_covariance,
+    continue_on_failure,
+    max_retries=0,
+    retry_minimization=None,
+):
+
+    # Keep the starting point, so that a retry starts from the same place
+
+    starting_values = [
+        parameter.value for parameter in jl.likelihood_model.free_parameters.values()
+    ]
+
+    for attempt in range(max_retries + 1):
+
+        if attempt > 0:
+
+            log.info("Retrying the fit (attempt %i of %i)" % (attempt, max_retries))
+
+            for parameter, value in zip(
+                list(jl.likelihood_model.free_parameters.values()), starting_values
+            ):
+
+                parameter.value = value
+
+        # Set the minimizer
+        if attempt > 0 and retry_minimization is not None:
+
+            jl.set_minimizer(retry_minimization)
+
+        else:
+
+            jl.set_minimizer(minimization)
+
+        try:
+
+            model_results, logl_results = jl.fit(
+                quiet=True, compute_covariance=compute_covariance
+            )
+
+        except Exception as e:
+
+            log.error("\n\n**** FIT FAILED! ***")
+            log.error("Reason:")
+            log.error(repr(e))
+            log.error("\n\n")
+
+            if attempt < max_retries:
+
+                continue
+
+            if continue_on_failure:
+
+                # Return empty data frame
+
+                return pd.DataFrame(), pd.DataFrame()
+
+            else:
+
+                raise
+
+        else:
+
+            return model_results, logl_results
+
+
+class _FramesCollector(object):
+    def __init__(self, n_iterations):
+        """
+        Collects the rows of many small data frames with the same columns (for example one for each iteration of a
+        JointLikelihoodSet) as they arrive, in arrays preallocated at the first frame and grown if needed. The
+        result is the same as pd.concat(frames, keys=iterations), without keeping all the frames in memory.
+
+        :param n_iterations: the expected number of frames
+        """
+
+        self._n_iterations = n_iterations
+
+        self._n_rows = 0
+
+        self._iterations = None
+        self._labels = None
+        self._columns = None
+
+    def _allocate(self, frame):
+
+        capacity = self._n_iterations * frame.shape[0]
+
+        self._iterations = np.zeros(capacity, dtype=int)
+
+        # One array for each level of the index
+
+        self._labels = [
+            np.empty(capacity, dtype=object) for _ in range(frame.index.nlevels)
+        ]
+
+        self._columns = collections.OrderedDict()
+
+        for name in frame.columns:
+
+            dtype = frame[name].dtype
+
+            self._columns[name] = np.empty(
+                capacity, dtype=dtype if dtype.kind in "biufc" else object
+            )
+
+    def _grow(self, n_rows):
+
+        capacity = self._iterations.shape[0]
+
+        while capacity < n_rows:
+
+            capacity *= 2
+
+        def grown(array):
+
+            new_array = np.empty(capacity, dtype=array.dtype)
+
+            new_array[: self._n_rows] = array[: self._n_rows]
+
+            return new_array
+
+        self._iterations = grown(self._iterations)
+        self._labels = [grown(x) for x in self._labels]
+
+        for name in self._columns:
+
+            self._columns[name] = grown(self._columns[name])
+
+    def append(self, iteration, frame):
+        """
+        Add the rows of the frame for the given iteration (empty frames, like those of failed fits, are skipped)
+
+        :param iteration: the index of the iteration
+        :param frame: a pandas DataFrame
+        :return: none
+        """
+
+        n = frame.shape[0]
+
+        if n == 0:
+
+            return
+
+        if self._columns is None:
+
+            self._allocate(frame)
+
+        if self._n_rows + n > self._iterations.shape[0]:
+
+            self._grow(self._n_rows + n)
+
+        this_slice = slice(self._n_rows, self._n_rows + n)
+
+        self._iterations[this_slice] = iteration
+
+        for level, labels in enumerate(self._labels):
+
+            labels[this_slice] = frame.index.get_level_values(level)
+
+        for name, column in self._columns.items():
+
+            column[this_slice] = frame[name].values
+
+        self._n_rows += n
+
+    def get_frame(self):
+        """
+        :return: a pandas DataFrame with all the rows collected so far, with the iteration as first level of the
+        index (sorted by iteration, whatever the order of arrival)
+        """
+
+        if self._columns is None:
+
+            return pd.DataFrame()
+
+        order = np.argsort(self._iterations[: self._n_rows], kind="mergesort")
+
+        index = pd.MultiIndex.from_arrays(
+            [self._iterations[order]] + [labels[order] for labels in self._labels]
+        )
+
+        return pd.DataFrame(
+            collections.OrderedDict(
+                (name, column[order]) for name, column in self._columns.items()
+            ),
+            index=index,
+        )
+
+
+def _write_frame(group, frame):
+
+    # all the labels of the index are stored as strings
+
+    group.attrs["COLUMNS"] = np.array(
+        [str(x).encode("utf-8") for x in frame.columns], "S"
+    )
+    group.attrs["N_LEVELS"] = frame.index.nlevels
+
+    for level in range(frame.index.nlevels):
+
+        labels = frame.index.get_level_values(level)
+
+        group.create_dataset(
+            "INDEX_%i" % level,
+            data=np.array([str(x).encode("utf-8") for x in labels], "S"),
+        )
+
+    for j, name in enumerate(frame.columns):
+
+        values = frame[name].values
+
+        if values.dtype.kind not in "biufc":
+
+            values = np.array([str(x).encode("utf-8") for x in values], "S")
+
+        group.create_dataset("COLUMN_%i" % j, data=values)
+
+
+def _read_frame(group):
+
+    columns = [x.decode("utf-8") for x in group.attrs["COLUMNS"]]
+
+    if len(columns) == 0:
+
+        return pd.DataFrame()
+
+    def read(dataset):
+
+        values = dataset[()]
+
+        if values.dtype.kind == "S":
+
+            values = np.array([x.decode("utf-8") for x in values], dtype=object)
+
+        return values
+
+    index = pd.MultiIndex.from_arrays(
+        [read(group["INDEX_%i" % i]) for i in range(int(group.attrs["N_LEVELS"]))]
+    )
+
+    if index.nlevels == 1:
+
+        index = index.get_level_values(0)
+
+    return pd.DataFrame(
+        collections.OrderedDict(
+            (name, read(group["COLUMN_%i" % j])) for j, name in enumerate(columns)
+        ),
+        index=index,
+    )
+
+
+class _ResultsStore(object):
+    def __init__(self, filename, n_iterations, n_models, resume):
+        """
+        An HDF5 file storing the results of the completed iterations of a JointLikelihoodSet, with one group per
+        iteration, so that an interrupted run can be resumed. The results are written in batches (see flush).
+
+        :param filename: name of the file
+        :param n_iterations: the number of iterations of the set
+        :param n_models: the number of models of the set
+        :param resume: if True, the file must exist (or it is created), otherwise it must not exist
+        """
+
+        assert has_h5py, "You need to install h5py to store the results during the run"
+
+        # the absolute path, since the samples of the stored results are read from the file later on
+
+        self._filename = sanitize_filename(filename, abspath=True)
+
+        if os.path.exists(self._filename):
+
+            if not resume:
+
+                raise IOError(
+                    "File %s already exists. Use resume=True to continue the run stored there, or remove "
+                    "it" % self._filename
+                )
+
+            with h5py.File(self._filename, "r") as f:
+
+                assert (
+                    int(f.attrs["N_ITERATIONS"]) == n_iterations
+                    and int(f.attrs["N_MODELS"]) == n_models
+                ), "The file %s contains the results of a different set" % self._filename
+
+                self._completed = sorted(
+                    int(name.split("_")[1]) for name in f.keys()
+                )
+
+        else:
+
+            with h5py.File(self._filename, "w") as f:
+
+                f.attrs["N_ITERATIONS"] = n_iterations
+                f.attrs["N_MODELS"] = n_models
+
+            self._completed = []
+
+        self._pending = []
+
+    @property
+    def completed_iterations(self):
+        """
+        :return: the sorted list of the iterations stored in the file when it was opened
+        """
+
+        return self._completed
+
+    def load(self, iteration):
+        """
+        Read the results of one iteration
+
+        :param iteration: the index of the iteration
+        :return: (frame with the parameters, frame with the likelihood values, list of analysis results (or None
+        if they were not stored) for each model)
+        """
+
+        with h5py.File(self._filename, "r") as f:
+
+            group = f["ITERATION_%i" % iteration]
+
+            analysis_results = [
+                _load_one_hdf5_results(group["RESULTS_%i" % j], self._filename)
+                if "RESULTS_%i" % j in group
+                else None
+                for j in range(int(f.attrs["N_MODELS"]))
+            ]
+
+            return (
+                _read_frame(group["PARAMETERS"]),
+                _read_frame(group["LIKELIHOOD"]),
+                analysis_results,
+            )
+
+    def add(self, iteration, frame_with_parameters, frame_with_like, analysis_results):
+        """
+        Add the results of one iteration (they are written at the next flush)
+
+        :return: none
+        """
+
+        self._pending.append(
+            (iteration, frame_with_parameters, frame_with_like, analysis_results)
+        )
+
+    @property
+    def n_pending(self):
+
+        return len(self._pending)
+
+    def flush(self):
+        """
+        Write the results added since the last flush
+
+        :return: none
+        """
+
+        if not self._pending:
+
+            return
+
+        with h5py.File(self._filename, "a") as f:
+
+            for (
+                iteration,
+                frame_with_parameters,
+                frame_with_like,
+                analysis_results,
+            ) in self._pending:
+
+                group = f.create_group("ITERATION_%i" % iteration)
+
+                _write_frame(group.create_group("PARAMETERS"), frame_with_parameters)
+                _write_frame(group.create_group("LIKELIHOOD"), frame_with_like)
+
+                for j, this_results in enumerate(analysis_results):
+
+                    if this_results is not None:
+
+                        _write_one_hdf5_results(
+                            group.create_group("RESULTS_%i" % j), this_results
+                        )
+
+        self._pending = []
+
 
 class JointLikelihoodSet(object):
     def __init__(
@@ -26,7 +436,22 @@ class JointLikelihoodSet(object):
         n_iterations,
         iteration_name="interval",
         preprocessor=None,
+        seed=None,
     ):
+        """
+        Fit one or more models to many data sets, for example the intervals of a time-resolved analysis or
+        Monte Carlo simulations
+
+        :param data_getter: a function returning the DataList for the iteration with the given id. If seed is
+        provided, it is called as data_getter(id, random_generator) instead
+        :param model_getter: a function returning the model (or the list of models) for the given id
+        :param n_iterations: number of iterations
+        :param iteration_name: name of the iterations (used in the messages)
+        :param preprocessor: (optional) a function called as preprocessor(models, data) before the fits
+        :param seed: (optional) an int or a numpy SeedSequence. If provided, an independent numpy Generator is
+        spawned from it for each iteration and given to the data getter, so that the simulations are reproducible
+        and do not depend on whether (and how) the iterations run in parallel
+        """
 
         # Store the data and model getter
 
@@ -100,6 +525,28 @@ class JointLikelihoodSet(object):
 
         self._preprocessor = preprocessor
 
+        self._keep_analysis_results = True
+
+        # By default do not retry failed fits
+
+        self._max_retries = 0
+
+        self._retry_minimization = None
+
+        # One independent random stream for each iteration
+
+        if seed is not None:
+
+            if not isinstance(seed, np.random.SeedSequence):
+
+                seed = np.random.SeedSequence(seed)
+
+            self._seed_sequences = seed.spawn(n_iterations)
+
+        else:
+
+            self._seed_sequences = None
+
     def set_minimizer(self, minimizer):
 
         if isinstance(minimizer, _Minimization):
@@ -125,7 +572,15 @@ class JointLikelihoodSet(object):
 
         # Get the dataset for this interval
 
-        this_data = self._data_getter(interval)  # type: DataList
+        if self._seed_sequences is not None:
+
+            random_generator = np.random.default_rng(self._seed_sequences[interval])
+
+            this_data = self._data_getter(interval, random_generator)  # type: DataList
+
+        else:
+
+            this_data = self._data_getter(interval)  # type: DataList
 
         # Get the model for this interval
 
@@ -160,7 +615,9 @@ class JointLikelihoodSet(object):
 
             parameters_frames.append(this_parameter_frame)
             like_frames.append(this_like_frame)
-            analysis_results.append(jl.results)
+            analysis_results.append(
+                jl.results if self._keep_analysis_results else None
+            )
 
         # Now merge the results in one data frame for the parameters and one for the likelihood
         # values
@@ -185,41 +642,53 @@ class JointLikelihoodSet(object):
 
     def _fitter(self, jl):
 
-        # Set the minimizer
-        jl.set_minimizer(self._minimization)
-
-        try:
-
-            model_results, logl_results = jl.fit(
-                quiet=True, compute_covariance=self._compute_covariance
-            )
-
-        except Exception as e:
-
-            log.error("\n\n**** FIT FAILED! ***")
-            log.error("Reason:")
-            log.error(repr(e))
-            log.error("\n\n")
-
-            if self._continue_on_failure:
-
-                # Return empty data frame
-
-                return pd.DataFrame(), pd.DataFrame()
-
-            else:
-
-                raise
-
-        return model_results, logl_results
+        return _fit(
+            jl,
+            self._minimization,
+            self._compute_covariance,
+            self._continue_on_failure,
+            self._max_retries,
+            self._retry_minimization,
+        )
 
     def go(
         self,
         continue_on_failure=True,
         compute_covariance=False,
         verbose=False,
+        keep_analysis_results=True,
+        checkpoint_file=None,
+        resume=False,
+        checkpoint_interval=10,
+        max_retries=0,
+        retry_minimizer=None,
         **options_for_parallel_computation
     ):
+        """
+        Run the fits for all the iterations. The results are collected as they arrive, so that only the
+        parameters and the likelihood values are kept in memory (plus the analysis results if requested)
+
+        :param continue_on_failure: whether to continue in the case a fit fails (default: True)
+        :param compute_covariance: whether to compute the covariance matrix in each fit (default: False)
+        :param verbose: print more information
+        :param keep_analysis_results: keep the analysis results of all the fits, which are then available through
+        the .results property and write_to. Use False to save memory when you only need the frames (default: True)
+        :param checkpoint_file: (optional) name of an HDF5 file where the results of the completed iterations are
+        stored during the run (needs h5py)
+        :param resume: if True, the iterations already stored in checkpoint_file are read back instead of being
+        run again. For simulations, use a seed (see the constructor) to get the same data sets (default: False)
+        :param checkpoint_interval: number of completed iterations between two writes of checkpoint_file
+        (default: 10)
+        :param max_retries: number of times a failed fit is tried again, starting from the same point, before
+        giving up (default: 0)
+        :param retry_minimizer: (optional) minimizer to use for the retries (default: the same minimizer)
+        :param options_for_parallel_computation: options for the ParallelClient
+        :return: (frame with the parameters, frame with the likelihood values)
+        """
+
+        assert (
+            checkpoint_file is not None or not resume
+        ), "You need to provide the checkpoint_file to resume a run"
 
         # Generate the data frame which will contain all results
 
@@ -231,59 +700,141 @@ class JointLikelihoodSet(object):
 
         self._compute_covariance = compute_covariance
 
-        # let's iterate, perform the fit and fill the data frame
+        self._keep_analysis_results = keep_analysis_results
+
+        self._max_retries = max_retries
+
+        self._retry_minimization = retry_minimizer
+
+        parameters_collector = _FramesCollector(self._n_iterations)
+        like_collector = _FramesCollector(self._n_iterations)
+
+        # analysis results for each model and iteration
+
+        all_results = [[None] * self._n_iterations for _ in range(self._n_models)]
 
-        if threeML_config["parallel"]["use-parallel"]:
+        n_done = 0
 
-            # Parallel computation
+        def collect(i, frame_with_parameters, frame_with_like, analysis_results):
 
-            client = ParallelClient(**options_for_parallel_computation)
+            parameters_collector.append(i, frame_with_parameters)
+            like_collector.append(i, frame_with_like)
 
-            results = client.execute_with_progress_bar(
-                self.worker, list(range(self._n_iterations))
+            for j, this_result in enumerate(analysis_results):
+
+                all_results[j][i] = this_result
+
+        # Read back the iterations already done in a previous run
+
+        if checkpoint_file is not None:
+
+            store = _ResultsStore(
+                checkpoint_file, self._n_iterations, self._n_models, resume
+            )
+
+            for i in store.completed_iterations:
+
+                collect(i, *store.load(i))
+
+                n_done += 1
+
+            if n_done > 0:
+
+                log.info("Resuming the run: %i iterations already done" % n_done)
+
+            # The iterations will be sorted as if they were run all at once
+
+            iterations = sorted(
+                set(range(self._n_iterations)) - set(store.completed_iterations)
             )
 
         else:
 
-            # Serial computation
+            store = None
 
-            results = []
+            iterations = list(range(self._n_iterations))
 
-            with progress_bar(
-                self._n_iterations, title="Goodness of fit computation"
-            ) as p:
+        # let's iterate, perform the fit and fill the data frame
 
-                for i in range(self._n_iterations):
+        if len(iterations) > 0:
 
-                    results.append(self.worker(i))
+            try:
 
-                    p.increase()
+                with progress_bar(
+                    len(iterations), title="Goodness of fit computation"
+                ) as p:
 
-        assert len(results) == self._n_iterations, (
-            "Something went wrong, I have %s results "
-            "for %s intervals" % (len(results), self._n_iterations)
-        )
+                    if threeML_config["parallel"]["use-parallel"]:
 
-        # Store the results in the data frames
+                        # Parallel computation
 
-        parameter_frames = pd.concat(
-            [x[0] for x in results], keys=list(range(self._n_iterations))
-        )
-        like_frames = pd.concat(
-            [x[1] for x in results], keys=list(range(self._n_iterations))
+                        client = ParallelClient(**options_for_parallel_computation)
+
+                        # (the client returns the position in the list of items)
+
+                        results = (
+                            (iterations[k], result)
+                            for k, result in client.execute_as_completed(
+                                self.worker, iterations
+                            )
+                        )
+
+                    else:
+
+                        # Serial computation
+
+                        results = ((i, self.worker(i)) for i in iterations)
+
+                    for i, this_result in results:
+
+                        collect(i, *this_result)
+
+                        n_done += 1
+
+                        if store is not None:
+
+                            store.add(i, *this_result)
+
+                            if store.n_pending >= checkpoint_interval:
+
+                                store.flush()
+
+                        p.increase()
+
+            finally:
+
+                # Save what we have, even if something went wrong
+
+                if store is not None:
+
+                    store.flush()
+
+        assert n_done == self._n_iterations, (
+            "Something went wrong, I have %s results "
+            "for %s intervals" % (n_done, self._n_iterations)
         )
 
         # Store a list with all results (this is a list of lists, each list contains the results for the different
         # iterations for the same model)
-        self._all_results = []
 
-        for i in range(self._n_models):
+        if keep_analysis_results:
 
-            this_model_results = [x[2][i] for x in results]
+            assert all(
+                x is not None
+                for this_model_results in all_results
+                for x in this_model_results
+            ), "Some of the stored iterations have no analysis results. Use keep_analysis_results=False"
 
-            self._all_results.append(AnalysisResultsSet(this_model_results))
+            self._all_results = [
+                AnalysisResultsSet(this_model_results)
+                for this_model_results in all_results
+            ]
 
-        return parameter_frames, like_frames
+        else:
+
+            self._all_results = None
+
+        return parameters_collector.get_frame(), like_collector.get_frame()
 
     @property
     def results(self):
@@ -294,6 +845,10 @@ class JointLikelihoodSet(object):
         :return:
         """
 
+        assert (
+            self._all_results is not None
+        ), "No analysis results available. Use go() with keep_analysis_results=True"
+
         if len(self._all_results) == 1:
 
             return self._all_results[0]
@@ -318,6 +873,10 @@ class JointLikelihoodSet(object):
         # Check that we have the right amount of file names
         assert len(filenames) == self._n_models
 
+        assert (
+            self._all_results is not None
+        ), "No analysis results available. Use go() with keep_analysis_results=True"
+
         # Now write one file for each model
         for i in range(self._n_models):
 
@@ -326,6 +885,185 @@ class JointLikelihoodSet(object):
             this_results.write_to(filenames[i], overwrite=overwrite)
 
 
+def simulate_dataset(dataset, new_name, random_generator=None):
+    """
+    Get a simulated dataset from a plugin with its get_simulated_dataset method, using the given numpy Generator.
+    Plugins whose get_simulated_dataset does not accept the random_generator keyword (like plugins written before
+    it was introduced) are called after seeding the global numpy random state from the generator. The global state is
+    restored afterwards. These simulations are reproducible only if the plugin draws all its random numbers from
+    numpy.random, so a warning is issued
+
+    :param dataset: the plugin
+    :param new_name: the name of the simulated dataset
+    :param random_generator: (optional) the numpy Generator to use
+    :return: the simulated dataset
+    """
+
+    if random_generator is None:
+
+        return dataset.get_simulated_dataset(new_name)
+
+    if "random_generator" in inspect.signature(dataset.get_simulated_dataset).parameters:
+
+        return dataset.get_simulated_dataset(
+            new_name, random_generator=random_generator
+        )
+
+    warnings.warn(
+        "The get_simulated_dataset method of %s does not accept a random_generator. The simulations use the global "
+        "numpy random state, so they might not be reproducible" % dataset.name
+    )
+
+    state = np.random.get_state()
+
+    np.random.seed(random_generator.integers(2 ** 32))
+
+    try:
+
+        return dataset.get_simulated_dataset(new_name)
+
+    finally:
+
+        np.random.set_state(state)
+
+
+def fit_simulated_counts(
+    data_list,
+    models,
+    n_iterations,
+    minimizer,
+    continue_on_failure=False,
+    compute_covariance=False,
+    random_generator=None,
+):
+    """
+    Monte Carlo simulations without building new plugins: the counts of all the simulations are drawn at once
+    by each plugin from the model currently assigned to it (see get_simulated_counts), then they are swapped in
+    place into the plugins one simulation at a time, and each model is fit with the same JointLikelihood instance
+    for all simulations. The real data are restored at the end.
+
+    The plugins must support get_simulated_counts and set_simulated_counts (like SpectrumLike and its children).
+
+    :param data_list: the DataList with the plugins
+    :param models: the list of models to fit to each simulation. Clones are used, starting each fit from the
+    values of the parameters in the models
+    :param n_iterations: the number of simulations
+    :param minimizer: the minimizer to use (name or instance)
+    :param continue_on_failure: whether to continue in the case a fit fails
+    :param compute_covariance: whether to compute the covariance matrix in each fit
+    :param random_generator: (optional) the numpy Generator to use
+    :return: (frame with the parameters, frame with the likelihood values) in the same format as
+    JointLikelihoodSet.go. The simulated datasets are named <plugin name>_sim
+    """
+
+    datasets = list(data_list.values())
+
+    for dataset in datasets:
+
+        assert hasattr(dataset, "set_simulated_counts"), (
+            "The plugin %s does not support in-place simulations" % dataset.name
+        )
+
+    simulations = [
+        dataset.get_simulated_counts(n_iterations, random_generator)
+        for dataset in datasets
+    ]
+
+    # One joint likelihood analysis for each model, which will be used for all the simulations
+
+    jls = []
+
+    for model in models:
+
+        with warnings.catch_warnings():
+
+            warnings.simplefilter("ignore", RuntimeWarning)
+
+            jls.append(JointLikelihood(clone_model(model), data_list))
+
+    starting_values = [
+        [parameter.value for parameter in jl.likelihood_model.free_parameters.values()]
+        for jl in jls
+    ]
+
+    simulated_names = dict(
+        (dataset.name, "%s_sim" % dataset.name) for dataset in datasets
+    )
+
+    parameters_collector = _FramesCollector(n_iterations)
+    like_collector = _FramesCollector(n_iterations)
+
+    try:
+
+        with progress_bar(n_iterations, title="Goodness of fit computation") as p:
+
+            for i in range(n_iterations):
+
+                for dataset, (
+                    counts,
+                    count_errors,
+                    background_counts,
+                    background_count_errors,
+                ) in zip(datasets, simulations):
+
+                    dataset.set_simulated_counts(
+                        counts[i],
+                        count_errors,
+                        None if background_counts is None else background_counts[i],
+                        background_count_errors,
+                    )
+
+                parameters_frames = []
+                like_frames = []
+
+                for jl, values in zip(jls, starting_values):
+
+                    # Always start from the same point, and make sure that the plugins use this model
+
+                    for parameter, value in zip(
+                        list(jl.likelihood_model.free_parameters.values()), values
+                    ):
+
+                        parameter.value = value
+
+                    if len(jls) > 1:
+
+                        for dataset in datasets:
+
+                            dataset.set_model(jl.likelihood_model)
+
+                    this_parameter_frame, this_like_frame = _fit(
+                        jl, minimizer, compute_covariance, continue_on_failure
+                    )
+
+                    parameters_frames.append(this_parameter_frame)
+                    like_frames.append(this_like_frame.rename(index=simulated_names))
+
+                if len(jls) > 1:
+
+                    keys = ["model_%i" % x for x in range(len(jls))]
+
+                    parameters_collector.append(
+                        i, pd.concat(parameters_frames, keys=keys)
+                    )
+                    like_collector.append(i, pd.concat(like_frames, keys=keys))
+
+                else:
+
+                    parameters_collector.append(i, parameters_frames[0])
+                    like_collector.append(i, like_frames[0])
+
+                p.increase()
+
+    finally:
+
+        for dataset in datasets:
+
+            dataset.restore_observed_counts()
+
+    return parameters_collector.get_frame(), like_collector.get_frame()
+
+
 class JointLikelihoodSetAnalyzer(object):
     """
     A class to help in offline re-analysis of the results obtained with the JointLikelihoodSet class
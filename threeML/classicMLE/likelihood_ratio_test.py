@@ -7,7 +7,11 @@ import scipy.stats as stats
 from astromodels import clone_model
 
 from threeML.classicMLE.joint_likelihood import JointLikelihood
-from threeML.classicMLE.joint_likelihood_set import JointLikelihoodSet
+from threeML.classicMLE.joint_likelihood_set import (
+    JointLikelihoodSet,
+    fit_simulated_counts,
+    simulate_dataset,
+)
 from threeML.data_list import DataList
 from threeML.exceptions.custom_exceptions import custom_warnings
 from threeML.plugins.OGIPLike import OGIPLike
@@ -66,7 +70,7 @@ class LikelihoodRatioTest(object):
         self._save_pha = False
         self._data_container = []
 
-    def get_simulated_data(self, id):
+    def get_simulated_data(self, id, random_generator=None):
 
         # Generate a new data set for each plugin contained in the data list
 
@@ -79,7 +83,9 @@ class LikelihoodRatioTest(object):
             # JointLikelihood instances
             dataset.set_model(self._joint_likelihood_instance0.likelihood_model)
 
-            new_data = dataset.get_simulated_dataset("%s_sim" % dataset.name)
+            new_data = simulate_dataset(
+                dataset, "%s_sim" % dataset.name, random_generator=random_generator
+            )
 
             new_datas.append(new_data)
 
@@ -101,7 +107,16 @@ class LikelihoodRatioTest(object):
 
         return new_model0, new_model1
 
-    def by_mc(self, n_iterations=1000, continue_on_failure=False, save_pha=False):
+    def by_mc(
+        self,
+        n_iterations=1000,
+        continue_on_failure=False,
+        save_pha=False,
+        in_place=False,
+        seed=None,
+        checkpoint_file=None,
+        resume=False,
+    ):
         """
         Compute the Likelihood Ratio Test by generating Monte Carlo datasets and fitting the current models on them.
         The fraction of synthetic datasets which have a value for the TS larger or equal to the observed one gives
@@ -112,25 +127,113 @@ class LikelihoodRatioTest(object):
         :param continue_of_failure: whether to continue in the case a fit fails (False by default)
         :param save_pha: Saves pha files for reading into XSPEC as a cross check.
          Currently only supports OGIP data. This can become slow! (False by default)
+        :param in_place: if True, draw all the simulated counts at once and swap them into the existing plugins
+        instead of building new plugins for each iteration, reusing the same fitters (much faster for small spectra).
+        Only for plugins supporting it, like SpectrumLike and its children, and not with save_pha. Plugins whose
+        background is modeled with another plugin (background_plugin) are not supported and raise NotImplementedError
+        (False by default)
+        :param seed: (optional) seed for the random numbers. The simulations are reproducible with the same seed,
+        also when running in parallel (default: use the global numpy random state, as set by np.random.seed)
+        :param checkpoint_file: (optional) HDF5 file where the completed simulations are stored during the run (not
+        with in_place=True). See JointLikelihoodSet.go
+        :param resume: continue a run interrupted while using checkpoint_file. Use the same seed to get the same
+        simulations (default: False)
         :return: tuple (null. hyp. probability, TSs, frame with all results, frame with all likelihood values)
         """
 
+        assert not (
+            in_place and save_pha
+        ), "The simulated datasets cannot be saved with in_place=True"
+
+        assert not (
+            in_place and checkpoint_file is not None
+        ), "The checkpoint_file cannot be used with in_place=True"
+
         self._save_pha = save_pha
 
-        # Create the joint likelihood set
-        jl_set = JointLikelihoodSet(
-            self.get_simulated_data,
-            self.get_models,
-            n_iterations,
-            iteration_name="simulation",
-        )
+        if in_place:
+
+            data_list = self._joint_likelihood_instance0.data_list
+
+            # The nuisance parameters of the plugins (e.g., an effective area correction) are shared with the
+            # models used for the fits, so the current values of all the free parameters are restored at the end
+
+            saved_values = []
+
+            for jl in [
+                self._joint_likelihood_instance0,
+                self._joint_likelihood_instance1,
+            ]:
+
+                saved_values.extend(
+                    (parameter, parameter.value)
+                    for parameter in list(jl.likelihood_model.free_parameters.values())
+                )
+
+            for dataset in list(data_list.values()):
+
+                saved_values.extend(
+                    (parameter, parameter.value)
+                    for parameter in list(dataset.nuisance_parameters.values())
+                )
+
+            # Simulate from the best fit of the null hypothesis
+
+            self._joint_likelihood_instance0.restore_best_fit()
+
+            for dataset in list(data_list.values()):
+
+                dataset.set_model(self._joint_likelihood_instance0.likelihood_model)
 
-        # Use the same minimizer as in the first joint likelihood object
+            # without a seed, the plugins use the global numpy random state (e.g., as set by np.random.seed)
 
-        jl_set.set_minimizer(self._joint_likelihood_instance0.minimizer_in_use)
+            random_generator = None if seed is None else np.random.default_rng(seed)
 
-        # Run the set
-        data_frame, like_data_frame = jl_set.go(continue_on_failure=continue_on_failure)
+            try:
+
+                data_frame, like_data_frame = fit_simulated_counts(
+                    data_list,
+                    self.get_models(0),
+                    n_iterations,
+                    self._joint_likelihood_instance0.minimizer_in_use,
+                    continue_on_failure=continue_on_failure,
+                    random_generator=random_generator,
+                )
+
+            finally:
+
+                # the plugins have been assigned to the models used for the fits
+
+                for dataset in list(data_list.values()):
+
+                    dataset.set_model(self._joint_likelihood_instance0.likelihood_model)
+
+                for parameter, value in saved_values:
+
+                    parameter.value = value
+
+        else:
+
+            # Create the joint likelihood set
+            jl_set = JointLikelihoodSet(
+                self.get_simulated_data,
+                self.get_models,
+                n_iterations,
+                iteration_name="simulation",
+                seed=seed,
+            )
+
+            # Use the same minimizer as in the first joint likelihood object
+
+            jl_set.set_minimizer(self._joint_likelihood_instance0.minimizer_in_use)
+
+            # Run the set
+            data_frame, like_data_frame = jl_set.go(
+                continue_on_failure=continue_on_failure,
+                keep_analysis_results=False,
+                checkpoint_file=checkpoint_file,
+                resume=resume,
+            )
 
         # Get the TS values
 
@@ -1,4 +1,6 @@
 from builtins import range
+from builtins import zip
+from builtins import object
 
 __author__ = "grburgess"
 
@@ -7,12 +9,160 @@ from threeML.utils.fitted_objects.fitted_point_sources import (
     FittedPointSourceSpectralHandler,
 )
 from threeML.exceptions.custom_exceptions import custom_warnings
+from threeML.parallel.parallel_client import (
+    ParallelClient,
+    is_parallel_computation_active,
+)
 
 import numpy as np
 import pandas as pd
 import collections
 
 
+class _FittedPointSources(object):
+    def __init__(
+        self,
+        energy_range,
+        energy_unit,
+        flux_unit,
+        confidence_level,
+        equal_tailed,
+        differential,
+    ):
+        """
+        Collects the fitted point sources needed by a flux calculation or a plot, so that they can be
+        computed all at once. The results are cached in the analysis results, so that computing
+        again the same fluxes (for example to plot them with a different style) is immediate (see
+        clear_fitted_point_sources_cache).
+
+        :param energy_range: the energies (or the integration range) of the fluxes
+        :param energy_unit: the energy unit
+        :param flux_unit: the flux unit
+        :param confidence_level: the confidence level of the errors
+        :param equal_tailed: whether to use equal-tailed intervals
+        :param differential: whether the fluxes are differential or integral
+        """
+
+        self._energy_range = energy_range
+        self._energy_unit = energy_unit
+        self._flux_unit = flux_unit
+        self._confidence_level = confidence_level
+        self._equal_tailed = equal_tailed
+        self._differential = differential
+
+        # the energy range can be a Quantity
+
+        energies = np.array(getattr(energy_range, "value", energy_range), dtype=float)
+
+        self._settings = (
+            energies.shape,
+            energies.tobytes(),
+            str(getattr(energy_range, "unit", "")),
+            str(energy_unit),
+            str(flux_unit),
+            confidence_level,
+            equal_tailed,
+            differential,
+        )
+
+        self._requests = []
+
+        self._fitted_point_sources = None
+
+    def add(self, analysis, source, component=None):
+        """
+        Request a fitted point source
+
+        :param analysis: the analysis results
+        :param source: the name of the source
+        :param component: the name of the component (None for the total)
+        :return: an identifier of the request, to be used with get() after compute()
+        """
+
+        self._requests.append((analysis, (source, component) + self._settings))
+
+        return len(self._requests) - 1
+
+    def get(self, request):
+        """
+        Returns the fitted point source corresponding to a request
+
+        :param request: the identifier returned by add()
+        :return: a FittedPointSourceSpectralHandler
+        """
+
+        return self._fitted_point_sources[request]
+
+    def _build(self, analysis, key):
+
+        source, component = key[:2]
+
+        return FittedPointSourceSpectralHandler(
+            analysis,
+            source,
+            self._energy_range,
+            self._energy_unit,
+            self._flux_unit,
+            self._confidence_level,
+            self._equal_tailed,
+            component=component,
+            is_differential_flux=self._differential,
+        )
+
+    def compute(self):
+        """
+        Compute all the requested fitted point sources which are not in the cache yet, in parallel if
+        parallel computation is active
+
+        :return: none
+        """
+
+        self._fitted_point_sources = [
+            analysis._get_cached_fitted_point_source(key)
+            for analysis, key in self._requests
+        ]
+
+        missing = []
+
+        for (analysis, key), fitted_point_source in zip(
+            self._requests, self._fitted_point_sources
+        ):
+
+            if fitted_point_source is None and not any(
+                analysis is other and key == other_key for other, other_key in missing
+            ):
+
+                missing.append((analysis, key))
+
+        if is_parallel_computation_active() and len(missing) > 1:
+
+            def worker(i):
+
+                return self._build(*missing[i])
+
+            client = ParallelClient()
+
+            fitted_point_sources = client.execute_with_progress_bar(
+                worker, list(range(len(missing))), chunk_size=1
+            )
+
+        else:
+
+            fitted_point_sources = [self._build(*request) for request in missing]
+
+        for (analysis, key), fitted_point_source in zip(missing, fitted_point_sources):
+
+            analysis._cache_fitted_point_source(key, fitted_point_source)
+
+            # the cache is bounded, so the results are also kept here until they are used
+
+            for i, (other, other_key) in enumerate(self._requests):
+
+                if analysis is other and key == other_key:
+
+                    self._fitted_point_sources[i] = fitted_point_source
+
+
 def _setup_analysis_dictionaries(
     analysis_results,
     energy_range,
@@ -136,6 +286,18 @@ def _setup_analysis_dictionaries(
                         "component_names": comps,
                     }
 
+    # the fitted point sources are first collected, and then computed all together (in parallel if
+    # possible) or taken from the cache of the analyses if they were already computed
+
+    fitted_point_sources = _FittedPointSources(
+        energy_range,
+        energy_unit,
+        flux_unit,
+        confidence_level,
+        equal_tailed,
+        differential,
+    )
+
     # keep track of the number of sources we will use
 
     num_sources_to_use = 0
@@ -151,15 +313,9 @@ def _setup_analysis_dictionaries(
             or ("total" in components_to_use)
             or (not mle_analyses[key]["component_names"])
         ):
-            mle_analyses[key]["fitted point source"] = FittedPointSourceSpectralHandler(
+            mle_analyses[key]["fitted point source"] = fitted_point_sources.add(
                 mle_analyses[key]["analysis"],
                 mle_analyses[key]["source"],
-                energy_range,
-                energy_unit,
-                flux_unit,
-                confidence_level,
-                equal_tailed=equal_tailed,
-                is_differential_flux=differential,
             )
 
             num_sources_to_use += 1
@@ -178,16 +334,10 @@ def _setup_analysis_dictionaries(
 
                 if not components_to_use:
 
-                    component_dict[component] = FittedPointSourceSpectralHandler(
+                    component_dict[component] = fitted_point_sources.add(
                         mle_analyses[key]["analysis"],
                         mle_analyses[key]["source"],
-                        energy_range,
-                        energy_unit,
-                        flux_unit,
-                        confidence_level,
-                        equal_tailed,
                         component=component,
-                        is_differential_flux=differential,
                     )
 
                     num_components_to_use += 1
@@ -197,16 +347,10 @@ def _setup_analysis_dictionaries(
                     # otherwise pick off only the ones of interest
 
                     if component in components_to_use:
-                        component_dict[component] = FittedPointSourceSpectralHandler(
+                        component_dict[component] = fitted_point_sources.add(
                             mle_analyses[key]["analysis"],
                             mle_analyses[key]["source"],
-                            energy_range,
-                            energy_unit,
-                            flux_unit,
-                            confidence_level,
-                            equal_tailed,
                             component=component,
-                            is_differential_flux=differential,
                         )
 
                         num_components_to_use += 1
@@ -239,17 +383,9 @@ def _setup_analysis_dictionaries(
             or ("total" in components_to_use)
             or (not bayesian_analyses[key]["component_names"])
         ):
-            bayesian_analyses[key][
-                "fitted point source"
-            ] = FittedPointSourceSpectralHandler(
+            bayesian_analyses[key]["fitted point source"] = fitted_point_sources.add(
                 bayesian_analyses[key]["analysis"],
                 bayesian_analyses[key]["source"],
-                energy_range,
-                energy_unit,
-                flux_unit,
-                confidence_level,
-                equal_tailed,
-                is_differential_flux=differential,
             )
 
             num_sources_to_use += 1
@@ -267,16 +403,10 @@ def _setup_analysis_dictionaries(
                 # extracting all components
 
                 if not components_to_use:
-                    component_dict[component] = FittedPointSourceSpectralHandler(
+                    component_dict[component] = fitted_point_sources.add(
                         bayesian_analyses[key]["analysis"],
                         bayesian_analyses[key]["source"],
-                        energy_range,
-                        energy_unit,
-                        flux_unit,
-                        confidence_level,
-                        equal_tailed,
                         component=component,
-                        is_differential_flux=differential,
                     )
 
                     num_components_to_use += 1
@@ -284,16 +414,10 @@ def _setup_analysis_dictionaries(
                 # or just some of them
 
                 if component in components_to_use:
-                    component_dict[component] = FittedPointSourceSpectralHandler(
+                    component_dict[component] = fitted_point_sources.add(
                         bayesian_analyses[key]["analysis"],
                         bayesian_analyses[key]["source"],
-                        energy_range,
-                        energy_unit,
-                        flux_unit,
-                        confidence_level,
-                        equal_tailed,
                         component=component,
-                        is_differential_flux=differential,
                     )
 
                     num_components_to_use += 1
@@ -313,6 +437,27 @@ def _setup_analysis_dictionaries(
         #
         #     num_sources_to_use += 1
 
+    # now compute the fitted point sources and put them in place of the requests
+
+    fitted_point_sources.compute()
+
+    for analyses in (mle_analyses, bayesian_analyses):
+
+        for key in list(analyses.keys()):
+
+            if "fitted point source" in analyses[key]:
+
+                analyses[key]["fitted point source"] = fitted_point_sources.get(
+                    analyses[key]["fitted point source"]
+                )
+
+            if "components" in analyses[key]:
+
+                analyses[key]["components"] = collections.OrderedDict(
+                    (component, fitted_point_sources.get(request))
+                    for component, request in analyses[key]["components"].items()
+                )
+
     # we may have the same source in a bayesian and mle analysis.
     # we want to plot them, but make sure to label them differently.
     # so let's keep track of them
@@ -57,6 +57,11 @@ class ROOTMinimizer(LocalMinimizer):
 
     valid_setup_keys = ("ftol", "max_function_calls", "strategy")
 
+    # Minuit2Minimizer::Hesse computes the covariance after the fit (see
+    # _get_backend_covariance_matrix)
+
+    default_covariance_method = "backend"
+
     def __init__(self, function, parameters, verbosity=0, setup_dict=None):
 
         super(ROOTMinimizer, self).__init__(function, parameters, verbosity, setup_dict)
@@ -159,7 +164,7 @@ class ROOTMinimizer(LocalMinimizer):
 
         return best_fit_values, minimum
 
-    def _compute_covariance_matrix(self, best_fit_values):
+    def _get_backend_covariance_matrix(self, best_fit_values):
 
         # Gather the current status so we can offset it later
         status_before_hesse = self.minimizer.Status()
@@ -16,6 +16,10 @@ class GridMinimizer(GlobalMinimizer):
 
     valid_setup_keys = ("grid", "second_minimization", "callbacks")
 
+    # The covariance matrix is obtained from the local minimizer which found the best minimum
+
+    default_covariance_method = "backend"
+
     def __init__(self, function, parameters, verbosity=1):
 
         self._grid = collections.OrderedDict()
@@ -33,6 +37,9 @@ class GridMinimizer(GlobalMinimizer):
         # This list will contain callbacks, if any
         self._callbacks = []
 
+        # This will contain the instance of the local minimizer which found the overall minimum
+        self._best_minimizer = None
+
     def _setup(self, user_setup_dict):
 
         if user_setup_dict is None:
@@ -164,6 +171,7 @@ class GridMinimizer(GlobalMinimizer):
 
         overall_minimum = 1e20
         internal_best_fit_values = None
+        self._best_minimizer = None
 
         n_iterations = np.prod([x.shape for x in list(self._grid.values())])
 
@@ -193,7 +201,10 @@ class GridMinimizer(GlobalMinimizer):
                 # point for the fit
 
                 _minimizer = self._2nd_minimization.get_instance(
-                    self.function, self.parameters, verbosity=0
+                    self.function,
+                    self.parameters,
+                    verbosity=0,
+                    gradient=self.gradient,
                 )
 
                 # Perform fit
@@ -218,6 +229,7 @@ class GridMinimizer(GlobalMinimizer):
 
                     overall_minimum = this_minimum
                     internal_best_fit_values = this_best_fit_values_internal
+                    self._best_minimizer = _minimizer
 
                 # Use callbacks (if any)
                 for callback in self._callbacks:
@@ -231,3 +243,18 @@ class GridMinimizer(GlobalMinimizer):
             raise AllFitFailed("All fit starting from values in the grid have failed!")
 
         return internal_best_fit_values, overall_minimum
+
+    def _get_backend_covariance_matrix(self, best_fit_values):
+
+        if self._best_minimizer is None:
+
+            return None
+
+        # Let the local minimizer compute the covariance with its own method. Make sure its parameters
+        # are at the best fit first, as other points of the grid have been explored after it
+
+        for i, parameter in enumerate(self.parameters.values()):
+
+            parameter._set_internal_value(best_fit_values[i])
+
+        return self._best_minimizer._compute_covariance_matrix(best_fit_values)
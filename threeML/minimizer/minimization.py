@@ -11,8 +11,17 @@ import pandas as pd
 import scipy.optimize
 
 from threeML.io.progress_bar import progress_bar
+from threeML.parallel.parallel_client import (
+    ParallelClient,
+    is_parallel_computation_active,
+)
 from threeML.exceptions.custom_exceptions import custom_warnings
-from threeML.utils.differentiation import get_hessian, ParameterOnBoundary
+from threeML.utils.differentiation import (
+    get_hessian,
+    get_fast_hessian,
+    get_richardson_hessian,
+    ParameterOnBoundary,
+)
 
 # Set the warnings to be issued always for this module
 
@@ -22,6 +31,15 @@ custom_warnings.simplefilter("always", RuntimeWarning)
 # Special constants
 FIT_FAILED = 1e12
 
+# Methods available to compute the covariance matrix after the fit:
+# * backend: use the curvature estimate of the minimizer itself (for example HESSE for MINUIT), if available
+# * fast: fixed-step central-difference Hessian (2 * n_par**2 + 1 evaluations of the likelihood)
+# * richardson: central differences with two steps combined with a Richardson extrapolation
+#   (4 * n_par**2 + 2 evaluations of the likelihood, done as one batch)
+# * numdifftools: adaptive numerical Hessian computed with numdifftools (accurate, but expensive)
+# The stencils of "fast" and "richardson" can be evaluated on the parallel engines, if requested
+_covariance_methods = ("backend", "fast", "richardson", "numdifftools")
+
 
 # Define a bunch of custom exceptions relevant for what is being accomplished here
 
@@ -336,6 +354,8 @@ class _Minimization(object):
         self._minimizer_type = get_minimizer(minimizer_type=minimizer_type)
 
         self._algorithm = None
+        self._covariance_method = None
+        self._parallel_covariance = False
         self._setup_dict = {}
 
     def setup(self, **setup_dict):
@@ -357,30 +377,66 @@ class _Minimization(object):
 
         self._algorithm = algorithm
 
+    def set_covariance_method(self, method, parallel=False):
+        """
+        Set the method used to compute the covariance matrix at the end of the fit. Use None to go back
+        to the default for the minimizer.
 
-class LocalMinimization(_Minimization):
-    def __init__(self, minimizer_type):
-
-        super(LocalMinimization, self).__init__(minimizer_type)
+        :param method: one of 'backend', 'fast', 'richardson', 'numdifftools' (or None)
+        :param parallel: whether to evaluate the likelihood on the points of the 'fast' or 'richardson'
+        stencils using the parallel engines (the likelihood and its plugins must be picklable). Default: False
+        :return: none
+        """
 
-        assert issubclass(self._minimizer_type, LocalMinimizer), (
-            "Minimizer %s is not a local minimizer" % minimizer_type
+        assert method is None or method in _covariance_methods, (
+            "Covariance method must be one of %s" % ",".join(_covariance_methods)
         )
 
-    def get_instance(self, *args, **kwargs):
+        self._covariance_method = method
+        self._parallel_covariance = bool(parallel)
 
-        instance = self._minimizer_type(*args, **kwargs)
+    def _configure_instance(self, instance, gradient=None):
+
+        # The gradient needs to be set before the setup, as some minimizers use it there
+
+        if gradient is not None:
+
+            instance.set_gradient(gradient)
 
         if self._algorithm is not None:
 
             instance.set_algorithm(self._algorithm)
 
+        if self._covariance_method is not None:
+
+            instance.set_covariance_method(
+                self._covariance_method, self._parallel_covariance
+            )
+
         # Set up the minimizer
         instance._setup(self._setup_dict)
 
         return instance
 
 
+class LocalMinimization(_Minimization):
+    def __init__(self, minimizer_type):
+
+        super(LocalMinimization, self).__init__(minimizer_type)
+
+        assert issubclass(self._minimizer_type, LocalMinimizer), (
+            "Minimizer %s is not a local minimizer" % minimizer_type
+        )
+
+    def get_instance(self, *args, **kwargs):
+
+        gradient = kwargs.pop("gradient", None)
+
+        instance = self._minimizer_type(*args, **kwargs)
+
+        return self._configure_instance(instance, gradient)
+
+
 class GlobalMinimization(_Minimization):
     def __init__(self, minimizer_type):
 
@@ -409,19 +465,20 @@ class GlobalMinimization(_Minimization):
 
     def get_instance(self, *args, **kwargs):
 
+        gradient = kwargs.pop("gradient", None)
+
         instance = self._minimizer_type(*args, **kwargs)
 
-        if self._algorithm is not None:
+        return self._configure_instance(instance, gradient)
 
-            instance.set_algorithm(self._algorithm)
 
-        # Set up the minimizer
-        instance._setup(self._setup_dict)
+class Minimizer(object):
 
-        return instance
+    # Method used to compute the covariance matrix if the user does not choose one. Minimizers
+    # providing a trustworthy estimate of the curvature at the minimum should use "backend"
 
+    default_covariance_method = "numdifftools"
 
-class Minimizer(object):
     def __init__(self, function, parameters, verbosity=1, setup_dict=None):
         """
 
@@ -439,6 +496,12 @@ class Minimizer(object):
         self._Npar = len(list(self.parameters.keys()))
         self._verbosity = verbosity
 
+        self._covariance_method = self.default_covariance_method
+        self._parallel_covariance = False
+
+        # Function returning the gradient of the function to be minimized (if available)
+        self._gradient = None
+
         self._setup(setup_dict)
 
         self._fit_results = None
@@ -599,6 +662,47 @@ class Minimizer(object):
 
         return self._algorithm_name
 
+    @property
+    def covariance_method(self):
+
+        return self._covariance_method
+
+    def set_covariance_method(self, method, parallel=False):
+        """
+        Set the method used to compute the covariance matrix at the end of the fit.
+
+        :param method: one of 'backend' (use the estimate provided by the minimizer itself, if any), 'fast'
+        (fixed-step central differences), 'richardson' (central differences with two steps and a Richardson
+        extrapolation) or 'numdifftools' (adaptive numerical differentiation)
+        :param parallel: whether to evaluate the likelihood on the points of the 'fast' or 'richardson'
+        stencils using the parallel engines (the likelihood and its plugins must be picklable). Default: False
+        :return: none
+        """
+
+        assert method in _covariance_methods, (
+            "Covariance method must be one of %s" % ",".join(_covariance_methods)
+        )
+
+        self._covariance_method = method
+        self._parallel_covariance = bool(parallel)
+
+    @property
+    def gradient(self):
+
+        return self._gradient
+
+    def set_gradient(self, gradient):
+        """
+        Set a function returning the gradient of the function to be minimized with respect to the internal
+        values of the parameters. It must have the same calling sequence as the function. Minimizers which
+        can use it (for example scipy and iminuit) will do so instead of computing the gradient numerically.
+
+        :param gradient: the function returning the gradient (or None to go back to numerical derivatives)
+        :return: none
+        """
+
+        self._gradient = gradient
+
     def minimize(self, compute_covar=True):
         """
         Minimize objective function. This call _minimize, which is implemented by each subclass.
@@ -784,6 +888,16 @@ class Minimizer(object):
         # Regenerate the internal parameter dictionary with the new values
         self._internal_parameters = self._update_internal_parameter_dictionary()
 
+    def _get_backend_covariance_matrix(self, best_fit_values):
+        """
+        Override this if the minimizer provides its own estimate of the covariance matrix at the minimum
+        (for example from the curvature information accumulated during the minimization).
+
+        :return: the covariance matrix, or None if the minimizer does not provide one
+        """
+
+        return None
+
     def _compute_covariance_matrix(self, best_fit_values):
         """
         This function compute the approximate covariance matrix as the inverse of the Hessian matrix,
@@ -793,11 +907,39 @@ class Minimizer(object):
         The sqrt of the diagonal of the result is an accurate estimate of the errors only if the
         log.likelihood is parabolic in the neighborhood of the minimum.
 
-        Derivatives are computed numerically.
+        Depending on the covariance method, the estimate provided by the minimizer is used, or
+        derivatives are computed numerically.
 
         :return: the covariance matrix
         """
 
+        if self._covariance_method == "backend":
+
+            covariance_matrix = self._get_backend_covariance_matrix(best_fit_values)
+
+            if covariance_matrix is not None:
+
+                return covariance_matrix
+
+            custom_warnings.warn(
+                "Minimizer %s does not provide a covariance matrix. Computing it numerically."
+                % type(self).__name__
+            )
+
+            get_hessian_function = get_hessian
+
+        elif self._covariance_method == "fast":
+
+            get_hessian_function = get_fast_hessian
+
+        elif self._covariance_method == "richardson":
+
+            get_hessian_function = get_richardson_hessian
+
+        else:
+
+            get_hessian_function = get_hessian
+
         minima = [
             parameter._get_internal_min_value()
             for parameter in list(self.parameters.values())
@@ -829,7 +971,21 @@ class Minimizer(object):
 
         try:
 
-            hessian_matrix = get_hessian(self.function, best_fit_values, minima, maxima)
+            if get_hessian_function is get_hessian:
+
+                hessian_matrix = get_hessian(
+                    self.function, best_fit_values, minima, maxima
+                )
+
+            else:
+
+                # One client for all the points of the stencil, if the user asked for it
+
+                client = ParallelClient() if self._parallel_covariance else None
+
+                hessian_matrix = get_hessian_function(
+                    self.function, best_fit_values, minima, maxima, client=client
+                )
 
         except ParameterOnBoundary:
 
@@ -879,190 +1035,190 @@ class Minimizer(object):
 
         return covariance_matrix
 
-    def _get_one_error(self, parameter_name, target_delta_log_like, sign=-1):
+    def _search_one_error(self, parameter_name, target_delta_log_like, sign=-1):
         """
-        A generic procedure to numerically compute the error for the parameters. You can override this if the
-        minimizer provides its own method to compute the error of one parameter. If it provides a method to compute
-        all errors are once, override the _get_errors method instead.
+        Search for the error of one parameter in one direction, starting from the best fit. This does not restart
+        when a better minimum is found, it just reports it to the caller.
 
         :param parameter_name:
         :param target_delta_log_like:
         :param sign:
-        :return:
+        :return: a tuple (error, better_minimum), where better_minimum is None or a tuple (internal values,
+        minimum of the function) if a better minimum has been found during the search (in which case error is nan)
         """
 
-        # Since the procedure might find a better minimum, we can repeat it
-        # up to a maximum of 10 times
-
-        repeats = 0
+        # Restore best fit (which also updates the internal parameter dictionary)
 
-        while repeats < 10:
-
-            # Let's start optimistic...
-
-            repeat = False
-
-            repeats += 1
+        self.restore_best_fit()
 
-            # Restore best fit (which also updates the internal parameter dictionary)
+        # NOTE: the internal dictionary is keyed by the current path of the parameters, which might differ
+        # from the name used in self.parameters when the minimizer has been serialized (for example to be
+        # sent to a parallel engine), so we go through the parameter itself
 
-            self.restore_best_fit()
+        (
+            current_value,
+            current_delta,
+            current_min,
+            current_max,
+        ) = self._internal_parameters[self.parameters[parameter_name].path]
 
-            (
-                current_value,
-                current_delta,
-                current_min,
-                current_max,
-            ) = self._internal_parameters[parameter_name]
+        best_fit_value = current_value
 
-            best_fit_value = current_value
+        if sign == -1:
 
-            if sign == -1:
+            extreme_allowed = current_min
 
-                extreme_allowed = current_min
+        else:
 
-            else:
+            extreme_allowed = current_max
 
-                extreme_allowed = current_max
+        # If the parameter has no boundary in the direction we are sampling, put a hard limit on
+        # 10 times the current value (to avoid looping forever)
 
-            # If the parameter has no boundary in the direction we are sampling, put a hard limit on
-            # 10 times the current value (to avoid looping forever)
+        if extreme_allowed is None:
 
-            if extreme_allowed is None:
+            extreme_allowed = best_fit_value + sign * 10 * abs(best_fit_value)
 
-                extreme_allowed = best_fit_value + sign * 10 * abs(best_fit_value)
+        # We need to look for a value for the parameter where the difference between the minimum of the
+        # log-likelihood and the likelihood for that value differs by more than target_delta_log_likelihood.
+        # This is needed by the root-finding procedure, which needs to know an interval where the biased likelihood
+        # function (see below) changes sign
 
-            # We need to look for a value for the parameter where the difference between the minimum of the
-            # log-likelihood and the likelihood for that value differs by more than target_delta_log_likelihood.
-            # This is needed by the root-finding procedure, which needs to know an interval where the biased likelihood
-            # function (see below) changes sign
+        trials = best_fit_value + sign * np.linspace(0.1, 0.9, 9) * abs(best_fit_value)
 
-            trials = best_fit_value + sign * np.linspace(0.1, 0.9, 9) * abs(
-                best_fit_value
-            )
+        trials = np.append(trials, extreme_allowed)
 
-            trials = np.append(trials, extreme_allowed)
+        # Make sure we don't go below the allowed minimum or above the allowed maximum
 
-            # Make sure we don't go below the allowed minimum or above the allowed maximum
+        if sign == -1:
 
-            if sign == -1:
+            np.clip(trials, extreme_allowed, np.inf, trials)
 
-                np.clip(trials, extreme_allowed, np.inf, trials)
+        else:
 
-            else:
+            np.clip(trials, -np.inf, extreme_allowed, trials)
 
-                np.clip(trials, -np.inf, extreme_allowed, trials)
+        # There might be more than one value which was below the minimum (or above the maximum), so let's
+        # take only unique elements
 
-            # There might be more than one value which was below the minimum (or above the maximum), so let's
-            # take only unique elements
+        trials = np.unique(trials)
 
-            trials = np.unique(trials)
+        trials.sort()
 
-            trials.sort()
+        if sign == -1:
 
-            if sign == -1:
+            trials = trials[::-1]
 
-                trials = trials[::-1]
+        # At this point we have a certain number of unique trials which always
+        # contain the allowed minimum (or maximum)
 
-            # At this point we have a certain number of unique trials which always
-            # contain the allowed minimum (or maximum)
+        minimum_bound = None
+        maximum_bound = None
 
-            minimum_bound = None
-            maximum_bound = None
+        # Instance the profile likelihood function
+        pl = ProfileLikelihood(self, [parameter_name])
 
-            # Instance the profile likelihood function
-            pl = ProfileLikelihood(self, [parameter_name])
+        for i, trial in enumerate(trials):
 
-            for i, trial in enumerate(trials):
+            this_log_like = pl([trial])
 
-                this_log_like = pl([trial])
+            delta = this_log_like - self._m_log_like_minimum
 
-                delta = this_log_like - self._m_log_like_minimum
+            if delta < -0.1:
 
-                if delta < -0.1:
+                custom_warnings.warn(
+                    "Found a better minimum (%.2f) for %s = %s during error "
+                    "computation." % (this_log_like, parameter_name, trial),
+                    BetterMinimumDuringProfiling,
+                )
 
-                    custom_warnings.warn(
-                        "Found a better minimum (%.2f) for %s = %s during error "
-                        "computation." % (this_log_like, parameter_name, trial),
-                        BetterMinimumDuringProfiling,
-                    )
+                xs = [x._get_internal_value() for x in list(self.parameters.values())]
 
-                    xs = [x.value for x in list(self.parameters.values())]
+                return np.nan, (xs, this_log_like)
 
-                    self._store_fit_results(xs, this_log_like, None)
+            if delta > target_delta_log_like:
 
-                    repeat = True
+                bound1 = trial
 
-                    break
+                if i > 0:
 
-                if delta > target_delta_log_like:
+                    bound2 = trials[i - 1]
 
-                    bound1 = trial
+                else:
 
-                    if i > 0:
+                    bound2 = best_fit_value
 
-                        bound2 = trials[i - 1]
+                minimum_bound = min(bound1, bound2)
+                maximum_bound = max(bound1, bound2)
 
-                    else:
+                break
 
-                        bound2 = best_fit_value
+        if minimum_bound is None:
 
-                    minimum_bound = min(bound1, bound2)
-                    maximum_bound = max(bound1, bound2)
+            # Cannot find error in this direction (it's probably outside the allowed boundaries)
+            custom_warnings.warn(
+                "Cannot find boundary for parameter %s" % parameter_name,
+                CannotComputeErrors,
+            )
 
-                    repeat = False
+            return np.nan, None
 
-                    break
+        # Define the "biased likelihood", since brenq only finds zeros of function
 
-            if repeat:
+        biased_likelihood = (
+            lambda x: pl(x) - self._m_log_like_minimum - target_delta_log_like
+        )
 
-                # We found a better minimum, restart from scratch
+        try:
 
-                custom_warnings.warn("Restarting search...", RuntimeWarning)
+            precise_bound = scipy.optimize.brentq(
+                biased_likelihood,
+                minimum_bound,
+                maximum_bound,
+                xtol=1e-5,
+                maxiter=1000,
+            )  # type: float
+        except:
 
-                continue
+            custom_warnings.warn(
+                "Cannot find boundary for parameter %s" % parameter_name,
+                CannotComputeErrors,
+            )
 
-            if minimum_bound is None:
+            return np.nan, None
 
-                # Cannot find error in this direction (it's probably outside the allowed boundaries)
-                custom_warnings.warn(
-                    "Cannot find boundary for parameter %s" % parameter_name,
-                    CannotComputeErrors,
-                )
+        return precise_bound - best_fit_value, None
 
-                error = np.nan
-                break
+    def _get_one_error(self, parameter_name, target_delta_log_like, sign=-1):
+        """
+        A generic procedure to numerically compute the error for the parameters. You can override this if the
+        minimizer provides its own method to compute the error of one parameter. If it provides a method to compute
+        all errors are once, override the _get_errors method instead.
 
-            else:
+        :param parameter_name:
+        :param target_delta_log_like:
+        :param sign:
+        :return:
+        """
 
-                # Define the "biased likelihood", since brenq only finds zeros of function
+        # Since the procedure might find a better minimum, we can repeat it
+        # up to a maximum of 10 times
 
-                biased_likelihood = (
-                    lambda x: pl(x) - self._m_log_like_minimum - target_delta_log_like
-                )
+        for repeats in range(10):
 
-                try:
+            error, better_minimum = self._search_one_error(
+                parameter_name, target_delta_log_like, sign
+            )
 
-                    precise_bound = scipy.optimize.brentq(
-                        biased_likelihood,
-                        minimum_bound,
-                        maximum_bound,
-                        xtol=1e-5,
-                        maxiter=1000,
-                    )  # type: float
-                except:
+            if better_minimum is None:
 
-                    custom_warnings.warn(
-                        "Cannot find boundary for parameter %s" % parameter_name,
-                        CannotComputeErrors,
-                    )
+                break
 
-                    error = np.nan
-                    break
+            # We found a better minimum, restart from scratch
 
-                error = precise_bound - best_fit_value
+            self._store_fit_results(better_minimum[0], better_minimum[1], None)
 
-                break
+            custom_warnings.warn("Restarting search...", RuntimeWarning)
 
         return error
 
@@ -1092,11 +1248,11 @@ class Minimizer(object):
             if parameter.has_transformation():
 
                 _, negative_error_external = parameter.internal_to_external_delta(
-                    best_fit_values[parameter.path], negative_error
+                    best_fit_values[par_name], negative_error
                 )
 
                 _, positive_error_external = parameter.internal_to_external_delta(
-                    best_fit_values[parameter.path], positive_error
+                    best_fit_values[par_name], positive_error
                 )
 
                 errors_dict[par_name] = (
@@ -1123,6 +1279,10 @@ class Minimizer(object):
 
         target_delta_log_like = 0.5
 
+        if is_parallel_computation_active():
+
+            return self._get_errors_parallel(target_delta_log_like)
+
         errors = collections.OrderedDict()
 
         with progress_bar(2 * len(self.parameters), title="Computing errors") as p:
@@ -1145,6 +1305,61 @@ class Minimizer(object):
 
         return errors
 
+    def _get_errors_parallel(self, target_delta_log_like):
+        """
+        Compute the errors by distributing the 2 * n_par searches (one per parameter and direction) among the
+        engines. Each engine works on its own copy of the minimizer. If any of the searches finds a better minimum,
+        the best fit is updated with the best one among those found and all searches are restarted.
+
+        :param target_delta_log_like:
+        :return: a ordered dictionary parameter_path -> (negative_error, positive_error)
+        """
+
+        tasks = [
+            (parameter_name, sign)
+            for parameter_name in self.parameters
+            for sign in (-1, +1)
+        ]
+
+        def worker(task):
+
+            parameter_name, sign = task
+
+            return self._search_one_error(parameter_name, target_delta_log_like, sign)
+
+        client = ParallelClient()
+
+        # Since the procedure might find a better minimum, we can repeat it
+        # up to a maximum of 10 times
+
+        for repeats in range(10):
+
+            results = client.execute_with_progress_bar(worker, tasks, chunk_size=1)
+
+            better_minima = [x[1] for x in results if x[1] is not None]
+
+            if len(better_minima) == 0:
+
+                break
+
+            # Use the best among the new minima and restart all searches from there
+
+            best_values, best_minimum = min(better_minima, key=lambda x: x[1])
+
+            self._store_fit_results(best_values, best_minimum, None)
+
+            self.restore_best_fit()
+
+            custom_warnings.warn("Restarting search...", RuntimeWarning)
+
+        errors = collections.OrderedDict()
+
+        for i, parameter_name in enumerate(self.parameters):
+
+            errors[parameter_name] = (results[2 * i][0], results[2 * i + 1][0])
+
+        return errors
+
     def contours(
         self,
         param_1,
@@ -51,6 +51,10 @@ class MinuitMinimizer(LocalMinimizer):
 
     valid_setup_keys = ("ftol",)
 
+    # iminuit's hesse() already gives the covariance, no need for numerical derivatives
+
+    default_covariance_method = "backend"
+
     # NOTE: this class is built to be able to work both with iMinuit and with a boost interface to SEAL
     # minuit, i.e., it does not rely on functionality that iMinuit provides which is not of the original
     # minuit. This makes the implementation a little bit more cumbersome, but more adaptable if we want
@@ -130,6 +134,12 @@ class MinuitMinimizer(LocalMinimizer):
         # # so it will be able to use the 'self' pointer
         # add_method(self, _f, "_f")
 
+        # Use the analytic gradient, if we have one
+
+        if self.gradient is not None:
+
+            iminuit_init_parameters["grad"] = self.gradient
+
         # Finally we can instance the Minuit class
         self.minuit = Minuit(self.function, **iminuit_init_parameters)
 
@@ -265,8 +275,8 @@ class MinuitMinimizer(LocalMinimizer):
 
             return best_fit_values, self._last_migrad_results[0]["fval"]
 
-    # Override the default _compute_covariance_matrix
-    def _compute_covariance_matrix(self, best_fit_values):
+    # Use HESSE to get the covariance matrix
+    def _get_backend_covariance_matrix(self, best_fit_values):
 
         self.minuit.hesse()
 
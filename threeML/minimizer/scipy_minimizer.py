@@ -16,6 +16,9 @@ class ScipyMinimizer(LocalMinimizer):
 
     def __init__(self, function, parameters, verbosity=10, setup_dict=None):
 
+        # This will contain the inverse Hessian estimated by the solver (if it provides one)
+        self._solver_inverse_hessian = None
+
         super(ScipyMinimizer, self).__init__(
             function, parameters, verbosity, setup_dict
         )
@@ -103,7 +106,13 @@ class ScipyMinimizer(LocalMinimizer):
 
                 return np.inf
 
-            jacv = get_jacobian(wrapper_2, x, minima, maxima)
+            if self.gradient is not None:
+
+                jacv = np.array(self.gradient(*x))
+
+            else:
+
+                jacv = get_jacobian(wrapper_2, x, minima, maxima)
 
             return jacv
 
@@ -125,8 +134,26 @@ class ScipyMinimizer(LocalMinimizer):
                 % (res.message, res.status)
             )
 
+        # Keep the inverse Hessian of the solver only if it is a full matrix. L-BFGS-B only provides a
+        # low-rank limited-memory approximation (a LinearOperator), which is not a reliable covariance
+        # matrix, so in that case the numerical Hessian is used instead
+
+        hess_inv = getattr(res, "hess_inv", None)
+
+        if isinstance(hess_inv, np.ndarray):
+
+            self._solver_inverse_hessian = np.array(hess_inv)
+
+        else:
+
+            self._solver_inverse_hessian = None
+
         # Transform the result to numpy.array
 
         best_fit_values = np.array(res.x)
 
         return best_fit_values, float(res.fun)
+
+    def _get_backend_covariance_matrix(self, best_fit_values):
+
+        return self._solver_inverse_hessian
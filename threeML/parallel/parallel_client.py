@@ -252,7 +252,33 @@ if has_parallel:
 
             return self._current_amr
 
-        def execute_with_progress_bar(self, worker, items, chunk_size=None):
+        def execute(self, worker, items, chunk_size=None):
+            """
+            Apply the worker to all the items using the engines, and return the results in the same order
+            as the items (without displaying any progress)
+
+            :param worker: the function to be applied
+            :param items: the items to apply the function to
+            :param chunk_size: how many items an engine should process before reporting back (None for automatic)
+            :return: a list with the results
+            """
+
+            amr = self._interactive_map(
+                worker, items, ordered=True, chunk_size=chunk_size
+            )
+
+            return list(amr)
+
+        def execute_as_completed(self, worker, items, chunk_size=None):
+            """
+            Apply the worker to all the items using the engines, and yield the results as soon as they are available
+            (in no particular order), so that they can be processed one at a time
+
+            :param worker: the function to be applied
+            :param items: the items to apply the function to
+            :param chunk_size: how many items an engine should process before reporting back (None for automatic)
+            :return: a generator of (index of the item, result) tuples
+            """
 
             # Let's make a wrapper which will allow us to recover the order
             def wrapper(x):
@@ -263,17 +289,23 @@ if has_parallel:
 
             items_wrapped = [(i, item) for i, item in enumerate(items)]
 
+            amr = self._interactive_map(
+                wrapper, items_wrapped, ordered=False, chunk_size=chunk_size
+            )
+
+            for res in amr:
+
+                yield res
+
+        def execute_with_progress_bar(self, worker, items, chunk_size=None):
+
             n_iterations = len(items)
 
             with progress_bar(n_iterations) as p:
 
-                amr = self._interactive_map(
-                    wrapper, items_wrapped, ordered=False, chunk_size=chunk_size
-                )
-
                 results = []
 
-                for i, res in enumerate(amr):
+                for res in self.execute_as_completed(worker, items, chunk_size):
 
                     results.append(res)
 
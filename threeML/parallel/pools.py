@@ -0,0 +1,190 @@
+import multiprocessing
+
+from threeML.config.config import threeML_config
+from threeML.parallel.parallel_client import ParallelClient
+
+try:
+
+    # see if we have mpi and/or are using parallel
+
+    from mpi4py import MPI
+
+    if MPI.COMM_WORLD.Get_size() > 1:  # need parallel capabilities
+        using_mpi = True
+
+        from mpi4py.futures import MPIPoolExecutor
+
+    else:
+
+        using_mpi = False
+except:
+
+    using_mpi = False
+
+
+_POOL_KINDS = ("serial", "multiprocessing", "mpi", "ipyparallel")
+
+# The function evaluated by the workers. It is sent once to each worker when the pool starts, so that the
+# state it carries (for example the plugins of a likelihood) does not need to be pickled at each call
+
+_worker_function = None
+
+
+def _initialize_worker(function):
+
+    global _worker_function
+
+    _worker_function = function
+
+
+def _evaluate_worker_function(item):
+
+    return _worker_function(item)
+
+
+def get_default_pool_kind():
+    """
+    The kind of pool to use when not specified: ipyparallel if the parallel computation is active (see
+    parallel_computation), MPI if running under MPI with more than one process, serial otherwise
+
+    :return: one of "serial", "multiprocessing", "mpi", "ipyparallel"
+    """
+
+    if threeML_config["parallel"]["use-parallel"]:
+
+        return "ipyparallel"
+
+    elif using_mpi:
+
+        return "mpi"
+
+    else:
+
+        return "serial"
+
+
+class WorkerPool(object):
+    def __init__(self, function, kind=None, n_workers=None):
+        """
+        A pool of workers which always evaluate the same function, with a map method which can be used as the pool
+        of the samplers (emcee, zeus...). The function is sent to each worker only once, when the pool starts,
+        so only the arguments and the results travel between the processes at each map.
+
+        Use it as a context manager, so that the workers are shut down at the end:
+
+        > with WorkerPool(sampler.get_posterior, "multiprocessing", 4) as pool:
+        >     ...
+
+        :param function: the function to be evaluated by the workers
+        :param kind: "serial", "multiprocessing" (local processes), "mpi" (needs mpi4py) or "ipyparallel" (needs a
+        running cluster). If None, see get_default_pool_kind
+        :param n_workers: the number of workers (only for multiprocessing and mpi. Default: all the available CPUs)
+        """
+
+        if kind is None:
+
+            kind = get_default_pool_kind()
+
+        assert kind in _POOL_KINDS, "The kind of pool must be one of %s" % ", ".join(
+            _POOL_KINDS
+        )
+
+        assert kind != "mpi" or using_mpi, (
+            "You need mpi4py and more than one MPI process to use a MPI pool"
+        )
+
+        self._function = function
+        self._kind = kind
+        self._n_workers = n_workers
+
+        self._pool = None
+
+        self._view = None
+
+    @property
+    def kind(self):
+
+        return self._kind
+
+    def start(self):
+        """
+        Start the workers and send them the function
+
+        :return: none
+        """
+
+        if self._kind == "multiprocessing":
+
+            self._pool = multiprocessing.Pool(
+                self._n_workers,
+                initializer=_initialize_worker,
+                initargs=(self._function,),
+            )
+
+        elif self._kind == "mpi":
+
+            self._pool = MPIPoolExecutor(
+                max_workers=self._n_workers,
+                initializer=_initialize_worker,
+                initargs=(self._function,),
+            )
+
+        elif self._kind == "ipyparallel":
+
+            self._view = ParallelClient()[:]
+
+            self._view.apply_sync(_initialize_worker, self._function)
+
+    def map(self, function, items):
+        """
+        Evaluate the function of the pool on all the items. The function argument is there only for compatibility
+        with the interface expected by the samplers: it must be equivalent to the function of the pool, and it is not
+        sent to the workers
+
+        :param function: (ignored) the function to evaluate
+        :param items: the items to process
+        :return: a list with the results, in the same order as the items
+        """
+
+        if self._kind == "serial":
+
+            return list(map(self._function, items))
+
+        elif self._kind == "ipyparallel":
+
+            return self._view.map_sync(_evaluate_worker_function, items)
+
+        else:
+
+            assert self._pool is not None, "You have to start the pool first"
+
+            return list(self._pool.map(_evaluate_worker_function, items))
+
+    def close(self):
+        """
+        Shut down the workers
+
+        :return: none
+        """
+
+        if self._kind == "multiprocessing" and self._pool is not None:
+
+            self._pool.close()
+            self._pool.join()
+
+        elif self._kind == "mpi" and self._pool is not None:
+
+            self._pool.shutdown()
+
+        self._pool = None
+        self._view = None
+
+    def __enter__(self):
+
+        self.start()
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.close()
@@ -198,3 +198,82 @@ class PluginPrototype(with_metaclass(abc.ABCMeta, object)):
         logLike value.
         """
         pass
+
+    ######################################################################
+    # The following methods can optionally be implemented by each plugin
+    ######################################################################
+
+    def get_pointwise_log_like(self):
+        """
+        Return the log-likelihood of each data point (for example of each channel of a spectrum) with the current
+        values of the parameters. Their sum must be the value returned by get_log_like. This is used to compute the
+        WAIC while sampling the posterior. Plugins which cannot split the log-likelihood return None (the default).
+
+        :return: a numpy array, or None
+        """
+
+        return None
+
+    def has_log_like_gradient(self):
+        """
+        Return whether get_log_like_gradient can compute the gradient of the log-likelihood with the current
+        settings of the plugin. The joint likelihood uses the analytic gradient only if all plugins declare it.
+        Plugins which implement get_log_like_gradient must override this (the default is False).
+
+        :return: True or False
+        """
+
+        return False
+
+    def get_log_like_gradient(self, parameters):
+        """
+        Return the gradient of the log-likelihood (as returned by inner_fit) with respect to the internal
+        values of the provided free parameters, with the current values for the parameters. Plugins which
+        cannot compute it return None (the default), in which case the derivatives are computed numerically
+        on the total likelihood.
+
+        :param parameters: ordered dictionary of free parameters
+        :return: a numpy array with the gradient (in the same order as parameters), or None
+        """
+
+        return None
+
+    def depends_on_parameter(self, parameter_name):
+        """
+        Return whether the log-likelihood of this plugin might depend on the given free parameter of the
+        likelihood model. The joint likelihood uses this to avoid re-evaluating plugins when only parameters
+        not affecting them have changed. Plugins which cannot tell return True (the default).
+
+        :param parameter_name: the path of the parameter in the likelihood model
+        :return: True or False
+        """
+
+        return True
+
+    @staticmethod
+    def _source_depends_on_parameter(likelihood_model, source_name, parameter_name):
+        """
+        Helper for plugins which have been assigned to one source of the likelihood model: the parameters of the
+        other sources do not affect the assigned source, unless the latter has linked parameters
+
+        :param likelihood_model: the likelihood model
+        :param source_name: the name of the assigned source
+        :param parameter_name: the path of the parameter in the likelihood model
+        :return: True or False
+        """
+
+        this_source_name = parameter_name.split(".")[0]
+
+        if (
+            this_source_name not in likelihood_model.sources
+            or this_source_name == source_name
+        ):
+
+            return True
+
+        # Links can make the assigned source depend on parameters of other sources
+
+        return any(
+            parameter.has_auxiliary_variable()
+            for parameter in likelihood_model.sources[source_name].parameters.values()
+        )
@@ -97,17 +97,19 @@ class DispersionSpectrumLike(SpectrumLike):
 
         return self._rsp.convolve()
 
-    def get_simulated_dataset(self, new_name=None, **kwargs):
+    def get_simulated_dataset(self, new_name=None, random_generator=None, **kwargs):
         """
         Returns another DispersionSpectrumLike instance where data have been obtained by randomizing the current expectation from the
         model, as well as from the background (depending on the respective noise models)
 
+        :param new_name: name of the simulated plugin
+        :param random_generator: (optional) the numpy Generator to use
         :return: a DispersionSpectrumLike simulated instance
          """
 
         # pass the response thru to the constructor
         return super(DispersionSpectrumLike, self).get_simulated_dataset(
-            new_name=new_name, **kwargs
+            new_name=new_name, random_generator=random_generator, **kwargs
         )
 
     def get_pha_files(self):
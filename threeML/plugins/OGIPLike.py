@@ -102,20 +102,25 @@ class OGIPLike(DispersionSpectrumLike):
             name=name, observation=pha, background=bak, verbose=verbose
         )
 
-    def get_simulated_dataset(self, new_name=None, **kwargs):
+    def get_simulated_dataset(self, new_name=None, random_generator=None, **kwargs):
         # type: (str, dict) -> OGIPLike
         """
         Returns another OGIPLike instance where data have been obtained by randomizing the current expectation from the
         model, as well as from the background (depending on the respective noise models)
 
         :param new_name: name of the simulated plugin
+        :param random_generator: (optional) the numpy Generator to use
         :param kwargs: keywords to pass back up to parents
         :return: a DispersionSpectrumLike simulated instance
          """
 
         # pass the response thru to the constructor
         return super(OGIPLike, self).get_simulated_dataset(
-            new_name=new_name, spectrum_number=1, response=self._rsp, **kwargs
+            new_name=new_name,
+            random_generator=random_generator,
+            spectrum_number=1,
+            response=self._rsp,
+            **kwargs
         )
 
     @property
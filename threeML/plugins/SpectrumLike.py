@@ -38,6 +38,10 @@ from threeML.io.plotting.data_residual_plot import ResidualPlot
 
 NO_REBIN = 1e-99
 
+# Relative step used for the finite differences of the model in the computation of the gradient
+
+_MODEL_DERIVATIVE_STEP = 1e-5
+
 __instrument_name = "General binned spectral data"
 
 # This defines the known noise models for source and/or background spectra
@@ -210,6 +214,9 @@ class SpectrumLike(PluginPrototype):
         # This will be used to keep track of how many syntethic datasets have been generated
         self._n_synthetic_datasets = 0
 
+        # This will store the real counts while simulated counts are used (see set_simulated_counts)
+        self._real_counts = None
+
         if tstart is not None:
 
             self._tstart = tstart
@@ -1187,11 +1194,15 @@ class SpectrumLike(PluginPrototype):
 
             self._apply_mask_to_original_vectors()
 
-    def get_simulated_dataset(self, new_name=None, **kwargs):
+    def get_simulated_dataset(self, new_name=None, random_generator=None, **kwargs):
         """
         Returns another Binned instance where data have been obtained by randomizing the current expectation from the
         model, as well as from the background (depending on the respective noise models)
 
+        :param new_name: name of the simulated plugin
+        :param random_generator: (optional) the numpy Generator to use (default: the numpy.random module). Use
+        independent generators to get reproducible simulations also when running in parallel
+        :param kwargs: keywords to pass to the constructor of the new plugin
         :return: an BinnedSpectrum or child instance
         """
 
@@ -1226,13 +1237,13 @@ class SpectrumLike(PluginPrototype):
             # code for the MANY cases we can have. As new cases are added, this code will adapt.
 
             randomized_source_counts = self._likelihood_evaluator.get_randomized_source_counts(
-                source_model_counts
+                source_model_counts, random_generator=random_generator
             )
             randomized_source_count_err = (
                 self._likelihood_evaluator.get_randomized_source_errors()
             )
-            randomized_background_counts = (
-                self._likelihood_evaluator.get_randomized_background_counts()
+            randomized_background_counts = self._likelihood_evaluator.get_randomized_background_counts(
+                random_generator=random_generator
             )
             randomized_background_count_err = (
                 self._likelihood_evaluator.get_randomized_background_errors()
@@ -1303,6 +1314,167 @@ class SpectrumLike(PluginPrototype):
 
             return new_spectrum_plugin
 
+    def get_simulated_counts(self, n_simulations, random_generator=None):
+        """
+        Draw many synthetic spectra at once from the current model (and background), with the same noise models
+        used by get_simulated_dataset. The results can be swapped in place into this plugin with
+        set_simulated_counts, which avoids building a new plugin for each simulation.
+
+        :param n_simulations: number of synthetic spectra
+        :param random_generator: (optional) the numpy Generator to use (default: the numpy.random module)
+        :return: (counts, count errors, background counts, background count errors) for all channels. The counts
+        have shape (n_simulations, n_channels), the errors are the same for all simulations (or None)
+        """
+
+        assert (
+            self._like_model is not None
+        ), "You need to set up a model before randomizing"
+
+        if self._background_plugin is not None:
+
+            raise NotImplementedError(
+                "%s has a background modeled with the plugin %s. In-place simulations (in_place=True) do not "
+                "support a modeled background: use in_place=False"
+                % (self._name, self._background_plugin.name)
+            )
+
+        with self._without_mask_nor_rebinner():
+
+            # Get the source model for all channels (that's why we don't use the .folded_model property)
+
+            source_model_counts = self._evaluate_model() * self.exposure
+
+            randomized_source_counts = self._likelihood_evaluator.get_randomized_source_counts(
+                source_model_counts, n_simulations, random_generator
+            )
+            randomized_source_count_err = (
+                self._likelihood_evaluator.get_randomized_source_errors()
+            )
+
+            if self._background_spectrum is not None:
+
+                randomized_background_counts = self._likelihood_evaluator.get_randomized_background_counts(
+                    n_simulations, random_generator
+                )
+                randomized_background_count_err = (
+                    self._likelihood_evaluator.get_randomized_background_errors()
+                )
+
+            else:
+
+                randomized_background_counts = None
+                randomized_background_count_err = None
+
+        return (
+            randomized_source_counts,
+            randomized_source_count_err,
+            randomized_background_counts,
+            randomized_background_count_err,
+        )
+
+    def set_simulated_counts(
+        self,
+        counts,
+        count_errors=None,
+        background_counts=None,
+        background_count_errors=None,
+    ):
+        """
+        Replace in place the observed (and background) counts with simulated ones, for example one of the spectra
+        returned by get_simulated_counts, keeping the response, the mask and the rebinning. As in
+        get_simulated_dataset, the simulated background has the same exposure and area as the observation.
+        Use restore_observed_counts to go back to the real data.
+
+        :param counts: the simulated counts for all channels
+        :param count_errors: (optional) the errors on the simulated counts (Gaussian noise model only)
+        :param background_counts: the simulated background counts for all channels (if there is a background)
+        :param background_count_errors: (optional) the errors on the background counts (Gaussian background only)
+        :return: none
+        """
+
+        if self._real_counts is None:
+
+            self._real_counts = (
+                self._observed_counts,
+                self._observed_count_errors,
+                self._background_counts,
+                self._scaled_background_counts,
+                self._back_count_errors,
+                self._area_ratio,
+                self._exposure_ratio,
+                self._background_exposure,
+                self._total_scale_factor,
+            )
+
+        self._observed_counts = np.asarray(counts)
+
+        if count_errors is not None:
+
+            self._observed_count_errors = np.asarray(count_errors)
+
+        if self._background_spectrum is not None:
+
+            assert (
+                background_counts is not None
+            ), "You need to provide the background counts as well"
+
+            self._background_counts = np.asarray(background_counts)
+
+            # the background has the same exposure and area as the observation
+
+            self._scaled_background_counts = self._background_counts
+
+            self._area_ratio = 1.0
+            self._exposure_ratio = 1.0
+            self._background_exposure = self._observed_spectrum.exposure
+
+            self._total_scale_factor = 1.0
+
+            if background_count_errors is not None:
+
+                self._back_count_errors = np.asarray(background_count_errors)
+
+        self._apply_selections_to_original_vectors()
+
+    def restore_observed_counts(self):
+        """
+        Go back to the real data after set_simulated_counts
+
+        :return: none
+        """
+
+        if self._real_counts is None:
+
+            return
+
+        (
+            self._observed_counts,
+            self._observed_count_errors,
+            self._background_counts,
+            self._scaled_background_counts,
+            self._back_count_errors,
+            self._area_ratio,
+            self._exposure_ratio,
+            self._background_exposure,
+            self._total_scale_factor,
+        ) = self._real_counts
+
+        self._real_counts = None
+
+        self._apply_selections_to_original_vectors()
+
+    def _apply_selections_to_original_vectors(self):
+
+        if self._rebinner is not None:
+
+            # Note that the rebinner applies the mask by itself
+
+            self._apply_rebinner_to_original_vectors()
+
+        else:
+
+            self._apply_mask_to_original_vectors()
+
     @classmethod
     def _new_plugin(cls, *args, **kwargs):
         """
@@ -1396,6 +1568,13 @@ class SpectrumLike(PluginPrototype):
 
         self._rebinner = rebinner
 
+        self._apply_rebinner_to_original_vectors()
+
+        if self._verbose:
+            print("Now using %s bins" % self._rebinner.n_bins)
+
+    def _apply_rebinner_to_original_vectors(self):
+
         # Apply the rebinning to everything.
         # NOTE: the output of the .rebin method are the vectors with the mask *already applied*
 
@@ -1422,9 +1601,6 @@ class SpectrumLike(PluginPrototype):
                     self._back_count_errors
                 )
 
-        if self._verbose:
-            print("Now using %s bins" % self._rebinner.n_bins)
-
     def remove_rebinning(self):
         """
         Remove the rebinning scheme set with rebin_on_background.
@@ -1568,6 +1744,108 @@ class SpectrumLike(PluginPrototype):
 
         return self.get_log_like()
 
+    def get_pointwise_log_like(self):
+
+        # the log-likelihood of each active (or rebinned) channel
+
+        pointwise_value = self._likelihood_evaluator.get_current_pointwise_value()
+
+        if pointwise_value is None:
+
+            return None
+
+        log_likes, _ = pointwise_value
+
+        return log_likes
+
+    def has_log_like_gradient(self):
+
+        return self._likelihood_evaluator.has_derivative
+
+    def get_log_like_gradient(self, parameters):
+        """
+        Compute the gradient of the log-likelihood with respect to the internal values of the provided parameters
+        using the chain rule: the derivative of the statistic with respect to the expected counts in each channel
+        is analytic, while the derivative of the expected counts with respect to each parameter is obtained with
+        finite differences of the (folded) model only, without evaluating the statistic again.
+
+        :param parameters: ordered dictionary of free parameters
+        :return: array with the gradient, or None if the current noise models do not provide the derivative
+        """
+
+        count_derivative = self._likelihood_evaluator.get_current_derivative()
+
+        if count_derivative is None:
+
+            return None
+
+        gradient = np.zeros(len(parameters))
+
+        for i, (parameter_name, parameter) in enumerate(parameters.items()):
+
+            if not self.depends_on_parameter(parameter_name):
+
+                continue
+
+            gradient[i] = np.dot(
+                count_derivative, self._get_model_derivative(parameter)
+            )
+
+        return gradient
+
+    def depends_on_parameter(self, parameter_name):
+
+        if self._source_name is None:
+
+            return True
+
+        return self._source_depends_on_parameter(
+            self._like_model, self._source_name, parameter_name
+        )
+
+    def _get_model_derivative(self, parameter):
+        """
+        Derivative of the current model counts with respect to the internal value of the parameter, computed with
+        central differences (one-sided if the parameter is too close to one of its boundaries)
+
+        :param parameter: a free parameter
+        :return: array with the derivative for each channel
+        """
+
+        value = parameter._get_internal_value()
+        minimum = parameter._get_internal_min_value()
+        maximum = parameter._get_internal_max_value()
+
+        delta = _MODEL_DERIVATIVE_STEP * max(abs(value), 1.0)
+
+        upper = value + delta
+
+        if maximum is not None and upper > maximum:
+
+            upper = value
+
+        lower = value - delta
+
+        if minimum is not None and lower < minimum:
+
+            lower = value
+
+        try:
+
+            parameter._set_internal_value(upper)
+
+            upper_model = self.get_model()
+
+            parameter._set_internal_value(lower)
+
+            lower_model = self.get_model()
+
+        finally:
+
+            parameter._set_internal_value(value)
+
+        return (upper_model - lower_model) / (upper - lower)
+
     def set_model(self, likelihoodModel):
         """
         Set the model to be used in the joint minimization.
@@ -0,0 +1,683 @@
+import logging
+
+import numpy as np
+from astromodels.functions.function import CompositeFunction
+from numba.core.errors import TypingError
+
+from threeML.exceptions.custom_exceptions import custom_warnings
+from threeML.plugin_prototype import PluginPrototype
+from threeML.utils.OGIP.response import InstrumentResponse
+from threeML.utils.spectrum.binned_spectrum import ChannelSet
+from threeML.utils.statistics.likelihood_functions import (
+    poisson_log_likelihood_ideal_bkg,
+    poisson_observed_gaussian_background,
+    poisson_observed_poisson_background,
+)
+from threeML.utils.string_utils import dash_separated_string_to_tuple
+from threeML.utils.time_interval import TimeIntervalSet
+
+log = logging.getLogger(__name__)
+
+__instrument_name = "General binned spectral data in several time bins with a shared response"
+
+
+class TimeResolvedSpectrumLike(PluginPrototype):
+    def __init__(
+        self,
+        name,
+        counts,
+        exposures,
+        response,
+        time_intervals,
+        background_counts=None,
+        background_errors=None,
+        background_exposures=None,
+        independent_variable=None,
+        verbose=True,
+    ):
+        """
+        A plugin for the spectra of several time bins of the same detector, which share the same response. The
+        counts of all the bins are held in one (time bins x channels) matrix, and the models of all the bins are
+        folded through the response with a single matrix product, instead of using one DispersionSpectrumLike (each
+        with its own copy of the response) for each bin.
+
+        The model is evaluated for each bin at the middle of the bin, by setting the independent variable (the time) of
+        the model. This is exact for models whose time dependence is constant within the bins, like the ones created
+        with step_generator:
+
+        > time = IndependentVariable("time", 0.0, u.s)
+        > model.add_independent_variable(time)
+        > model.link(spectrum.K, time, step_generator(intervals, spectrum.K))
+        > plugin = TimeResolvedSpectrumLike(..., independent_variable=time)
+
+        If a matrix of background errors is given, the background is assumed to be modeled with Gaussian errors (for
+        example from a polynomial fit), otherwise it is assumed to be Poisson distributed.
+
+        :param name: the name of the plugin
+        :param counts: matrix of observed counts with shape (number of time bins, number of channels)
+        :param exposures: array with the exposure of each time bin
+        :param response: the InstrumentResponse shared by all the time bins
+        :param time_intervals: a TimeIntervalSet with the time bins
+        :param background_counts: (optional) matrix of background counts, with the same shape as the counts
+        :param background_errors: (optional) matrix of errors on the background counts, for a modeled background
+        :param background_exposures: (optional) array with the exposure of the background of each time bin, for a
+        Poisson background (default: the same as the exposures)
+        :param independent_variable: (optional) the IndependentVariable of the model to set to the time of each bin.
+        If None, the model does not depend on time and is evaluated only once
+        :param verbose: the verbosity switch
+        """
+
+        super(TimeResolvedSpectrumLike, self).__init__(name, {})
+
+        assert isinstance(
+            response, InstrumentResponse
+        ), "The response must be an instance of InstrumentResponse"
+
+        assert isinstance(
+            time_intervals, TimeIntervalSet
+        ), "The time intervals must be a TimeIntervalSet"
+
+        self._counts = np.rint(np.array(counts, ndmin=2)).astype(np.int64)
+        self._exposures = np.array(exposures, dtype=float, ndmin=1)
+
+        assert np.all(self._counts >= 0), "Error in the counts: negative counts!"
+
+        self._n_time_bins, self._n_channels = self._counts.shape
+
+        assert self._exposures.shape == (self._n_time_bins,), (
+            "There must be one exposure for each of the %d time bins"
+            % self._n_time_bins
+        )
+
+        assert len(time_intervals) == self._n_time_bins, (
+            "There must be one time interval for each of the %d time bins"
+            % self._n_time_bins
+        )
+
+        assert response.matrix.shape[0] == self._n_channels, (
+            "The response has %d channels, but the counts have %d"
+            % (response.matrix.shape[0], self._n_channels)
+        )
+
+        self._response = response
+        self._ebounds = ChannelSet.from_instrument_response(response)
+        self._time_intervals = time_intervals
+        self._independent_variable = independent_variable
+        self._verbose = verbose
+
+        if background_counts is None:
+
+            assert (
+                background_errors is None and background_exposures is None
+            ), "You cannot give background errors or exposures without background counts"
+
+            self._background_counts = None
+            self._background_errors = None
+            self._background_exposures = None
+
+        else:
+
+            self._background_counts = np.array(background_counts, dtype=float, ndmin=2)
+
+            assert self._background_counts.shape == self._counts.shape, (
+                "The background counts must have the same shape as the counts"
+            )
+
+            if background_errors is not None:
+
+                assert background_exposures is None, (
+                    "A modeled background (with errors) cannot have its own exposures"
+                )
+
+                self._background_errors = np.array(
+                    background_errors, dtype=float, ndmin=2
+                )
+
+                assert self._background_errors.shape == self._counts.shape, (
+                    "The background errors must have the same shape as the counts"
+                )
+
+                self._background_exposures = None
+
+            else:
+
+                self._background_errors = None
+
+                self._background_counts = np.rint(self._background_counts).astype(
+                    np.int64
+                )
+
+                if background_exposures is None:
+
+                    self._background_exposures = self._exposures
+
+                else:
+
+                    self._background_exposures = np.array(
+                        background_exposures, dtype=float, ndmin=1
+                    )
+
+                    assert self._background_exposures.shape == (self._n_time_bins,), (
+                        "There must be one background exposure for each time bin"
+                    )
+
+        # the Monte Carlo energies where to evaluate the model for the Simpson's rule:
+        # the edges of the bins followed by their middle points
+
+        mc_energies = self._response.monte_carlo_energies
+
+        self._n_mc_bins = mc_energies.shape[0] - 1
+        self._mc_widths = mc_energies[1:] - mc_energies[:-1]
+        self._model_energies = np.concatenate(
+            (mc_energies, 0.5 * (mc_energies[:-1] + mc_energies[1:]))
+        )
+
+        # the model time of each bin
+
+        self._times = 0.5 * (
+            np.asarray(self._time_intervals.start_times)
+            + np.asarray(self._time_intervals.stop_times)
+        )
+
+        # whether the functions of the model accept arrays of parameters, so that the model can be evaluated with
+        # one call for all the time bins (None until it has been checked)
+
+        self._stacked_evaluation = None
+
+        self._mask = np.ones(self._n_channels, dtype=bool)
+
+        self._likelihood_model = None
+
+        self._n_synthetic_datasets = 0
+
+    @property
+    def n_time_bins(self):
+
+        return self._n_time_bins
+
+    @property
+    def time_intervals(self):
+
+        return self._time_intervals
+
+    @property
+    def response(self):
+
+        return self._response
+
+    @property
+    def observed_counts(self):
+        """
+        the matrix of observed counts, with shape (number of time bins, number of channels)
+        """
+
+        return self._counts
+
+    @property
+    def exposures(self):
+
+        return self._exposures
+
+    @property
+    def background_counts(self):
+
+        return self._background_counts
+
+    @property
+    def background_errors(self):
+
+        return self._background_errors
+
+    @property
+    def mask(self):
+        """
+        the mask of the active channels, shared by all the time bins
+        """
+
+        return self._mask
+
+    def set_active_measurements(self, *args, **kwargs):
+        """
+        Set the channels used in the fit, for all the time bins. The selections are energy ranges such as
+        "10-500" (in keV) or channel ranges such as "c10-c100". Use "all" to select all the channels.
+
+        set_active_measurements("10-30", "40-500", exclude=["c60-c65"])
+
+        :param args: the energy or channel ranges to use
+        :param exclude: (list) exclude the provided channel/energy ranges
+        :return: none
+        """
+
+        if "all" in args:
+
+            assert (
+                len(args) == 1
+            ), "If you specify 'all', you cannot specify more than one energy range."
+
+            self._mask = np.ones(self._n_channels, dtype=bool)
+
+        elif len(args) == 0:
+
+            self._mask = np.ones(self._n_channels, dtype=bool)
+
+        else:
+
+            self._mask = np.zeros(self._n_channels, dtype=bool)
+
+            for arg in args:
+
+                first, last = self._selection_to_channels(arg)
+
+                self._mask[first : last + 1] = True
+
+        for arg in kwargs.pop("exclude", []):
+
+            first, last = self._selection_to_channels(arg)
+
+            self._mask[first : last + 1] = False
+
+        if self._verbose:
+
+            log.info(
+                "Now using %s channels out of %s"
+                % (np.sum(self._mask), self._n_channels)
+            )
+
+    def _selection_to_channels(self, selection):
+        """
+        Convert a selection such as "emin-emax" (in keV), "cmin-cmax" or a mix of the two to the first and the last
+        channel it includes. Energies beyond the ebounds are assigned to the first or the last channel
+
+        :param selection: the selection string
+        :return: (first channel, last channel)
+        """
+
+        idx = np.empty(2, dtype=int)
+
+        for i, s in enumerate(dash_separated_string_to_tuple(selection)):
+
+            # We need to find out if it is a channel or and energy being requested
+
+            if s[0].lower() == "c":
+
+                assert int(s[1:]) <= self._n_channels, (
+                    "%s is larger than the number of channels: %d"
+                    % (s, self._n_channels)
+                )
+
+                idx[i] = int(s[1:])
+
+            else:
+
+                idx[i] = min(
+                    self._ebounds.containing_bin(float(s)), self._n_channels - 1
+                )
+
+        assert idx[0] < idx[1], (
+            "The channel and energy selection (%s) are out of order and translates to %s-%s"
+            % (selection, idx[0], idx[1])
+        )
+
+        return idx[0], idx[1]
+
+    def set_model(self, likelihood_model_instance):
+        """
+        Set the model to be used in the joint minimization.
+
+        :param likelihood_model_instance: instance of Model
+        :return: none
+        """
+
+        assert likelihood_model_instance.get_number_of_extended_sources() == 0, (
+            "TimeResolvedSpectrumLike plugins do not support extended sources"
+        )
+
+        self._likelihood_model = likelihood_model_instance
+
+        self._stacked_evaluation = None
+
+    def _evaluate_differential_flux(self, energies, tag=None):
+
+        n_point_sources = self._likelihood_model.get_number_of_point_sources()
+
+        fluxes = self._likelihood_model.get_point_source_fluxes(0, energies, tag=tag)
+
+        for i in range(1, n_point_sources):
+
+            fluxes += self._likelihood_model.get_point_source_fluxes(
+                i, energies, tag=tag
+            )
+
+        return fluxes
+
+    def _evaluate_stacked_shape(self, shape):
+
+        if isinstance(shape, CompositeFunction):
+
+            # the parameters cannot be passed through a composite function, so it can only be evaluated if it
+            # does not depend on time
+
+            for parameter in shape.parameters.values():
+
+                if parameter.has_auxiliary_variable():
+
+                    return None
+
+            return shape(self._model_energies)
+
+        # the parameters linked to the time are evaluated for all the time bins (as a column, so that the result
+        # has shape (number of time bins, number of energies))
+
+        values = []
+
+        for parameter in shape.parameters.values():
+
+            if parameter.has_auxiliary_variable():
+
+                variable, law = parameter.auxiliary_variable
+
+                if variable is self._independent_variable:
+
+                    values.append(np.reshape(law(self._times), (-1, 1)))
+
+                    continue
+
+            values.append(parameter.value)
+
+        return shape.evaluate(self._model_energies, *values)
+
+    def _evaluate_stacked_differential_flux(self):
+
+        fluxes = np.zeros((self._n_time_bins, self._model_energies.shape[0]))
+
+        for source in self._likelihood_model.point_sources.values():
+
+            for component in source.components.values():
+
+                try:
+
+                    component_fluxes = self._evaluate_stacked_shape(component.shape)
+
+                except TypingError:
+
+                    # the functions compiled with numba only accept scalar parameters
+
+                    log.info(
+                        "%s of %s only accepts scalar parameters: the model is evaluated once per time bin"
+                        % (component.shape.name, self.name)
+                    )
+
+                    return None
+
+                if component_fluxes is None:
+
+                    return None
+
+                component_fluxes = np.asarray(component_fluxes, dtype=float)
+
+                try:
+
+                    fluxes += component_fluxes
+
+                except ValueError:
+
+                    # the function did not give one row of fluxes per time bin
+
+                    return None
+
+        return fluxes
+
+    def _evaluate_differential_flux_per_time_bin(self):
+
+        return np.array(
+            [
+                self._evaluate_differential_flux(
+                    self._model_energies, (self._independent_variable, time, None)
+                )
+                for time in self._times
+            ]
+        )
+
+    def get_folded_model(self):
+        """
+        The model of each time bin integrated over the Monte Carlo energies and folded through the response (all
+        the bins at once), per unit exposure
+
+        :return: matrix with shape (number of time bins, number of channels)
+        """
+
+        if self._independent_variable is None:
+
+            fluxes = np.tile(
+                self._evaluate_differential_flux(self._model_energies),
+                (self._n_time_bins, 1),
+            )
+
+        elif self._stacked_evaluation is None:
+
+            # the first evaluation with this model: check whether the model gives the same fluxes when evaluated
+            # for all the time bins at once
+
+            fluxes = self._evaluate_differential_flux_per_time_bin()
+
+            stacked_fluxes = self._evaluate_stacked_differential_flux()
+
+            self._stacked_evaluation = stacked_fluxes is not None and np.allclose(
+                stacked_fluxes, fluxes, equal_nan=True
+            )
+
+        elif self._stacked_evaluation:
+
+            fluxes = self._evaluate_stacked_differential_flux()
+
+        else:
+
+            fluxes = self._evaluate_differential_flux_per_time_bin()
+
+        # Simpson's rule over each Monte Carlo bin, as in SpectrumLike
+
+        n = self._n_mc_bins
+
+        integrals = (
+            self._mc_widths
+            / 6.0
+            * (fluxes[:, :n] + 4 * fluxes[:, n + 1 :] + fluxes[:, 1 : n + 1])
+        )
+
+        # remove the non-finite values, as in InstrumentResponse.convolve
+
+        integrals[~np.isfinite(integrals)] = 0
+
+        return np.dot(integrals, self._response.matrix.T)
+
+    def get_model(self):
+        """
+        The expected counts of each time bin in the active channels
+
+        :return: matrix with shape (number of time bins, number of active channels)
+        """
+
+        return self.get_folded_model()[:, self._mask] * self._exposures[:, np.newaxis]
+
+    def _get_log_likes(self, mask):
+        """
+        The log-likelihood of each time bin in each of the given channels, with the background profiled out
+
+        :param mask: the mask of the channels to use
+        :return: (log-likelihoods, background model counts or None), both with shape (number of time bins,
+        number of channels in the mask)
+        """
+
+        model_counts = self.get_folded_model()[:, mask] * self._exposures[:, np.newaxis]
+
+        observed_counts = self._counts[:, mask]
+
+        if self._background_counts is None:
+
+            log_likes, _ = poisson_log_likelihood_ideal_bkg(
+                observed_counts.ravel(),
+                np.zeros(observed_counts.size),
+                model_counts.ravel(),
+            )
+
+            return log_likes.reshape(observed_counts.shape), None
+
+        background_counts = self._background_counts[:, mask]
+
+        if self._background_errors is not None:
+
+            log_likes, background_model_counts = poisson_observed_gaussian_background(
+                observed_counts.ravel(),
+                background_counts.ravel(),
+                self._background_errors[:, mask].ravel(),
+                model_counts.ravel(),
+            )
+
+            return (
+                log_likes.reshape(observed_counts.shape),
+                background_model_counts.reshape(observed_counts.shape),
+            )
+
+        # Poisson background: the exposure ratio changes from bin to bin, so there is one for each channel of
+        # each bin
+
+        exposure_ratios = np.repeat(
+            self._exposures / self._background_exposures, observed_counts.shape[1]
+        )
+
+        log_likes, background_model_counts = poisson_observed_poisson_background(
+            observed_counts.ravel(),
+            background_counts.ravel(),
+            exposure_ratios,
+            model_counts.ravel(),
+        )
+
+        return (
+            log_likes.reshape(observed_counts.shape),
+            background_model_counts.reshape(observed_counts.shape),
+        )
+
+    def get_log_like(self):
+        """
+        Return the value of the log-likelihood with the current values for the
+        parameters
+        """
+
+        log_likes, _ = self._get_log_likes(self._mask)
+
+        return np.sum(log_likes)
+
+    def get_pointwise_log_like(self):
+        """
+        The log-likelihood of each active channel of each time bin (ordered by time bin)
+        """
+
+        log_likes, _ = self._get_log_likes(self._mask)
+
+        return log_likes.ravel()
+
+    def get_simulated_dataset(self, new_name=None, random_generator=None):
+        """
+        Returns another TimeResolvedSpectrumLike instance where the counts of all the time bins have been obtained by
+        randomizing the current expectation from the model and from the (profiled) background. As in SpectrumLike,
+        the simulated background has the same exposure as the observation.
+
+        :param new_name: name of the simulated plugin
+        :param random_generator: (optional) the numpy Generator to use (default: the numpy.random module)
+        :return: a TimeResolvedSpectrumLike instance
+        """
+
+        assert (
+            self._likelihood_model is not None
+        ), "You need to set up a model before randomizing"
+
+        self._n_synthetic_datasets += 1
+
+        if new_name is None:
+
+            new_name = "%s_sim_%i" % (self.name, self._n_synthetic_datasets)
+
+        random_state = np.random if random_generator is None else random_generator
+
+        # the model and the background for all the channels
+
+        source_model_counts = self.get_folded_model() * self._exposures[:, np.newaxis]
+
+        _, background_model_counts = self._get_log_likes(
+            np.ones(self._n_channels, dtype=bool)
+        )
+
+        if background_model_counts is None:
+
+            randomized_counts = random_state.poisson(source_model_counts)
+
+            randomized_background_counts = None
+
+        else:
+
+            randomized_counts = random_state.poisson(
+                source_model_counts + background_model_counts
+            )
+
+            if self._background_errors is None:
+
+                randomized_background_counts = random_state.poisson(
+                    background_model_counts
+                )
+
+            else:
+
+                # We cannot generate variates with zero sigma. Their background will always be zero
+
+                randomized_background_counts = np.zeros(background_model_counts.shape)
+
+                idx = self._background_errors > 0
+
+                randomized_background_counts[idx] = random_state.normal(
+                    loc=background_model_counts[idx],
+                    scale=self._background_errors[idx],
+                )
+
+                idx = randomized_background_counts < 0
+
+                if np.sum(idx) > 0:
+
+                    custom_warnings.warn(
+                        "Generated background has negative counts "
+                        "in %i channels. Fixing them to zero" % np.sum(idx)
+                    )
+
+                    randomized_background_counts[idx] = 0
+
+        new_plugin = TimeResolvedSpectrumLike(
+            new_name,
+            randomized_counts,
+            self._exposures,
+            self._response,
+            self._time_intervals,
+            background_counts=randomized_background_counts,
+            background_errors=self._background_errors,
+            background_exposures=None,
+            independent_variable=self._independent_variable,
+            verbose=False,
+        )
+
+        # Apply the same selection as the current data set
+
+        new_plugin._mask = np.array(self._mask, copy=True)
+
+        return new_plugin
+
+    def inner_fit(self):
+        """
+        There are no nuisance parameters, so this is just the log-likelihood
+        """
+
+        return self.get_log_like()
+
+    def get_number_of_data_points(self):
+        """
+        The number of active channels times the number of time bins
+        """
+
+        return int(np.sum(self._mask)) * self._n_time_bins
@@ -378,7 +378,15 @@ class XYLike(PluginPrototype):
 
             return np.sum(chi2_) * (-1)
 
-    def get_simulated_dataset(self, new_name=None):
+    def get_simulated_dataset(self, new_name=None, random_generator=None):
+        """
+        Returns another instance where the data have been obtained by randomizing the current expectation from the
+        model
+
+        :param new_name: name of the simulated plugin
+        :param random_generator: (optional) the numpy Generator to use (default: the numpy.random module)
+        :return: the simulated plugin
+        """
 
         assert (
             self._has_errors
@@ -399,13 +407,15 @@ class XYLike(PluginPrototype):
         # Get total expectation from model
         expectation = self._get_total_expectation()
 
+        random_state = np.random if random_generator is None else random_generator
+
         if self._is_poisson:
 
-            new_y = np.random.poisson(expectation)
+            new_y = random_state.poisson(expectation)
 
         else:
 
-            new_y = np.random.normal(expectation, self._yerr)
+            new_y = random_state.normal(expectation, self._yerr)
 
         # remask the data BEFORE creating the new plugin
 
@@ -469,6 +479,16 @@ class XYLike(PluginPrototype):
 
         return self.get_log_like()
 
+    def depends_on_parameter(self, parameter_name):
+
+        if self._source_name is None:
+
+            return True
+
+        return self._source_depends_on_parameter(
+            self._likelihood_model, self._source_name, parameter_name
+        )
+
     def get_model(self):
 
         return self._get_total_expectation()
@@ -3,6 +3,118 @@ import numpy as np
 from threeML.io.uncertainty_formatter import uncertainty_formatter
 
 
+def highest_posterior_density_intervals(samples, cl=0.68):
+    """
+    Returns the Highest Posterior Density intervals (HPD) for the given credibility level, computed along the last
+    axis of the samples. This allows to compute the intervals for many quantities at once, with one sort per quantity.
+
+    NOTE: the returned interval is the HPD only if the posterior is not multimodal. If it is multimodal, you should
+    probably report the full posterior, not only an interval.
+
+    :param samples: an array of samples, with the samples on the last axis
+    :param cl: credibility level (0 < cl < 1)
+    :return: (low_bounds, hi_bounds), with the shape of samples without the last axis
+    """
+
+    assert 0 < cl < 1, "The credibility level should be 0 < cl < 1"
+
+    # NOTE: np.sort returns a sorted copy, so we do not destroy the covariance with other physical quantities
+
+    return _highest_posterior_density_of_sorted(np.sort(samples, axis=-1), cl)
+
+
+def _highest_posterior_density_of_sorted(ordered, cl):
+
+    n = ordered.shape[-1]
+
+    # This is the probability that the interval should span
+    interval_integral = cl
+
+    # If all values have the same probability, then the hpd is degenerate, but its length is from 0 to
+    # the value corresponding to the (interval_integral * n)-th sample.
+    # This is the index of the rightermost element which can be part of the interval
+
+    index_of_rightmost_possibility = int(np.floor(interval_integral * n))
+
+    # Compute the index of the last element that is eligible to be the left bound of the interval
+
+    index_of_leftmost_possibility = n - index_of_rightmost_possibility
+
+    # Now compute the width of all intervals that might be the one we are looking for
+
+    interval_width = (
+        ordered[..., index_of_rightmost_possibility:]
+        - ordered[..., :index_of_leftmost_possibility]
+    )
+
+    # This might happen if there are too few values
+    if interval_width.shape[-1] == 0:
+        raise RuntimeError("Too few elements for interval calculation")
+
+    # Find the index of the shortest interval
+
+    idx_of_minimum = np.argmin(interval_width, axis=-1)[..., np.newaxis]
+
+    # Find the extremes of the shortest interval
+
+    hpd_left_bound = np.take_along_axis(ordered, idx_of_minimum, axis=-1)[..., 0]
+    hpd_right_bound = np.take_along_axis(
+        ordered, idx_of_minimum + index_of_rightmost_possibility, axis=-1
+    )[..., 0]
+
+    return hpd_left_bound, hpd_right_bound
+
+
+def equal_tail_intervals(samples, cl=0.68):
+    """
+    Returns the equal tail intervals, i.e., intervals centered on the median of the distribution with
+    the same probability on the right and on the left of the mean, computed along the last axis of the samples.
+
+    :param samples: an array of samples, with the samples on the last axis
+    :param cl: confidence level (0 < cl < 1)
+    :return: (low_bounds, hi_bounds), with the shape of samples without the last axis
+    """
+
+    assert 0 < cl < 1, "Confidence level must be 0 < cl < 1"
+
+    half_cl = cl / 2.0 * 100.0
+
+    low_bound, hi_bound = np.percentile(
+        samples, [50.0 - half_cl, 50.0 + half_cl], axis=-1
+    )
+
+    return low_bound, hi_bound
+
+
+def summarize_samples(samples, cl=0.68):
+    """
+    Compute the medians, the equal-tail intervals and the HPD intervals for many quantities at once, with one sort
+    per quantity. The results are the same as those of the corresponding methods of RandomVariates.
+
+    :param samples: a (n_quantities x n_samples) array (or any array with the samples on the last axis)
+    :param cl: confidence level (0 < cl < 1)
+    :return: (medians, (equal_tail_low_bounds, equal_tail_hi_bounds), (hpd_low_bounds, hpd_hi_bounds))
+    """
+
+    assert 0 < cl < 1, "Confidence level must be 0 < cl < 1"
+
+    ordered = np.sort(samples, axis=-1)
+
+    half_cl = cl / 2.0 * 100.0
+
+    # the percentiles do not depend on the order of the samples, and are cheap on a sorted array
+
+    median, low_bound, hi_bound = np.percentile(
+        ordered, [50.0, 50.0 - half_cl, 50.0 + half_cl], axis=-1
+    )
+
+    return (
+        median,
+        (low_bound, hi_bound),
+        _highest_posterior_density_of_sorted(ordered, cl),
+    )
+
+
 class RandomVariates(np.ndarray):
     """
     A subclass of np.array which is meant to contain samples for one parameter. This class contains methods to easily
@@ -138,50 +250,9 @@ class RandomVariates(np.ndarray):
         :return: (low_bound, hi_bound)
         """
 
-        assert 0 < cl < 1, "The credibility level should be 0 < cl < 1"
-
-        # NOTE: we cannot sort the array, because we would destroy the covariance with other physical quantities,
-        # so we get a copy instead. This copy will live only for the duration of this method (but of course will be
-        # collected only whenevery the garbage collector decides to).
-
-        ordered = np.sort(np.array(self))
+        low_bound, hi_bound = highest_posterior_density_intervals(np.asarray(self), cl)
 
-        n = ordered.size
-
-        # This is the probability that the interval should span
-        interval_integral = cl
-
-        # If all values have the same probability, then the hpd is degenerate, but its length is from 0 to
-        # the value corresponding to the (interval_integral * n)-th sample.
-        # This is the index of the rightermost element which can be part of the interval
-
-        index_of_rightmost_possibility = int(np.floor(interval_integral * n))
-
-        # Compute the index of the last element that is eligible to be the left bound of the interval
-
-        index_of_leftmost_possibility = n - index_of_rightmost_possibility
-
-        # Now compute the width of all intervals that might be the one we are looking for
-
-        interval_width = (
-            ordered[index_of_rightmost_possibility:]
-            - ordered[:index_of_leftmost_possibility]
-        )
-
-        # This might happen if there are too few values
-        if len(interval_width) == 0:
-            raise RuntimeError("Too few elements for interval calculation")
-
-        # Find the index of the shortest interval
-
-        idx_of_minimum = np.argmin(interval_width)
-
-        # Find the extremes of the shortest interval
-
-        hpd_left_bound = ordered[idx_of_minimum]
-        hpd_right_bound = ordered[idx_of_minimum + index_of_rightmost_possibility]
-
-        return hpd_left_bound, hpd_right_bound
+        return low_bound[()], hi_bound[()]
 
     def equal_tail_interval(self, cl=0.68):
         """
@@ -195,13 +266,7 @@ class RandomVariates(np.ndarray):
         :return: (low_bound, hi_bound)
         """
 
-        assert 0 < cl < 1, "Confidence level must be 0 < cl < 1"
-
-        half_cl = cl / 2.0 * 100.0
-
-        low_bound, hi_bound = np.percentile(
-            np.asarray(self), [50.0 - half_cl, 50.0 + half_cl]
-        )
+        low_bound, hi_bound = equal_tail_intervals(np.asarray(self), cl)
 
         return float(low_bound), float(hi_bound)
 
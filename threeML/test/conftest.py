@@ -5,6 +5,8 @@ import subprocess
 import time
 import signal
 
+from ipyparallel import Client
+
 from astromodels import *
 from threeML.classicMLE.joint_likelihood import JointLikelihood
 from threeML.bayesian.bayesian_analysis import BayesianAnalysis
@@ -23,6 +25,27 @@ def setup_ipcluster():
 
     time.sleep(5.0)
 
+    # Wait (for a while) for the engines to register, otherwise the first test
+    # using them might fail
+
+    try:
+
+        client = Client()
+
+        for i in range(60):
+
+            if len(client.ids) > 0:
+
+                break
+
+            time.sleep(0.5)
+
+        client.close()
+
+    except Exception:
+
+        pass
+
     yield ipycluster_process
 
     ipycluster_process.send_signal(signal.SIGINT)
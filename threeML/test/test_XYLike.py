@@ -315,6 +315,54 @@ def test_XYLike_assign_to_source():
     assert log_like_before != log_like_after
 
 
+def test_XYLike_memoized_log_likes():
+
+    yerr = np.array(gauss_sigma)
+    y = np.array(gauss_signal)
+
+    xy1 = XYLike("test1", x, y, yerr)
+    xy1.assign_to_source("pts1")
+
+    xy2 = XYLike("test2", x, y, yerr)
+    xy2.assign_to_source("pts2")
+
+    fitfun = Line() + Gaussian()
+    fitfun.F_2 = 60.0
+    fitfun.mu_2 = 4.5
+
+    fitfun2 = Line() + Gaussian()
+    fitfun2.F_2 = 60.0
+    fitfun2.mu_2 = 4.5
+
+    pts1 = PointSource("pts1", ra=0.0, dec=0.0, spectral_shape=fitfun)
+    pts2 = PointSource("pts2", ra=2.5, dec=3.2, spectral_shape=fitfun2)
+
+    model = Model(pts1, pts2)
+
+    jl = JointLikelihood(model, DataList(xy1, xy2))
+
+    assert xy1.depends_on_parameter("pts1.spectrum.main.composite.F_2")
+    assert not xy1.depends_on_parameter("pts2.spectrum.main.composite.F_2")
+
+    res, _ = jl.fit()
+
+    # The two sources are independent, so they must converge to the same solution
+
+    assert np.allclose(res["value"].values[:5], res["value"].values[5:], rtol=0.05)
+
+    # When only the parameters of one source change (for example during the numerical computation of
+    # derivatives) the other dataset must not be re-evaluated
+
+    trace = jl.fit_trace
+
+    assert np.all(trace["skipped_datasets"] <= 1)
+    assert np.any(trace["skipped_datasets"] == 1)
+
+    # Outside of the minimization there is no caching
+
+    assert jl._log_like_cache is None
+
+
 def test_XYLike_dataframe():
 
     yerr = np.array(gauss_sigma)
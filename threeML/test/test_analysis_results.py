@@ -4,7 +4,10 @@ from builtins import zip
 from past.utils import old_div
 import pytest
 import os
+import math
+import pickle
 import numpy as np
+import pandas as pd
 import astropy.units as u
 
 from threeML.plugins.XYLike import XYLike
@@ -16,6 +19,8 @@ from threeML.analysis_results import (
     AnalysisResultsSet,
 )
 from astromodels import Line, Gaussian, Powerlaw
+from threeML.utils.propagation import propagate_on_samples
+from threeML.random_variates import summarize_samples
 
 
 _cache = {}
@@ -93,6 +98,18 @@ def _results_are_same(res1, res2, bayes=False):
         # Check samples
         np.allclose(res1.samples, res2.samples)
 
+        # Check the convergence diagnostics of the sampler
+
+        assert (res1.convergence_diagnostics is None) == (
+            res2.convergence_diagnostics is None
+        )
+
+        if res1.convergence_diagnostics is not None:
+
+            pd.testing.assert_frame_equal(
+                res1.convergence_diagnostics, res2.convergence_diagnostics
+            )
+
     frame1 = res1.get_data_frame()
     frame2 = res2.get_data_frame()
 
@@ -302,3 +319,161 @@ def test_one_free_parameter_input_output():
     ar_reloaded = load_analysis_results(temp_file)
     os.remove(temp_file)
     _results_are_same(ar, ar_reloaded)
+
+
+def test_propagate_on_samples():
+
+    a = np.random.normal(1.0, 0.1, size=200)
+    b = np.random.normal(-2.0, 0.1, size=200)
+    energies = np.logspace(0, 2, 10)
+
+    expected = np.array([[aa * e ** bb for e in energies] for aa, bb in zip(a, b)])
+
+    # Broadcasting function
+
+    def numpy_function(x, a, b):
+
+        return a * np.power(x, b)
+
+    assert np.allclose(
+        propagate_on_samples(numpy_function, {"a": a, "b": b}, energies), expected
+    )
+
+    # Function which works on arrays of x but only on scalar parameters
+
+    def array_function(x, a, b):
+
+        return a * np.power(x, float(b))
+
+    assert np.allclose(
+        propagate_on_samples(array_function, {"a": a, "b": b}, energies), expected
+    )
+
+    # Function which only works on scalars
+
+    def scalar_function(x, a, b):
+
+        return a * math.pow(x, b)
+
+    assert np.allclose(
+        propagate_on_samples(scalar_function, {"b": b}, energies, a=2.0),
+        2 * expected / a[:, np.newaxis],
+    )
+
+    # Astromodels function
+
+    powerlaw = Powerlaw(piv=1.0)
+
+    assert np.allclose(
+        propagate_on_samples(
+            powerlaw.evaluate_at, {"K": a, "index": b}, energies, piv=1.0
+        ),
+        expected,
+    )
+
+
+def test_summarize_samples(xy_completed_bayesian_analysis):
+
+    bs, _ = xy_completed_bayesian_analysis
+
+    ar = bs.results
+
+    medians, equal_tail_bounds, hpd_bounds = summarize_samples(ar.samples, 0.9)
+
+    for i, path in enumerate(ar.optimized_model.free_parameters.keys()):
+
+        variates = ar.get_variates(path)
+
+        assert np.isclose(medians[i], variates.median)
+
+        assert np.allclose(
+            [equal_tail_bounds[0][i], equal_tail_bounds[1][i]],
+            variates.equal_tail_interval(0.9),
+        )
+
+        assert np.allclose(
+            [hpd_bounds[0][i], hpd_bounds[1][i]],
+            variates.highest_posterior_density_interval(0.9),
+        )
+
+    # the results table uses the same intervals
+
+    frame = ar.get_data_frame(error_type="hpd", cl=0.9)
+
+    assert np.allclose(frame["negative_error"].values, hpd_bounds[0] - frame["value"])
+    assert np.allclose(frame["positive_error"].values, hpd_bounds[1] - frame["value"])
+
+
+def test_hdf5_input_output(xy_fitted_joint_likelihood, xy_completed_bayesian_analysis):
+
+    jl, _, _ = xy_fitted_joint_likelihood  # type: JointLikelihood, None, None
+
+    jl.restore_best_fit()
+
+    ar = jl.results  # type: MLEResults
+
+    temp_file = "__test_mle.h5"
+
+    ar.write_to(temp_file, overwrite=True)
+
+    with pytest.raises(IOError):
+
+        ar.write_to(temp_file)
+
+    ar_reloaded = load_analysis_results(temp_file)
+
+    os.remove(temp_file)
+
+    _results_are_same(ar, ar_reloaded)
+
+    bs, _ = xy_completed_bayesian_analysis
+
+    rb1 = bs.results
+
+    analysis_set = AnalysisResultsSet([rb1, rb1])
+
+    analysis_set.set_bins("testing", [-1, 1], [3, 5], unit="s")
+
+    temp_file = "__test_bayes.hdf5"
+
+    analysis_set.write_to(temp_file, overwrite=True)
+
+    analysis_set_reloaded = load_analysis_results(temp_file)
+
+    assert len(analysis_set_reloaded) == len(analysis_set)
+
+    for rb2 in analysis_set_reloaded:
+
+        _results_are_same(rb1, rb2, bayes=True)
+
+        # the samples are read lazily, one parameter at a time when possible
+
+        assert not isinstance(rb2.samples, np.ndarray)
+
+        assert np.all(rb2.samples[1] == rb1.samples[1])
+
+        assert np.all(np.asarray(rb2.samples) == rb1.samples)
+
+        # also ranges of samples, of one or more parameters
+
+        assert np.all(rb2.samples[1, 10:50] == rb1.samples[1, 10:50])
+
+        assert np.all(rb2.samples[:, 10:50] == rb1.samples[:, 10:50])
+
+        assert np.all(rb2.samples.T[10:50] == rb1.samples.T[10:50])
+
+        assert np.all(rb2.samples.T[5, 1:3] == rb1.samples.T[5, 1:3])
+
+        assert np.all(rb2.samples[[0, 2], 5] == rb1.samples[[0, 2], 5])
+
+        # the lazy samples can be pickled (for example to send them to the engines)
+
+        assert np.all(
+            np.asarray(pickle.loads(pickle.dumps(rb2.samples))) == rb1.samples
+        )
+
+        path = list(rb1.optimized_model.free_parameters.keys())[0]
+
+        assert np.all(rb2.get_variates(path).samples == rb1.get_variates(path).samples)
+
+    os.remove(temp_file)
@@ -1,6 +1,11 @@
 from threeML import BayesianAnalysis, Uniform_prior, Log_uniform_prior
+from threeML.utils.statistics.stats_tools import (
+    integrated_autocorrelation_time,
+    waic,
+)
 import numpy as np
 import pytest
+import os
 
 try:
     import ultranest
@@ -109,6 +114,280 @@ def test_emcee(bayes_fitter):
     # This has been already tested in the fixtures (see conftest.py)
 
 
+def test_emcee_checkpoint(bayes_fitter):
+
+    bayes = bayes_fitter
+
+    checkpoint = "test_emcee_checkpoint.h5"
+
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    try:
+
+        bayes.set_sampler("emcee")
+        bayes.sampler.setup(
+            n_iterations=10, n_burn_in=5, n_walkers=20, seed=1234, checkpoint=checkpoint
+        )
+        bayes.sample(quiet=True)
+
+        first_samples = np.array(bayes.raw_samples)
+
+        assert os.path.exists(checkpoint)
+
+        # continue the same run for 10 more iterations
+
+        bayes.set_sampler("emcee")
+        bayes.sampler.setup(
+            n_iterations=20, n_burn_in=5, n_walkers=20, checkpoint=checkpoint, resume=True
+        )
+        bayes.sample(quiet=True)
+
+        samples = np.array(bayes.raw_samples)
+
+        assert samples.shape[0] == 20 * 20
+
+        # emcee flattens the chains step by step
+
+        assert np.allclose(samples[: first_samples.shape[0]], first_samples)
+
+    finally:
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+
+def test_checkpoint_not_supported(bayes_fitter):
+
+    from threeML.bayesian.pinnuts_sampler import NUTSSampler
+
+    bayes = bayes_fitter
+
+    sampler = NUTSSampler(bayes.likelihood_model, bayes.data_list)
+
+    with pytest.raises(RuntimeError):
+
+        sampler.setup(n_iterations=10, checkpoint="test_nuts_checkpoint.h5")
+
+    assert not os.path.exists("test_nuts_checkpoint.h5")
+
+
+@skip_if_zeus_is_not_available
+def test_zeus_checkpoint_not_supported(bayes_fitter):
+
+    bayes = bayes_fitter
+
+    bayes.set_sampler("zeus")
+
+    with pytest.raises(RuntimeError):
+
+        bayes.sampler.setup(n_iterations=10, checkpoint="test_zeus_checkpoint.h5")
+
+
+@skip_if_dynesty_is_not_available
+def test_dynesty_checkpoint_not_supported(bayes_fitter):
+
+    bayes = bayes_fitter
+
+    for sampler_name in ("dynesty_nested", "dynesty_dynamic"):
+
+        bayes.set_sampler(sampler_name)
+
+        with pytest.raises(RuntimeError):
+
+            bayes.sampler.setup(checkpoint="test_dynesty_checkpoint.pkl")
+
+
+def test_emcee_pool(bayes_fitter):
+
+    bayes = bayes_fitter
+
+    free_parameters = bayes.likelihood_model.free_parameters
+
+    starting_values = [parameter.value for parameter in free_parameters.values()]
+
+    samples = []
+
+    for pool in ("serial", "multiprocessing"):
+
+        # same starting points for the walkers
+
+        for parameter, value in zip(free_parameters.values(), starting_values):
+
+            parameter.value = value
+
+        np.random.seed(1234)
+
+        bayes.set_sampler("emcee")
+        bayes.sampler.setup(
+            n_iterations=20, n_burn_in=10, n_walkers=20, seed=1234, pool=pool, n_workers=2
+        )
+        bayes.sample(quiet=True)
+
+        samples.append(np.array(bayes.raw_samples))
+
+    # the walkers do not depend on where the posterior is evaluated
+
+    assert np.allclose(samples[0], samples[1])
+
+    with pytest.raises(AssertionError):
+
+        bayes.sampler.setup(n_iterations=20, pool="not a pool")
+
+
+def test_emcee_log_like_per_dataset(bayes_fitter):
+
+    bayes = bayes_fitter
+
+    bayes.set_sampler("emcee")
+    bayes.sampler.setup(n_iterations=20, n_burn_in=10, n_walkers=20, seed=1234)
+    bayes.sample(quiet=True)
+
+    sampler = bayes.sampler
+
+    log_like_per_dataset = sampler.log_like_per_dataset
+
+    assert log_like_per_dataset.shape == (
+        bayes.raw_samples.shape[0],
+        len(list(bayes.data_list.values())),
+    )
+
+    assert np.allclose(np.sum(log_like_per_dataset, axis=1), bayes.log_like_values)
+
+    # the stored values are the same as those of a new evaluation
+
+    for i in (0, bayes.raw_samples.shape[0] - 1):
+
+        _, log_likes = sampler._get_posterior_and_log_likes(bayes.raw_samples[i])
+
+        assert np.allclose(
+            log_likes,
+            np.concatenate(
+                (log_like_per_dataset[i], sampler.pointwise_log_likes[i])
+            ),
+        )
+
+    # the WAIC uses the log-likelihood of each data point, whose sum for each dataset is the log-likelihood
+    # of the dataset
+
+    pointwise_log_likes = sampler.pointwise_log_likes
+
+    n_points = [x.get_number_of_data_points() for x in bayes.data_list.values()]
+
+    assert pointwise_log_likes.shape == (bayes.raw_samples.shape[0], sum(n_points))
+
+    for i, pointwise in enumerate(
+        np.split(pointwise_log_likes, np.cumsum(n_points)[:-1], axis=1)
+    ):
+
+        assert np.allclose(np.sum(pointwise, axis=1), log_like_per_dataset[:, i])
+
+    measures = bayes.results.get_statistic_measure_frame()
+
+    assert np.isclose(measures.loc["WAIC"].iloc[0], waic(pointwise_log_likes)[0])
+
+
+def test_waic_not_available(bayes_fitter):
+
+    bayes = bayes_fitter
+
+    dataset = list(bayes.data_list.values())[0]
+
+    # a plugin which cannot split its log-likelihood in data points
+
+    dataset.get_pointwise_log_like = lambda: None
+
+    try:
+
+        bayes.set_sampler("emcee")
+        bayes.sampler.setup(n_iterations=20, n_burn_in=10, n_walkers=20, seed=1234)
+
+        with pytest.warns(UserWarning, match="WAIC"):
+
+            bayes.sample(quiet=True)
+
+    finally:
+
+        del dataset.get_pointwise_log_like
+
+    assert bayes.sampler.pointwise_log_likes is None
+
+    assert bayes.sampler.log_like_per_dataset is not None
+
+    measures = bayes.results.get_statistic_measure_frame()
+
+    assert "WAIC" not in measures.index
+
+
+def test_waic():
+
+    np.random.seed(1234)
+
+    log_likes = np.random.normal(-10, 1, size=(1000, 3))
+
+    this_waic, pwaic = waic(log_likes)
+
+    lppd = np.sum(np.log(np.mean(np.exp(log_likes), axis=0)))
+
+    expected_pwaic = np.sum(np.var(log_likes, axis=0, ddof=1))
+
+    assert np.isclose(pwaic, expected_pwaic)
+    assert np.isclose(this_waic, -2 * (lppd - expected_pwaic))
+
+
+def test_integrated_autocorrelation_time():
+
+    # AR(1) process x_i = phi x_(i-1) + noise, with autocorrelation time (1 + phi) / (1 - phi)
+
+    np.random.seed(1234)
+
+    phi = np.array([0.5, 0.9])
+
+    chain = np.zeros((20000, 4, 2))
+
+    noise = np.random.normal(size=chain.shape)
+
+    for i in range(1, chain.shape[0]):
+
+        chain[i] = phi * chain[i - 1] + noise[i]
+
+    taus = integrated_autocorrelation_time(chain)
+
+    assert np.allclose(taus, (1 + phi) / (1 - phi), rtol=0.15)
+
+
+def test_emcee_adaptive(bayes_fitter):
+
+    bayes = bayes_fitter
+
+    bayes.set_sampler("emcee")
+    bayes.sampler.setup(
+        n_iterations=5000,
+        n_walkers=20,
+        seed=1234,
+        target_effective_samples=200,
+        check_interval=50,
+    )
+    bayes.sample(quiet=True)
+
+    diagnostics = bayes.results.convergence_diagnostics
+
+    assert list(diagnostics.index) == list(
+        bayes.results.optimized_model.free_parameters.keys()
+    )
+
+    # the sampling stopped before the maximum number of iterations
+
+    n_burn_in = diagnostics["burn in"].iloc[0]
+
+    n_steps = bayes.raw_samples.shape[0] // 20 + n_burn_in
+
+    assert n_steps < 5000
+    assert n_steps % 50 == 0
+
+    assert np.all(diagnostics["effective samples"] >= 200 * 0.9)
+
+
 @skip_if_pymultinest_is_not_available
 def test_multinest(bayes_fitter, completed_bn090217206_bayesian_analysis):
 
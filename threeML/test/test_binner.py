@@ -0,0 +1,208 @@
+import numpy as np
+import pytest
+
+from threeML.utils.binner import NotEnoughData, Rebinner, TemporalBinner
+from threeML.utils.statistics.stats_tools import Significance
+from threeML.utils.time_series.polynomial import Polynomial
+
+
+def _rebin_with_slices(rebinner, vector):
+
+    return np.array(
+        [
+            np.sum(vector[start:stop])
+            for start, stop in zip(rebinner._starts, rebinner._stops)
+        ]
+    )
+
+
+def test_rebinner():
+
+    counts = np.array([1, 0, 2, 5, 1, 1, 0, 0, 3, 1, 1, 4], dtype=float)
+
+    rebinner = Rebinner(counts, 3)
+
+    assert rebinner.n_bins == 4
+
+    (rebinned,) = rebinner.rebin(counts)
+
+    np.testing.assert_array_equal(rebinned, [3, 5, 5, 6])
+
+    # the total is conserved
+
+    assert np.sum(rebinned) == np.sum(counts)
+
+    # errors are summed in quadrature
+
+    errors = np.sqrt(counts)
+
+    (rebinned_errors,) = rebinner.rebin_errors(errors)
+
+    np.testing.assert_allclose(rebinned_errors, np.sqrt(rebinned))
+
+    with pytest.raises(NotEnoughData):
+
+        Rebinner(counts, 100)
+
+
+def test_rebinner_with_mask():
+
+    np.random.seed(1234)
+
+    for _ in range(20):
+
+        counts = np.random.poisson(2.0, 100).astype(float)
+
+        mask = np.random.uniform(size=100) > 0.2
+
+        rebinner = Rebinner(counts, 5, mask)
+
+        # no bin contains excluded elements
+
+        for start, stop in zip(rebinner._starts, rebinner._stops):
+
+            assert np.all(mask[start:stop])
+
+        vector = np.random.normal(size=100)
+
+        (rebinned,) = rebinner.rebin(vector)
+
+        np.testing.assert_allclose(rebinned, _rebin_with_slices(rebinner, vector))
+
+        np.testing.assert_allclose(np.sum(rebinned), np.sum(vector[mask]))
+
+        (rebinned_errors,) = rebinner.rebin_errors(vector)
+
+        np.testing.assert_allclose(
+            rebinned_errors, np.sqrt(_rebin_with_slices(rebinner, vector ** 2))
+        )
+
+        new_start, new_stop = rebinner.get_new_start_and_stop(
+            np.arange(100), np.arange(100) + 1
+        )
+
+        np.testing.assert_array_equal(new_start, rebinner._starts)
+        np.testing.assert_array_equal(new_stop, rebinner._stops)
+
+
+def test_bin_by_significance():
+
+    np.random.seed(1234)
+
+    # a flat background of 100 counts per unit time, with a pulse on top
+
+    background = np.random.uniform(0, 100, 10000)
+
+    pulse = np.random.normal(50, 5, 3000)
+
+    arrival_times = np.sort(np.concatenate((background, pulse)))
+
+    background_getter = lambda start, stop: 100.0 * (stop - start)
+    background_error_getter = lambda start, stop: 5.0 * np.sqrt(stop - start)
+
+    # getters which only work with scalars are evaluated one stop at a time
+
+    def scalar_background_getter(start, stop):
+
+        return 100.0 * (float(stop) - float(start))
+
+    for error_getter in (None, background_error_getter):
+
+        bins = TemporalBinner.bin_by_significance(
+            arrival_times,
+            background_getter,
+            background_error_getter=error_getter,
+            sigma_level=5,
+            min_counts=10,
+        )
+
+        assert len(bins) > 0
+
+        assert bins.argsort() == list(range(len(bins)))
+
+        if error_getter is None:
+
+            scalar_bins = TemporalBinner.bin_by_significance(
+                arrival_times,
+                scalar_background_getter,
+                sigma_level=5,
+                min_counts=10,
+            )
+
+            np.testing.assert_array_equal(scalar_bins.starts, bins.starts)
+            np.testing.assert_array_equal(scalar_bins.stops, bins.stops)
+
+        # every bin reaches the requested significance
+
+        counts = np.searchsorted(
+            arrival_times, bins.stops, side="right"
+        ) - np.searchsorted(arrival_times, bins.starts, side="left")
+
+        sig = Significance(counts, background_getter(bins.starts, bins.stops))
+
+        if error_getter is None:
+
+            sigma = sig.li_and_ma()
+
+        else:
+
+            sigma = sig.li_and_ma_equivalent_for_gaussian_background(
+                error_getter(bins.starts, bins.stops)
+            )
+
+        assert np.all(sigma >= 5)
+
+
+def test_bin_by_significance_edges():
+
+    np.random.seed(1234)
+
+    background = np.random.uniform(0, 10, 1000)
+
+    pulse = np.random.normal(5, 1, 1000)
+
+    arrival_times = np.sort(np.concatenate((background, pulse)))
+
+    background_getter = lambda start, stop: 100.0 * (stop - start)
+    background_error_getter = lambda start, stop: 5.0 * np.sqrt(stop - start)
+
+    # the bins start and stop at arrival times. These are their indexes, as found by the
+    # implementation which tested one candidate stop at a time
+
+    expected = {
+        None: ([0, 818, 995, 1172], [818, 995, 1172, 1373]),
+        background_error_getter: (
+            [0, 691, 784, 871, 953, 1025, 1120, 1207, 1303],
+            [691, 784, 871, 953, 1025, 1120, 1207, 1303, 1409],
+        ),
+    }
+
+    for error_getter, (starts, stops) in expected.items():
+
+        bins = TemporalBinner.bin_by_significance(
+            arrival_times,
+            background_getter,
+            background_error_getter=error_getter,
+            sigma_level=10,
+            min_counts=10,
+        )
+
+        np.testing.assert_array_equal(bins.starts, arrival_times[starts])
+        np.testing.assert_array_equal(bins.stops, arrival_times[stops])
+
+
+def test_polynomial_integral_error_on_arrays():
+
+    covariance = np.array([[0.1, 0.01, 0.0], [0.01, 0.2, 0.02], [0.0, 0.02, 0.3]])
+
+    polynomial = Polynomial.from_previous_fit([1.0, 2.0, 0.5], covariance)
+
+    stops = np.linspace(1, 10, 7)
+
+    errors = polynomial.integral_error(0.5, stops)
+
+    assert errors.shape == stops.shape
+
+    np.testing.assert_allclose(
+        errors, [polynomial.integral_error(0.5, stop) for stop in stops]
+    )
@@ -0,0 +1,97 @@
+import time
+import numpy as np
+import numdifftools as nd
+
+from threeML import parallel_computation
+from ipyparallel import Client
+from threeML.parallel.parallel_client import ParallelClient
+from threeML.utils.differentiation import (
+    get_hessian,
+    get_fast_hessian,
+    get_jacobian,
+    get_richardson_hessian,
+)
+
+
+def _function(x, y, z):
+
+    return 3.2 * x ** 2 + 0.5 * x * y + 2.0 * y ** 2 + np.exp(0.3 * z) * x + z ** 4
+
+
+_point = np.array([1.3, -0.7, 2.1])
+_minima = np.array([-10.0, -10.0, np.nan])
+_maxima = np.array([10.0, 10.0, np.nan])
+
+
+def _wrapped(x):
+
+    return _function(*x)
+
+
+def test_jacobian():
+
+    expected = nd.Gradient(_wrapped)(_point)
+
+    jacobian = get_jacobian(_function, _point, _minima, _maxima)
+
+    assert np.allclose(jacobian, expected, rtol=1e-4)
+
+
+def test_hessian():
+
+    expected = nd.Hessian(_wrapped)(_point)
+
+    hessian = get_hessian(_function, _point, _minima, _maxima)
+
+    assert np.allclose(hessian, expected, rtol=1e-4)
+
+    # the Richardson extrapolation is much more accurate than the single step
+
+    richardson_hessian = get_richardson_hessian(_function, _point, _minima, _maxima)
+
+    assert np.abs(richardson_hessian - expected).max() < 1e-6
+
+    fast_hessian = get_fast_hessian(_function, _point, _minima, _maxima)
+
+    assert np.allclose(fast_hessian, expected, rtol=1e-4)
+
+
+def test_parallel_stencils():
+
+    serial_jacobian = get_jacobian(_function, _point, _minima, _maxima)
+    serial_hessian = get_fast_hessian(_function, _point, _minima, _maxima)
+    serial_accurate_hessian = get_richardson_hessian(
+        _function, _point, _minima, _maxima
+    )
+
+    # Wait for the engines of the test cluster to be available
+
+    client = Client()
+
+    for i in range(60):
+
+        if len(client.ids) > 0:
+
+            break
+
+        time.sleep(0.5)
+
+    with parallel_computation(start_cluster=False):
+
+        # the stencils are evaluated on the engines only if a client is given
+
+        parallel_client = ParallelClient()
+
+        parallel_jacobian = get_jacobian(
+            _function, _point, _minima, _maxima, client=parallel_client
+        )
+        parallel_hessian = get_fast_hessian(
+            _function, _point, _minima, _maxima, client=parallel_client
+        )
+        parallel_accurate_hessian = get_richardson_hessian(
+            _function, _point, _minima, _maxima, client=parallel_client
+        )
+
+    assert np.allclose(serial_jacobian, parallel_jacobian)
+    assert np.allclose(serial_hessian, parallel_hessian)
+    assert np.allclose(serial_accurate_hessian, parallel_accurate_hessian)
@@ -2,10 +2,18 @@ from builtins import zip
 import pytest
 from threeML import *
 from threeML.plugins.OGIPLike import OGIPLike
-from threeML.utils.fitted_objects.fitted_point_sources import InvalidUnitError
+from threeML.utils.fitted_objects.fitted_point_sources import (
+    InvalidUnitError,
+    FittedPointSourceSpectralHandler,
+    integrate_in_log_space,
+)
+from threeML.utils.fitted_objects.fitted_source_handler import VariatesContainer
+from threeML.random_variates import RandomVariates
+from threeML.config.config import threeML_config
 from threeML.io.calculate_flux import _calculate_point_source_flux
 import astropy.units as u
 import matplotlib.pyplot as plt
+import scipy.integrate as integrate
 
 from threeML.io.package_data import get_path_of_data_dir
 
@@ -203,3 +211,240 @@ def test_units_on_energy_range(analysis_to_test):
 
     with pytest.raises(AssertionError):
         plot_point_source_spectra(analysis_to_test[0], ene_min=1.0 * u.keV, ene_max=1.0)
+
+
+def test_integral_flux_accuracy():
+
+    for function in [Powerlaw(), Band(), Cutoff_powerlaw(), Powerlaw() + Blackbody()]:
+
+        for e1, e2 in [(10.0, 40000.0), (8.0, 900.0)]:
+
+            expected = integrate.quad(lambda x: x * function(x), e1, e2, limit=500)[0]
+
+            flux = integrate_in_log_space(
+                lambda x: x * function(x), np.array([e1]), np.array([e2])
+            )
+
+            assert flux.shape == (1,)
+
+            assert np.allclose(flux, expected, rtol=1e-5)
+
+    # integrate many samples of the parameters at once
+
+    K = np.random.uniform(1.0, 2.0, size=(20, 1))
+    index = np.random.uniform(-2.5, -1.5, size=(20, 1))
+
+    def powerlaw(x, K, index):
+
+        return K * np.power(x, index)
+
+    fluxes = integrate_in_log_space(
+        powerlaw, np.array([[10.0]]), np.array([[1000.0]]), K=K, index=index
+    )
+
+    assert fluxes.shape == (20, 1)
+
+    for flux, this_K, this_index in zip(fluxes[:, 0], K[:, 0], index[:, 0]):
+
+        expected = integrate.quad(powerlaw, 10.0, 1000.0, args=(this_K, this_index))[0]
+
+        assert np.isclose(flux, expected, rtol=1e-5)
+
+
+@pytest.fixture
+def built_fitted_point_sources(monkeypatch):
+
+    import threeML.io.calculate_flux
+
+    # keep track of the fitted point sources which are actually computed
+
+    built = []
+
+    class CountingHandler(FittedPointSourceSpectralHandler):
+        def __init__(self, *args, **kwargs):
+
+            built.append(args[1:])
+
+            super(CountingHandler, self).__init__(*args, **kwargs)
+
+    monkeypatch.setattr(
+        threeML.io.calculate_flux, "FittedPointSourceSpectralHandler", CountingHandler
+    )
+
+    return built
+
+
+def test_fitted_point_sources_cache(analysis_to_test, built_fitted_point_sources):
+
+    flux_keywords = {
+        "use_components": True,
+        "components_to_use": ["total", "Powerlaw"],
+        "flux_unit": "erg/(cm2 s)",
+    }
+
+    analysis = analysis_to_test[-2]
+
+    analysis.clear_fitted_point_sources_cache()
+
+    first = analysis.get_flux(1 * u.keV, 10 * u.keV, **flux_keywords)
+
+    assert len(built_fitted_point_sources) == 2
+
+    # computing again the same fluxes uses the cache
+
+    second = analysis.get_flux(1 * u.keV, 10 * u.keV, **flux_keywords)
+
+    assert len(built_fitted_point_sources) == 2
+
+    assert np.all(first["flux"] == second["flux"])
+
+    # a different unit needs a new computation
+
+    _ = plot_spectra(analysis, flux_unit="1/(cm2 s keV)", num_ene=5)
+
+    plt.close("all")
+
+    assert len(built_fitted_point_sources) == 3
+
+    # the cache can be emptied
+
+    analysis.clear_fitted_point_sources_cache()
+
+    third = analysis.get_flux(1 * u.keV, 10 * u.keV, **flux_keywords)
+
+    assert len(built_fitted_point_sources) == 5
+
+    assert np.all(first["flux"] == third["flux"])
+
+
+def test_fitted_point_sources_cache_is_bounded(
+    analysis_to_test, built_fitted_point_sources, monkeypatch
+):
+
+    import threeML.analysis_results
+
+    monkeypatch.setattr(threeML.analysis_results, "_FITTED_POINT_SOURCES_CACHE_SIZE", 2)
+
+    analysis = analysis_to_test[0]
+
+    analysis.clear_fitted_point_sources_cache()
+
+    for flux_unit in good_i_flux_units:
+
+        analysis.get_flux(1 * u.keV, 10 * u.keV, flux_unit=flux_unit)
+
+    assert len(built_fitted_point_sources) == 3
+
+    # the two most recent are still in the cache, the first one was dropped
+
+    for flux_unit in good_i_flux_units[1:] + good_i_flux_units[:1]:
+
+        analysis.get_flux(1 * u.keV, 10 * u.keV, flux_unit=flux_unit)
+
+    assert len(built_fitted_point_sources) == 4
+
+
+def test_fitted_point_sources_parallel(analysis_to_test):
+
+    for analysis in analysis_to_test:
+
+        analysis.clear_fitted_point_sources_cache()
+
+    serial_mle, serial_bayes = _calculate_point_source_flux(
+        1, 10, *analysis_to_test, use_components=True
+    )
+
+    for analysis in analysis_to_test:
+
+        analysis.clear_fitted_point_sources_cache()
+
+    with parallel_computation(start_cluster=False):
+
+        parallel_mle, parallel_bayes = _calculate_point_source_flux(
+            1, 10, *analysis_to_test, use_components=True
+        )
+
+    for serial, parallel in ((serial_mle, parallel_mle), (serial_bayes, parallel_bayes)):
+
+        assert list(serial.index) == list(parallel.index)
+
+        # MLE samples are random, so the results might differ slightly
+
+        assert np.allclose(
+            [x.value for x in serial["flux"]],
+            [x.value for x in parallel["flux"]],
+            rtol=0.1,
+        )
+
+
+def test_variates_container():
+
+    samples = np.random.lognormal(size=(12, 500))
+
+    variates = [RandomVariates(x) for x in samples]
+
+    for equal_tailed in [True, False]:
+
+        for chunk_size in [None, 5]:
+
+            container = VariatesContainer(
+                samples, (3, 4), 0.68, lambda x: x, equal_tailed, chunk_size
+            )
+
+            assert container.samples.shape == (3, 4, 500)
+
+            assert np.allclose(container.average.ravel(), [v.average for v in variates])
+            assert np.allclose(container.median.ravel(), [v.median for v in variates])
+
+            if equal_tailed:
+
+                intervals = [v.equal_tail_interval(0.68) for v in variates]
+
+            else:
+
+                intervals = [
+                    v.highest_posterior_density_interval(0.68) for v in variates
+                ]
+
+            assert np.allclose(container.lower_error.ravel(), [x[0] for x in intervals])
+            assert np.allclose(container.upper_error.ravel(), [x[1] for x in intervals])
+
+            # a list of RandomVariates gives the same results
+
+            other = VariatesContainer(
+                variates, (3, 4), 0.68, lambda x: x, equal_tailed, chunk_size
+            )
+
+            assert np.all(other.lower_error == container.lower_error)
+
+            summed = container + other
+
+            assert np.allclose(summed.average, 2 * container.average)
+
+
+def test_chunked_error_propagation(analysis_to_test):
+
+    analysis = analysis_to_test[-3]
+
+    full = FittedPointSourceSpectralHandler(
+        analysis, "bn090217206", np.logspace(1, 3, 25), "keV", "1/(cm2 s keV)"
+    )
+
+    threeML_config["model plot"]["point source plot"][
+        "error propagation chunk size"
+    ] = 7
+
+    try:
+
+        chunked = FittedPointSourceSpectralHandler(
+            analysis, "bn090217206", np.logspace(1, 3, 25), "keV", "1/(cm2 s keV)"
+        )
+
+    finally:
+
+        threeML_config["model plot"]["point source plot"][
+            "error propagation chunk size"
+        ] = 0
+
+    assert np.allclose(full.samples.value, chunked.samples.value)
+    assert np.allclose(full.upper_error.value, chunked.upper_error.value)
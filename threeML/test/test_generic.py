@@ -1,3 +1,10 @@
+import subprocess
+import sys
+
+import pytest
+from astromodels.functions.function import CompositeFunction, get_function_class
+from astromodels.functions.functions import StepFunctionUpper
+
 from threeML import *
 
 # from threeML.utils.cartesian import cartesian
@@ -23,6 +30,109 @@ def test_step_generator_setup():
     step = step_generator([[1, 2], [3, 4]], powerlaw.K)
 
 
+def test_step_generator_piecewise_constant():
+
+    powerlaw = Powerlaw()
+
+    model = Model(PointSource("test", 0, 0, spectral_shape=powerlaw))
+
+    time = IndependentVariable("time", 0.0, u.s)
+
+    model.add_independent_variable(time)
+
+    intervals = np.array([[0.0, 1.0], [1.0, 2.0], [2.5, 3.0]])
+
+    step = step_generator(intervals, powerlaw.K)
+
+    model.link(powerlaw.K, time, step)
+
+    assert list(step.free_parameters.keys()) == ["value_1", "value_2", "value_3"]
+
+    # the same values as a sum of step functions
+
+    expected = StepFunctionUpper() + StepFunctionUpper() + StepFunctionUpper()
+
+    for i, (start, stop) in enumerate(intervals):
+
+        step.parameters["value_%d" % (i + 1)].value = i + 1.0
+
+        expected.parameters["lower_bound_%d" % (i + 1)].value = start
+        expected.parameters["upper_bound_%d" % (i + 1)].value = stop
+        expected.parameters["value_%d" % (i + 1)].value = i + 1.0
+
+    x = np.linspace(-1, 4, 501)
+
+    np.testing.assert_array_equal(step(x), expected(x))
+
+    time.value = 1.5
+
+    assert powerlaw.K.value == 2.0
+
+    # the function survives cloning the model
+
+    new_model = clone_model(model)
+
+    new_model.time.value = 2.7
+
+    assert new_model.test.spectrum.main.Powerlaw.K.value == 3.0
+
+    # overlapping intervals give a sum of step functions
+
+    step = step_generator([[0, 2], [1, 3]], powerlaw.K)
+
+    assert isinstance(step, CompositeFunction)
+
+    step.value_1.value = 1.0
+    step.value_2.value = 2.0
+
+    assert step(1.5) == 3.0
+
+
+def test_step_generator_saved_model(tmp_path):
+
+    powerlaw = Powerlaw()
+
+    model = Model(PointSource("test", 0, 0, spectral_shape=powerlaw))
+
+    time = IndependentVariable("time", 0.0, u.s)
+
+    model.add_independent_variable(time)
+
+    # many intervals, with a number which has not been used before
+
+    intervals = np.vstack((np.arange(200.0), np.arange(1.0, 201.0))).T
+
+    step = step_generator(intervals, powerlaw.K)
+
+    assert type(step).__name__ == "PiecewiseConstant200"
+
+    model.link(powerlaw.K, time, step)
+
+    step.value_150.value = 3.0
+
+    filename = str(tmp_path / "model.yml")
+
+    model.save(filename)
+
+    # the model can be read back in a new session, where the function class has not been used yet
+
+    script = (
+        "import threeML\n"
+        "from astromodels import load_model\n"
+        "model = load_model(%r)\n"
+        "model.time.value = 149.5\n"
+        "print(model.test.spectrum.main.Powerlaw.K.value)\n" % filename
+    )
+
+    output = subprocess.check_output([sys.executable, "-c", script])
+
+    assert float(output.decode().strip().splitlines()[-1]) == 3.0
+
+    # the class is created on demand also when astromodels looks it up by name
+
+    assert get_function_class("PiecewiseConstant1000").n_intervals == 1000
+
+
 def test_poisson_classes():
 
     net = 100
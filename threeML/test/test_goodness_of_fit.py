@@ -1,9 +1,13 @@
 import pytest
 
 import numpy as np
+import pandas as pd
 import scipy.stats
 
-from astromodels import Powerlaw
+from astromodels import Model, PointSource, Powerlaw
+from threeML.classicMLE.goodness_of_fit import GoodnessOfFit
+from threeML.classicMLE.joint_likelihood import JointLikelihood
+from threeML.data_list import DataList
 from threeML.plugins.XYLike import XYLike
 
 
@@ -42,3 +46,85 @@ def test_goodness_of_fit():
     theoretical_gof = scipy.stats.chi2(n_dof).sf(obs_chi2)
 
     assert np.isclose(theoretical_gof, gof["total"], rtol=0.1)
+
+
+class _XYLikeWithoutGenerator(XYLike):
+
+    # a plugin written before get_simulated_dataset accepted the random_generator keyword
+
+    def get_simulated_dataset(self, new_name=None):
+
+        return super(_XYLikeWithoutGenerator, self).get_simulated_dataset(new_name)
+
+
+def test_goodness_of_fit_plugin_without_random_generator():
+
+    gen_function = Powerlaw()
+
+    x = np.logspace(0, 2, 20)
+
+    xyl_generator = XYLike.from_function(
+        "sim_data", function=gen_function, x=x, yerr=0.3 * gen_function(x)
+    )
+
+    xyl = _XYLikeWithoutGenerator("data", x, xyl_generator.y, xyl_generator.yerr)
+
+    model = Model(PointSource("source", 0.0, 0.0, spectral_shape=Powerlaw()))
+
+    jl = JointLikelihood(model, DataList(xyl), verbose=False)
+
+    jl.fit(compute_covariance=False)
+
+    gof = GoodnessOfFit(jl)
+
+    np.random.seed(42)
+
+    state = np.random.get_state()
+
+    with pytest.warns(UserWarning, match="does not accept a random_generator"):
+
+        gof_value1, results1, _ = gof.by_mc(n_iterations=5, seed=1234)
+        gof_value2, results2, _ = gof.by_mc(n_iterations=5, seed=1234)
+
+    assert 0 <= gof_value1["total"] <= 1
+
+    # the global random state is seeded from the generator, so the simulations are still reproducible
+
+    pd.testing.assert_frame_equal(results1, results2)
+
+    # and it is restored afterwards
+
+    np.testing.assert_array_equal(np.random.get_state()[1], state[1])
+
+
+def test_goodness_of_fit_global_seed():
+
+    gen_function = Powerlaw()
+
+    x = np.logspace(0, 2, 20)
+
+    xyl_generator = XYLike.from_function(
+        "sim_data", function=gen_function, x=x, yerr=0.3 * gen_function(x)
+    )
+
+    xyl = XYLike("data", x, xyl_generator.y, xyl_generator.yerr)
+
+    model = Model(PointSource("source", 0.0, 0.0, spectral_shape=Powerlaw()))
+
+    jl = JointLikelihood(model, DataList(xyl), verbose=False)
+
+    jl.fit(compute_covariance=False)
+
+    gof = GoodnessOfFit(jl)
+
+    # without a seed, the simulations use the global numpy random state
+
+    np.random.seed(1234)
+
+    _, results1, _ = gof.by_mc(n_iterations=5)
+
+    np.random.seed(1234)
+
+    _, results2, _ = gof.by_mc(n_iterations=5)
+
+    pd.testing.assert_frame_equal(results1, results2)
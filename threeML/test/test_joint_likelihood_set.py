@@ -1,4 +1,7 @@
 from __future__ import print_function
+import numpy as np
+import pandas as pd
+import pytest
 from threeML import *
 from .conftest import get_grb_model
 
@@ -33,3 +36,124 @@ def test_joint_likelihood_set_parallel(data_list_bn090217206_nai6):
         res = jlset.go(compute_covariance=False)
 
     print(res)
+
+
+def test_joint_likelihood_set_without_analysis_results(data_list_bn090217206_nai6):
+    def get_data(id):
+        return data_list_bn090217206_nai6
+
+    jlset = JointLikelihoodSet(
+        data_getter=get_data, model_getter=get_model, n_iterations=3
+    )
+
+    parameters, likes = jlset.go(compute_covariance=False, keep_analysis_results=False)
+
+    assert parameters.shape[0] == 3 * 2
+
+    assert np.all(likes["-log(likelihood)"][:, "total"].values > 0)
+
+    with pytest.raises(AssertionError):
+
+        jlset.results
+
+
+def test_frames_collector():
+
+    from threeML.classicMLE.joint_likelihood_set import _FramesCollector
+
+    frames = []
+
+    for i in range(5):
+
+        # a failed fit gives an empty frame
+
+        if i == 2:
+
+            frames.append(pd.DataFrame())
+
+            continue
+
+        frames.append(
+            pd.DataFrame(
+                {"value": np.random.uniform(size=3), "unit": ["keV", "s", ""]},
+                index=["a", "b", "c"],
+            )
+        )
+
+    # start with a small capacity so that the arrays have to grow
+
+    collector = _FramesCollector(1)
+
+    for i, frame in enumerate(frames):
+
+        collector.append(i, frame)
+
+    expected = pd.concat(frames, keys=list(range(5)))
+
+    frame = collector.get_frame()
+
+    assert list(frame.columns) == list(expected.columns)
+    assert list(frame.index) == list(expected.index)
+
+    np.testing.assert_array_equal(frame["value"].values, expected["value"].values)
+    np.testing.assert_array_equal(frame["unit"].values, expected["unit"].values)
+
+
+def test_joint_likelihood_set_resume(data_list_bn090217206_nai6, tmpdir):
+
+    checkpoint_file = str(tmpdir.join("checkpoint.h5"))
+
+    crash = [True]
+
+    def get_data(id):
+
+        # simulate a crash in the middle of the run
+
+        if id == 2 and crash[0]:
+
+            raise RuntimeError("Crash")
+
+        return data_list_bn090217206_nai6
+
+    jlset = JointLikelihoodSet(
+        data_getter=get_data, model_getter=get_model, n_iterations=4
+    )
+
+    with pytest.raises(RuntimeError):
+
+        jlset.go(compute_covariance=False, checkpoint_file=checkpoint_file)
+
+    # the run cannot be restarted from scratch by mistake
+
+    with pytest.raises(IOError):
+
+        jlset.go(compute_covariance=False, checkpoint_file=checkpoint_file)
+
+    crash[0] = False
+
+    parameters, likes = jlset.go(
+        compute_covariance=False, checkpoint_file=checkpoint_file, resume=True
+    )
+
+    assert list(parameters.index.get_level_values(0).unique()) == [0, 1, 2, 3]
+
+    # all the iterations fit the same data
+
+    values = parameters["value"].values.reshape(4, -1)
+
+    np.testing.assert_allclose(values, np.tile(values[0], (4, 1)), rtol=1e-5)
+
+    assert len(jlset.results) == 4
+
+    # now all iterations are stored
+
+    parameters2, likes2 = jlset.go(
+        compute_covariance=False, checkpoint_file=checkpoint_file, resume=True
+    )
+
+    np.testing.assert_array_equal(
+        parameters2["value"].values, parameters["value"].values
+    )
+    np.testing.assert_array_equal(
+        likes2["-log(likelihood)"].values, likes["-log(likelihood)"].values
+    )
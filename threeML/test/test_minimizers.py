@@ -3,6 +3,8 @@ import numpy as np
 
 from threeML import LocalMinimization, GlobalMinimization
 from threeML import parallel_computation
+from threeML.config.config import threeML_config
+from threeML.utils.differentiation import get_hessian, get_richardson_hessian
 
 
 try:
@@ -137,3 +139,116 @@ def test_scipy(joint_likelihood_bn090217206_nai):
     )
 
     do_analysis(joint_likelihood_bn090217206_nai, minim)
+
+
+def test_covariance_methods(joint_likelihood_bn090217206_nai):
+
+    errors = {}
+    covariances = {}
+
+    for method in ("backend", "fast", "richardson", "numdifftools"):
+
+        minuit = LocalMinimization("minuit")
+        minuit.set_covariance_method(method)
+
+        joint_likelihood_bn090217206_nai.set_minimizer(minuit)
+
+        fit_results, like_frame = joint_likelihood_bn090217206_nai.fit()
+
+        check_results(fit_results)
+
+        errors[method] = fit_results["error"].values
+        covariances[method] = (
+            joint_likelihood_bn090217206_nai.results.covariance_matrix
+        )
+
+    assert np.allclose(errors["fast"], errors["numdifftools"], rtol=0.05)
+    assert np.allclose(errors["backend"], errors["numdifftools"], rtol=0.05)
+
+    assert np.allclose(
+        covariances["richardson"], covariances["numdifftools"], rtol=0.01
+    )
+
+    # the Richardson extrapolation of the batched stencils agrees with numdifftools on a real likelihood
+
+    minimizer = joint_likelihood_bn090217206_nai.minimizer
+
+    parameters = list(minimizer.parameters.values())
+
+    point = [parameter._get_internal_value() for parameter in parameters]
+    minima = [parameter._get_internal_min_value() for parameter in parameters]
+    maxima = [parameter._get_internal_max_value() for parameter in parameters]
+
+    assert np.allclose(
+        get_richardson_hessian(minimizer.function, point, minima, maxima),
+        get_hessian(minimizer.function, point, minima, maxima),
+        rtol=1e-3,
+    )
+
+    # the stencil can be evaluated on the engines, if requested explicitly
+
+    minuit = LocalMinimization("minuit")
+    minuit.set_covariance_method("richardson", parallel=True)
+
+    joint_likelihood_bn090217206_nai.set_minimizer(minuit)
+
+    with parallel_computation(start_cluster=False):
+
+        joint_likelihood_bn090217206_nai.fit()
+
+    assert np.allclose(
+        joint_likelihood_bn090217206_nai.results.covariance_matrix,
+        covariances["richardson"],
+        rtol=1e-3,
+    )
+
+    # The inverse Hessian of L-BFGS-B is only a low-rank approximation, so scipy falls back to the
+    # numerical Hessian
+
+    minim = LocalMinimization("scipy")
+    minim.set_covariance_method("backend")
+
+    with pytest.warns(UserWarning, match="does not provide a covariance matrix"):
+
+        do_analysis(joint_likelihood_bn090217206_nai, minim)
+
+    assert joint_likelihood_bn090217206_nai.minimizer.covariance_method == "backend"
+
+
+def test_parallel_errors(joint_likelihood_bn090217206_nai):
+
+    minim = LocalMinimization("scipy")
+
+    do_analysis(joint_likelihood_bn090217206_nai, minim)
+
+    serial_errors = joint_likelihood_bn090217206_nai.get_errors()
+
+    with parallel_computation(start_cluster=False):
+
+        parallel_errors = joint_likelihood_bn090217206_nai.get_errors()
+
+    assert np.allclose(
+        serial_errors["negative_error"], parallel_errors["negative_error"], rtol=1e-3
+    )
+    assert np.allclose(
+        serial_errors["positive_error"], parallel_errors["positive_error"], rtol=1e-3
+    )
+
+    assert list(serial_errors.index) == list(parallel_errors.index)
+
+
+def test_analytic_gradient(joint_likelihood_bn090217206_nai):
+
+    threeML_config["mle"]["use analytic gradient"] = True
+
+    try:
+
+        for minimizer in ("minuit", "scipy"):
+
+            do_analysis(joint_likelihood_bn090217206_nai, minimizer)
+
+            assert joint_likelihood_bn090217206_nai.minimizer.gradient is not None
+
+    finally:
+
+        threeML_config["mle"]["use analytic gradient"] = False
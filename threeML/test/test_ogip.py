@@ -413,6 +413,146 @@ def test_likelihood_ratio_test():
     )
 
 
+def test_simulations_with_seed():
+    with within_directory(__example_dir):
+        ogip = OGIPLike("test_ogip", observation="test.pha{1}")
+
+        ogip.set_active_measurements("all")
+
+        ab = AnalysisBuilder(ogip)
+
+        jl1 = ab.get_jl("normal")
+        jl1.fit(compute_covariance=False)
+
+        jl2 = ab.get_jl("cpl")
+        jl2.fit(compute_covariance=False)
+
+    # the same generator gives the same data set
+
+    sim1 = ogip.get_simulated_dataset("sim1", random_generator=np.random.default_rng(42))
+    sim2 = ogip.get_simulated_dataset("sim2", random_generator=np.random.default_rng(42))
+
+    npt.assert_array_equal(sim1.observed_counts, sim2.observed_counts)
+    npt.assert_array_equal(sim1.background_counts, sim2.background_counts)
+
+    # and the same seed gives the same TS distribution
+
+    lrt = LikelihoodRatioTest(jl1, jl2)
+
+    _, TS1, _, _ = lrt.by_mc(n_iterations=5, continue_on_failure=True, seed=42)
+    _, TS2, _, _ = lrt.by_mc(n_iterations=5, continue_on_failure=True, seed=42)
+
+    npt.assert_array_equal(TS1, TS2)
+
+
+def test_simulated_counts_in_place():
+    with within_directory(__example_dir):
+        ogip = OGIPLike("test_ogip", observation="test.pha{1}")
+
+        ogip.set_active_measurements("all")
+
+        ogip.use_effective_area_correction()
+
+        ab = AnalysisBuilder(ogip)
+
+        jl = ab.get_jl("normal")
+
+        jl.fit(compute_covariance=False)
+
+        observed_counts = ogip.observed_counts.copy()
+
+        ratios = (ogip.area_ratio, ogip.exposure_ratio, ogip.background_exposure)
+
+        best_fit_values = [
+            parameter.value
+            for parameter in list(jl.likelihood_model.free_parameters.values())
+        ]
+        observed_background = ogip.background_counts.copy()
+
+        counts, count_errors, background_counts, background_count_errors = ogip.get_simulated_counts(
+            10, np.random.default_rng(1234)
+        )
+
+        assert counts.shape == (10, ogip.n_data_points)
+
+        # the same generator gives the same simulations
+
+        counts2, _, background_counts2, _ = ogip.get_simulated_counts(
+            10, np.random.default_rng(1234)
+        )
+
+        npt.assert_array_equal(counts, counts2)
+        npt.assert_array_equal(background_counts, background_counts2)
+
+        ogip.set_simulated_counts(
+            counts[3], count_errors, background_counts[3], background_count_errors
+        )
+
+        npt.assert_array_equal(ogip.observed_counts, counts[3])
+        npt.assert_array_equal(ogip.background_counts, background_counts[3])
+
+        # the simulated background has the same exposure and area as the observation
+
+        assert ogip.area_ratio == 1.0
+        assert ogip.exposure_ratio == 1.0
+        assert ogip.background_exposure == ogip.exposure
+
+        ogip.restore_observed_counts()
+
+        npt.assert_array_equal(ogip.observed_counts, observed_counts)
+        npt.assert_array_equal(ogip.background_counts, observed_background)
+
+        assert (
+            ogip.area_ratio,
+            ogip.exposure_ratio,
+            ogip.background_exposure,
+        ) == ratios
+
+        gof = GoodnessOfFit(jl)
+
+        gof_value, data_frame, like_data_frame = gof.by_mc(
+            n_iterations=5, continue_on_failure=True, in_place=True, seed=1234
+        )
+
+        assert 0 <= gof_value["total"] <= 1
+
+        npt.assert_array_equal(ogip.observed_counts, observed_counts)
+
+        # the parameters (including the effective area correction of the plugin) are back to the best fit
+
+        npt.assert_array_equal(
+            [
+                parameter.value
+                for parameter in list(jl.likelihood_model.free_parameters.values())
+            ],
+            best_fit_values,
+        )
+
+        jl2 = ab.get_jl("cpl")
+        jl2.fit(compute_covariance=False)
+
+        lrt = LikelihoodRatioTest(jl, jl2)
+
+        cpl_values = [
+            parameter.value
+            for parameter in list(jl2.likelihood_model.free_parameters.values())
+        ]
+
+        null_hyp_prob, TS, data_frame, like_data_frame = lrt.by_mc(
+            n_iterations=5, continue_on_failure=True, in_place=True, seed=1234
+        )
+
+        assert len(TS) == 5
+
+        npt.assert_array_equal(
+            [
+                parameter.value
+                for parameter in list(jl2.likelihood_model.free_parameters.values())
+            ],
+            cpl_values,
+        )
+
+
 def test_xrt():
     with within_directory(__example_dir):
         trigger = "GRB110731A"
@@ -9,7 +9,7 @@ from threeML.utils.OGIP.response import (
     InstrumentResponse,
     OGIPResponse,
 )
-from threeML.utils.time_interval import TimeInterval
+from threeML.utils.time_interval import TimeInterval, TimeIntervalSet
 
 
 def get_matrix_elements():
@@ -428,3 +428,36 @@ def test_response_set_weighting_with_disjoint_intervals():
     factor = 1.0 / (w1 + w2 + w3) * (w1 + w2 / 2.0 + w3 / 2.0)
 
     assert np.allclose(weighted_matrix.matrix, factor * rsp_a.matrix)
+
+
+def test_response_set_weighting_per_interval():
+
+    (
+        [rsp_a, rsp_b],
+        exposure_getter,
+        counts_getter,
+    ) = get_matrix_set_elements_with_coverage()
+
+    rsp_set = InstrumentResponseSet([rsp_a, rsp_b], exposure_getter, counts_getter)
+
+    intervals = TimeIntervalSet.from_strings(
+        "0.0-5.0", "5.0-25.0", "12.0-15.0", "20.0-30.0"
+    )
+
+    responses = rsp_set.weight_by_counts_per_interval(intervals)
+
+    assert len(responses) == 4
+
+    # each interval gets the same response as if it was weighted alone
+
+    for interval, response in zip(intervals, responses):
+
+        weighted_matrix = rsp_set.weight_by_counts(interval.to_string())
+
+        assert np.allclose(response.matrix, weighted_matrix.matrix)
+
+    # the intervals covered by the second matrix only share the same response
+
+    assert responses[2] is responses[3]
+
+    assert responses[0] is not responses[1]
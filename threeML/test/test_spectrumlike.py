@@ -1,8 +1,11 @@
+import numdifftools as nd
 import numpy as np
 import pytest
 from astromodels import Blackbody, Powerlaw, Model, PointSource
 
 from threeML import JointLikelihood, DataList
+from threeML.classicMLE.goodness_of_fit import GoodnessOfFit
+from threeML.config.config import threeML_config
 from threeML.io.package_data import get_path_of_data_file
 from threeML.plugins.DispersionSpectrumLike import DispersionSpectrumLike
 from threeML.plugins.SpectrumLike import SpectrumLike
@@ -277,6 +280,12 @@ def test_spectrum_like_with_background_model():
         np.isclose([K_variates.average, kT_variates.average], [sim_K, sim_kT], rtol=0.5)
     )
 
+    # the in-place simulations do not support a modeled background
+
+    with pytest.raises(NotImplementedError, match="modeled background"):
+
+        GoodnessOfFit(jl).by_mc(n_iterations=2, in_place=True)
+
 
 def test_all_statistics():
 
@@ -364,3 +373,138 @@ def test_all_statistics():
     spectrum_generator.set_model(model)
 
     spectrum_generator.get_log_like()
+
+
+def _check_log_like_gradient(plugin, model):
+
+    assert plugin.has_log_like_gradient()
+
+    parameters = model.free_parameters
+
+    def log_like(values):
+
+        for value, parameter in zip(values, parameters.values()):
+
+            parameter._set_internal_value(value)
+
+        return plugin.get_log_like()
+
+    point = np.array([par._get_internal_value() for par in parameters.values()])
+
+    expected = nd.Gradient(log_like)(point)
+
+    log_like(point)
+
+    gradient = plugin.get_log_like_gradient(parameters)
+
+    assert np.allclose(gradient, expected, rtol=1e-3)
+
+
+def test_log_like_gradient():
+
+    energies = np.logspace(1, 3, 51)
+
+    low_edge = energies[:-1]
+    high_edge = energies[1:]
+
+    source_function = Blackbody(K=9e-2, kT=20)
+
+    background_function = Powerlaw(K=1, index=-1.5, piv=100.0)
+
+    bb = Blackbody(K=7e-2, kT=25)
+
+    model = Model(PointSource("mysource", 0, 0, spectral_shape=bb))
+
+    # Poisson with no background, Poisson background and ideal background
+
+    for kwargs in [{}, {"background_function": background_function}]:
+
+        spectrum_generator = SpectrumLike.from_function(
+            "fake",
+            source_function=source_function,
+            energy_min=low_edge,
+            energy_max=high_edge,
+            **kwargs
+        )
+
+        spectrum_generator.set_model(model)
+
+        _check_log_like_gradient(spectrum_generator, model)
+
+    spectrum_generator.background_noise_model = "ideal"
+
+    _check_log_like_gradient(spectrum_generator, model)
+
+    # Poisson with Gaussian background
+
+    spectrum_generator = SpectrumLike.from_function(
+        "fake",
+        source_function=source_function,
+        background_function=background_function,
+        background_errors=0.1 * background_function(low_edge),
+        energy_min=low_edge,
+        energy_max=high_edge,
+    )
+
+    spectrum_generator.set_model(model)
+
+    _check_log_like_gradient(spectrum_generator, model)
+
+    # Gaussian
+
+    spectrum_generator = SpectrumLike.from_function(
+        "fake",
+        source_function=source_function,
+        source_errors=0.5 * source_function(low_edge),
+        energy_min=low_edge,
+        energy_max=high_edge,
+    )
+
+    spectrum_generator.set_model(model)
+
+    _check_log_like_gradient(spectrum_generator, model)
+
+    # With a response, through the joint likelihood and with an effective area correction
+
+    response = OGIPResponse(get_path_of_data_file("datasets/ogip_powerlaw.rsp"))
+
+    spectrum_generator = DispersionSpectrumLike.from_function(
+        "test",
+        source_function=source_function,
+        response=response,
+        background_function=background_function,
+    )
+
+    spectrum_generator.use_effective_area_correction()
+
+    jl = JointLikelihood(model, DataList(spectrum_generator))
+
+    jl._update_free_parameters()
+
+    parameters = jl.likelihood_model.free_parameters
+
+    point = np.array([par._get_internal_value() for par in parameters.values()])
+
+    expected = nd.Gradient(lambda x: jl.minus_log_like_profile(*x))(point)
+
+    assert np.allclose(jl.minus_log_like_gradient(*point), expected, rtol=1e-3)
+
+    threeML_config["mle"]["use analytic gradient"] = True
+
+    try:
+
+        assert jl._get_gradient_function() is not None
+
+        result = jl.fit()
+
+    finally:
+
+        threeML_config["mle"]["use analytic gradient"] = False
+
+    K_variates = jl.results.get_variates("mysource.spectrum.main.Blackbody.K")
+
+    kT_variates = jl.results.get_variates("mysource.spectrum.main.Blackbody.kT")
+
+    assert np.all(
+        np.isclose([K_variates.average, kT_variates.average], [9e-2, 20.0], atol=1)
+    )
@@ -1,5 +1,6 @@
 from __future__ import print_function
 from builtins import zip
+import numpy as np
 import pytest
 
 from threeML.utils.time_interval import TimeInterval, TimeIntervalSet
@@ -474,3 +475,46 @@ def test_time_edges():
         ts1 = TimeIntervalSet([t1, t2, t3])
 
         _ = ts1.time_edges
+
+
+def test_time_interval_set_arrays():
+
+    starts = np.arange(1000, dtype=float)
+    stops = starts + 1.0
+
+    ts = TimeIntervalSet.from_starts_and_stops(starts, stops)
+
+    assert len(ts) == 1000
+
+    np.testing.assert_array_equal(ts.start_times, starts)
+    np.testing.assert_array_equal(ts.stop_times, stops)
+    np.testing.assert_array_equal(ts.widths, np.ones(1000))
+    np.testing.assert_array_equal(ts.mid_points, starts + 0.5)
+    np.testing.assert_array_equal(ts.time_edges, np.arange(1001, dtype=float))
+
+    # the intervals are created when needed, with the right type
+
+    assert isinstance(ts[10], TimeInterval)
+    assert ts[-1] == TimeInterval(999.0, 1000.0)
+    assert all(isinstance(x, TimeInterval) for x in ts)
+
+    mask = ts.containing_interval(10.0, 20.0, as_mask=True)
+
+    assert np.sum(mask) == 10
+
+    assert len(ts.containing_interval(10.0, 20.0)) == 10
+
+    with pytest.raises(RuntimeError):
+
+        TimeIntervalSet.from_starts_and_stops([0.0, 2.0], [1.0, 1.0])
+
+    # a chain of overlapping intervals is merged into one
+
+    ts = TimeIntervalSet.from_starts_and_stops(
+        [0.0, 1.0, 2.0, 3.0], [1.5, 2.5, 3.5, 4.5]
+    )
+
+    ts2 = ts.merge_intersecting_intervals()
+
+    assert len(ts2) == 1
+    assert ts2[0] == TimeInterval(0.0, 4.5)
@@ -9,6 +9,11 @@ from threeML.utils.data_builders.time_series_builder import TimeSeriesBuilder
 from threeML.io.file_utils import within_directory
 from threeML.plugins.DispersionSpectrumLike import DispersionSpectrumLike
 from threeML.plugins.OGIPLike import OGIPLike
+from threeML.plugins.TimeResolvedSpectrumLike import TimeResolvedSpectrumLike
+from threeML.utils.OGIP.response import OGIPResponse
+from threeML.utils.step_parameter_generator import step_generator
+from astromodels import IndependentVariable, Log_parabola, Model, PointSource, Powerlaw
+import astropy.units as u
 from .conftest import get_test_datasets_directory
 import astropy.io.fits as fits
 
@@ -233,6 +238,275 @@ def test_read_gbm_tte():
         nai3.write_pha_from_binner("test_from_nai3", overwrite=True)
 
 
+def test_to_spectrumlike_from_bins():
+    with within_directory(datasets_directory):
+        data_dir = os.path.join("gbm", "bn080916009")
+
+        nai3 = TimeSeriesBuilder.from_gbm_tte(
+            "NAI3",
+            os.path.join(data_dir, "glg_tte_n3_bn080916009_v01.fit.gz"),
+            rsp_file=os.path.join(data_dir, "glg_cspec_n3_bn080916009_v00.rsp2"),
+            poly_order=-1,
+        )
+
+        nai3.set_background_interval("-20--10", "100-200")
+
+        nai3.create_time_bins(start=0, stop=5, method="constant", dt=1)
+
+        for extract in (False, True):
+
+            speclikes = nai3.to_spectrumlike(
+                from_bins=True, extract_measured_background=extract
+            )
+
+            assert len(speclikes) == 5
+
+            # the plugins are the same as those from each interval selected alone
+
+            for interval, speclike in zip(nai3.bins, speclikes):
+
+                nai3.set_active_time_interval(interval.to_string())
+
+                expected = nai3.to_spectrumlike(extract_measured_background=extract)
+
+                for spectrum, expected_spectrum in (
+                    (speclike.observed_spectrum, expected.observed_spectrum),
+                    (speclike.background_spectrum, expected.background_spectrum),
+                ):
+
+                    np.testing.assert_allclose(
+                        spectrum.counts, expected_spectrum.counts, rtol=1e-9
+                    )
+
+                    np.testing.assert_allclose(
+                        spectrum.exposure, expected_spectrum.exposure, rtol=1e-9
+                    )
+
+                    if expected_spectrum.count_errors is not None:
+
+                        np.testing.assert_allclose(
+                            spectrum.count_errors,
+                            expected_spectrum.count_errors,
+                            rtol=1e-9,
+                        )
+
+                np.testing.assert_allclose(
+                    speclike.response.matrix, expected.response.matrix
+                )
+
+                assert speclike.tstart == interval.start_time
+                assert speclike.tstop == interval.stop_time
+
+        # the lazy version creates the same plugins
+
+        lazy_speclikes = nai3.to_spectrumlike(from_bins=True, lazy=True)
+
+        assert [speclike.name for speclike in lazy_speclikes] == [
+            speclike.name for speclike in speclikes
+        ]
+
+
+def test_to_time_resolved_spectrumlike():
+    with within_directory(datasets_directory):
+        data_dir = os.path.join("gbm", "bn080916009")
+
+        nai3 = TimeSeriesBuilder.from_gbm_tte(
+            "NAI3",
+            os.path.join(data_dir, "glg_tte_n3_bn080916009_v01.fit.gz"),
+            rsp_file=os.path.join(data_dir, "glg_cspec_n3_bn080916009_v00.rsp2"),
+            poly_order=-1,
+        )
+
+        # a single response, so that the plugins of the bins share it
+
+        nai3 = TimeSeriesBuilder(
+            "NAI3",
+            nai3.time_series,
+            response=OGIPResponse(
+                os.path.join(data_dir, "glg_cspec_n3_bn080916009_v00.rsp2")
+            ),
+            poly_order=-1,
+        )
+
+        nai3.set_background_interval("-20--10", "100-200")
+
+        nai3.create_time_bins(start=0, stop=5, method="constant", dt=1)
+
+        intervals = np.vstack((nai3.bins.start_times, nai3.bins.stop_times)).T
+
+        for extract in (False, True):
+
+            powerlaw = Powerlaw()
+
+            model = Model(PointSource("grb", 0, 0, spectral_shape=powerlaw))
+
+            time = IndependentVariable("time", 0.0, u.s)
+
+            model.add_independent_variable(time)
+
+            step = step_generator(intervals, powerlaw.K)
+
+            model.link(powerlaw.K, time, step)
+
+            for i, parameter in enumerate(step.free_parameters.values()):
+
+                parameter.value = 0.5 + i
+
+            time_resolved = nai3.to_time_resolved_spectrumlike(
+                extract_measured_background=extract
+            )
+
+            speclikes = nai3.to_spectrumlike(
+                from_bins=True, extract_measured_background=extract
+            )
+
+            assert time_resolved.n_time_bins == len(speclikes)
+
+            # the data of the bins are the same as in the plugins of the single bins
+
+            for i, speclike in enumerate(speclikes):
+
+                np.testing.assert_allclose(
+                    time_resolved.observed_counts[i],
+                    speclike.observed_spectrum.counts,
+                    rtol=1e-9,
+                )
+
+                np.testing.assert_allclose(
+                    time_resolved.background_counts[i],
+                    speclike.background_spectrum.counts,
+                    rtol=1e-9,
+                )
+
+                np.testing.assert_allclose(
+                    time_resolved.exposures[i], speclike.exposure, rtol=1e-9
+                )
+
+            # with the counts of the single bin plugins, the shared folding of all the bins gives
+            # the sum of their log-likelihoods
+
+            if extract:
+
+                background_errors = None
+                background_exposures = [
+                    speclike.exposure / speclike.scale_factor for speclike in speclikes
+                ]
+
+            else:
+
+                background_errors = [
+                    speclike.background_spectrum.count_errors for speclike in speclikes
+                ]
+                background_exposures = None
+
+            time_resolved = TimeResolvedSpectrumLike(
+                "time_resolved",
+                counts=[speclike.observed_counts for speclike in speclikes],
+                exposures=time_resolved.exposures,
+                response=time_resolved.response,
+                time_intervals=time_resolved.time_intervals,
+                background_counts=[
+                    speclike.background_counts for speclike in speclikes
+                ],
+                background_errors=background_errors,
+                background_exposures=background_exposures,
+                independent_variable=time,
+            )
+
+            time_resolved.set_active_measurements("10-900")
+            time_resolved.set_model(model)
+
+            log_like = 0.0
+
+            for speclike in speclikes:
+
+                speclike.set_active_measurements("10-900")
+                speclike.tag = (time, 0.5 * (speclike.tstart + speclike.tstop))
+                speclike.set_model(model)
+
+                np.testing.assert_array_equal(speclike.mask, time_resolved.mask)
+
+                log_like += speclike.get_log_like()
+
+            np.testing.assert_allclose(time_resolved.get_log_like(), log_like, rtol=1e-9)
+
+            assert time_resolved.get_number_of_data_points() == sum(
+                speclike.get_number_of_data_points() for speclike in speclikes
+            )
+
+            # the numba-compiled Powerlaw only accepts scalar parameters, so it is evaluated
+            # once per time bin
+
+            assert not time_resolved._stacked_evaluation
+
+            # the log-likelihood of each active channel of each bin
+
+            pointwise_log_like = time_resolved.get_pointwise_log_like()
+
+            assert pointwise_log_like.shape == (
+                time_resolved.get_number_of_data_points(),
+            )
+
+            np.testing.assert_allclose(np.sum(pointwise_log_like), log_like, rtol=1e-9)
+
+            # the simulations are reproducible and keep the selection
+
+            sim1 = time_resolved.get_simulated_dataset(
+                "sim1", random_generator=np.random.default_rng(42)
+            )
+            sim2 = time_resolved.get_simulated_dataset(
+                "sim2", random_generator=np.random.default_rng(42)
+            )
+
+            assert sim1.observed_counts.shape == time_resolved.observed_counts.shape
+
+            np.testing.assert_array_equal(sim1.observed_counts, sim2.observed_counts)
+            np.testing.assert_array_equal(
+                sim1.background_counts, sim2.background_counts
+            )
+            np.testing.assert_array_equal(sim1.mask, time_resolved.mask)
+
+            sim1.set_model(model)
+
+            assert np.isfinite(sim1.get_log_like())
+
+        # functions which accept arrays of parameters are evaluated for all the bins with one call
+
+        log_parabola = Log_parabola()
+
+        model = Model(PointSource("grb", 0, 0, spectral_shape=log_parabola))
+
+        time = IndependentVariable("time", 0.0, u.s)
+
+        model.add_independent_variable(time)
+
+        step = step_generator(intervals, log_parabola.K)
+
+        model.link(log_parabola.K, time, step)
+
+        for i, parameter in enumerate(step.free_parameters.values()):
+
+            parameter.value = 0.5 + i
+
+        time_resolved = nai3.to_time_resolved_spectrumlike(independent_variable=time)
+
+        time_resolved.set_model(model)
+
+        folded_model = time_resolved.get_folded_model()
+
+        assert time_resolved._stacked_evaluation
+
+        # the model is linear in K
+
+        for parameter in step.free_parameters.values():
+
+            parameter.value *= 2
+
+        np.testing.assert_allclose(
+            time_resolved.get_folded_model(), 2 * folded_model, rtol=1e-9
+        )
+
+
 def test_reading_of_written_pha():
     with within_directory(datasets_directory):
         # check the number of items written
@@ -677,18 +677,18 @@ class InstrumentResponseSet(object):
 
         # Create the corresponding list of coverage intervals
 
-        self._coverage_intervals = TimeIntervalSet(
-            [x.coverage_interval for x in self._matrix_list]
-        )
+        coverage_intervals = [x.coverage_interval for x in self._matrix_list]
 
         # Make sure that all matrices have coverage interval set
 
-        if None in self._coverage_intervals:
+        if None in coverage_intervals:
 
             raise NoCoverageIntervals(
                 "You need to specify the coverage interval for all matrices in the matrix_list"
             )
 
+        self._coverage_intervals = TimeIntervalSet(coverage_intervals)
+
         # Remove from the list matrices that cover intervals of zero duration (yes, the GBM publishes those too,
         # one example is in data/ogip_test_gbm_b0.rsp2)
         to_be_removed = []
@@ -856,6 +856,36 @@ class InstrumentResponseSet(object):
 
         return self._get_weighted_matrix("counts", *intervals)
 
+    def weight_by_counts_per_interval(self, time_intervals):
+        """
+        Weight the matrices by counts separately for each interval of a set. The intervals
+        with the same weights (for example the intervals covered by one matrix only) share
+        the same response instance
+
+        :param time_intervals: a TimeIntervalSet
+        :return: list of responses, one for each interval
+        """
+
+        responses = []
+
+        responses_by_weights = {}
+
+        for interval in time_intervals:
+
+            weights = self._weight_response(interval, "counts")
+
+            weights /= np.sum(weights)
+
+            key = weights.tobytes()
+
+            if key not in responses_by_weights:
+
+                responses_by_weights[key] = self._build_weighted_matrix(weights)
+
+            responses.append(responses_by_weights[key])
+
+        return responses
+
     def _get_weighted_matrix(self, switch, *intervals):
 
         assert len(intervals) > 0, "You have to provide at least one interval"
@@ -872,6 +902,10 @@ class InstrumentResponseSet(object):
         # Normalize to 1
         weights /= np.sum(weights)
 
+        return self._build_weighted_matrix(weights)
+
+    def _build_weighted_matrix(self, weights):
+
         # Weight matrices
         matrix = np.dot(
             np.array(list(map(attrgetter("matrix"), self._matrix_list))).T, weights.T
@@ -1,4 +1,5 @@
 import numpy as np
+from numba import njit
 
 from threeML.io.progress_bar import progress_bar
 from threeML.utils.bayesian_blocks import bayesian_blocks, bayesian_blocks_not_unique
@@ -11,129 +12,201 @@ class NotEnoughData(RuntimeError):
     pass
 
 
-class Rebinner(object):
+# number of candidate stops tested at once in the first step of the significance binning (the blocks then double)
+
+_SIGNIFICANCE_BLOCK_SIZE = 64
+
+
+def _evaluate_getter(getter, start, stops):
     """
-    A class to rebin vectors keeping a minimum value per bin. It supports array with a mask, so that elements excluded
-    through the mask will not be considered for the rebinning
+    Evaluate a function of a start and stop time for one start and an array of stops. The function is first called
+    with the whole array, and if it does not support it, once for each stop
 
+    :param getter: function of a start and stop time
+    :param start: the start time
+    :param stops: array of stop times
+    :return: array with the values of the function for each stop
     """
 
-    def __init__(self, vector_to_rebin_on, min_value_per_bin, mask=None):
+    try:
 
-        # Basic check that it is possible to do what we have been requested to do
+        values = np.asarray(getter(start, stops), dtype=float)
 
-        total = np.sum(vector_to_rebin_on)
+    except Exception:
 
-        if total < min_value_per_bin:
-            raise NotEnoughData(
-                "Vector total is %s, cannot rebin at %s per bin"
-                % (total, min_value_per_bin)
-            )
+        values = None
 
-        # Check if we have a mask, if not prepare a empty one
-        if mask is not None:
+    if values is None or values.shape != stops.shape:
 
-            mask = np.array(mask, bool)
+        values = np.array(
+            [getter(start, stop) for stop in stops], dtype=float
+        ).reshape(stops.shape)
 
-            assert mask.shape[0] == len(vector_to_rebin_on), (
-                "The provided mask must have the same number of "
-                "elements as the vector to rebin on"
-            )
+    return values
 
-        else:
 
-            mask = np.ones_like(vector_to_rebin_on, dtype=bool)
+@njit
+def _find_groups(vector, mask, min_value_per_bin):
+    """
+    Group consecutive elements of the vector until their sum reaches min_value_per_bin. Elements excluded by the
+    mask are not used, and they also close the current bin.
 
-        self._mask = mask
+    :param vector: the vector to rebin on
+    :param mask: boolean mask of the elements to use
+    :param min_value_per_bin: the minimum sum for each bin
+    :return: (starts, stops, grouping), where each bin is vector[start:stop], and grouping is the OGIP grouping
+    """
 
-        # Rebin taking the mask into account
+    n_elements = vector.shape[0]
 
-        self._starts = []
-        self._stops = []
-        self._grouping = np.zeros_like(vector_to_rebin_on)
+    starts = np.zeros(n_elements, dtype=np.int64)
+    stops = np.zeros(n_elements, dtype=np.int64)
+    grouping = np.zeros(n_elements, dtype=np.int64)
 
-        n = 0
-        bin_open = False
+    n_bins = 0
+    n = 0.0
+    bin_open = False
 
-        n_grouped_bins = 0
+    n_grouped_bins = 0
 
-        for index, b in enumerate(vector_to_rebin_on):
+    for index in range(n_elements):
 
-            if not mask[index]:
+        if not mask[index]:
 
-                # This element is excluded by the mask
+            # This element is excluded by the mask
 
-                if not bin_open:
+            if not bin_open:
 
-                    # Do nothing
-                    continue
+                # Do nothing
+                continue
 
-                else:
+            # We need to close the bin here
+            stops[n_bins] = index
+            n_bins += 1
 
-                    # We need to close the bin here
-                    self._stops.append(index)
-                    n = 0
-                    bin_open = False
+            n = 0.0
+            bin_open = False
 
-                    # If we have grouped more than one bin
+            # If we have grouped more than one bin
 
-                    if n_grouped_bins > 1:
+            if n_grouped_bins > 1:
 
-                        # group all these bins
-                        self._grouping[index - n_grouped_bins + 1 : index] = -1
-                        self._grouping[index] = 1
+                # group all these bins
+                grouping[index - n_grouped_bins + 1 : index] = -1
+                grouping[index] = 1
 
-                    # reset the number of bins in this group
+            # reset the number of bins in this group
 
-                    n_grouped_bins = 0
+            n_grouped_bins = 0
 
-            else:
+        else:
+
+            # This element is included by the mask
+
+            if not bin_open:
+
+                # Open a new bin
+                bin_open = True
 
-                # This element is included by the mask
+                starts[n_bins] = index
+                n = 0.0
 
-                if not bin_open:
-                    # Open a new bin
-                    bin_open = True
+            # Add the current value to the open bin
 
-                    self._starts.append(index)
-                    n = 0
+            n += vector[index]
 
-                # Add the current value to the open bin
+            n_grouped_bins += 1
 
-                n += b
+            # If we are beyond the requested value, close the bin
 
-                n_grouped_bins += 1
+            if n >= min_value_per_bin:
 
-                # If we are beyond the requested value, close the bin
+                stops[n_bins] = index + 1
+                n_bins += 1
 
-                if n >= min_value_per_bin:
-                    self._stops.append(index + 1)
+                n = 0.0
+                bin_open = False
 
-                    n = 0
+                # If we have grouped more than one bin
 
-                    bin_open = False
+                if n_grouped_bins > 1:
 
-                    # If we have grouped more than one bin
+                    # group all these bins
+                    grouping[index - n_grouped_bins + 1 : index] = -1
+                    grouping[index] = 1
 
-                    if n_grouped_bins > 1:
+                # reset the number of bins in this group
 
-                        # group all these bins
-                        self._grouping[index - n_grouped_bins + 1 : index] = -1
-                        self._grouping[index] = 1
+                n_grouped_bins = 0
 
-                    # reset the number of bins in this group
+    # At the end of the loop, see if we left a bin open, if we did, close it
 
-                    n_grouped_bins = 0
+    if bin_open:
 
-        # At the end of the loop, see if we left a bin open, if we did, close it
+        stops[n_bins] = n_elements
+        n_bins += 1
 
-        if bin_open:
-            self._stops.append(len(vector_to_rebin_on))
+    return starts[:n_bins], stops[:n_bins], grouping
 
-        assert len(self._starts) == len(self._stops), (
-            "This is a bug: the starts and stops of the bins are not in " "equal number"
+
+class Rebinner(object):
+    """
+    A class to rebin vectors keeping a minimum value per bin. It supports array with a mask, so that elements excluded
+    through the mask will not be considered for the rebinning
+
+    """
+
+    def __init__(self, vector_to_rebin_on, min_value_per_bin, mask=None):
+
+        # Basic check that it is possible to do what we have been requested to do
+
+        total = np.sum(vector_to_rebin_on)
+
+        if total < min_value_per_bin:
+            raise NotEnoughData(
+                "Vector total is %s, cannot rebin at %s per bin"
+                % (total, min_value_per_bin)
+            )
+
+        # Check if we have a mask, if not prepare a empty one
+        if mask is not None:
+
+            mask = np.array(mask, bool)
+
+            assert mask.shape[0] == len(vector_to_rebin_on), (
+                "The provided mask must have the same number of "
+                "elements as the vector to rebin on"
+            )
+
+        else:
+
+            mask = np.ones_like(vector_to_rebin_on, dtype=bool)
+
+        self._mask = mask
+
+        # Rebin taking the mask into account
+
+        starts, stops, grouping = _find_groups(
+            np.asarray(vector_to_rebin_on, dtype=float), mask, float(min_value_per_bin)
         )
 
+        self._starts = starts
+        self._stops = stops
+
+        self._grouping = np.zeros_like(vector_to_rebin_on)
+        self._grouping[:] = grouping
+
+        # The indices for np.add.reduceat: each bin is the slice between a start and the following stop. The slices
+        # between a stop and the following start (excluded by the mask) are computed as well, and thrown away.
+        # reduceat sums up to the end of the vector after the last index, so a stop at the end is not needed
+        # (and it would not be a valid index)
+
+        self._reduce_indices = np.vstack((starts, stops)).T.flatten()
+
+        if self.n_bins > 0 and self._reduce_indices[-1] == len(mask):
+
+            self._reduce_indices = self._reduce_indices[:-1]
+
         self._min_value_per_bin = min_value_per_bin
 
     @property
@@ -144,50 +217,37 @@ class Rebinner(object):
         :return:
         """
 
-        return len(self._starts)
+        return self._starts.shape[0]
 
     @property
     def grouping(self):
 
         return self._grouping
 
-    def rebin(self, *vectors):
-
-        rebinned_vectors = []
-
-        for vector in vectors:
-
-            assert len(vector) == len(self._mask), (
-                "The vector to rebin must have the same number of elements of the"
-                "original (not-rebinned) vector"
-            )
+    def _sum_in_bins(self, vector):
 
-            # Transform in array because we need to use the mask
-            vector_a = np.array(vector)
+        assert len(vector) == len(self._mask), (
+            "The vector to rebin must have the same number of elements of the"
+            "original (not-rebinned) vector"
+        )
 
-            rebinned_vector = []
+        if self.n_bins == 0:
 
-            for low_bound, hi_bound in zip(self._starts, self._stops):
+            return np.zeros(0, dtype=vector.dtype)
 
-                rebinned_vector.append(np.sum(vector_a[low_bound:hi_bound]))
+        # Only the even slices are bins (see the constructor)
 
-            # Vector might not contain counts, so we use a relative comparison to check that we didn't miss
-            # anything.
-            # NOTE: we add 1e-100 because if both rebinned_vector and vector_a contains only 0, the check would
-            # fail when it shouldn't
+        return np.add.reduceat(vector, self._reduce_indices)[::2]
 
-            assert (
-                abs(
-                    (np.sum(rebinned_vector) + 1e-100)
-                    / (np.sum(vector_a[self._mask]) + 1e-100)
-                    - 1
-                )
-                < 1e-4
-            )
+    def rebin(self, *vectors):
+        """
+        Rebin vectors by summing the values in each bin
 
-            rebinned_vectors.append(np.array(rebinned_vector))
+        :param vectors: one or more vectors with the same number of elements as the vector used to define the bins
+        :return: list of rebinned vectors
+        """
 
-        return rebinned_vectors
+        return [self._sum_in_bins(np.asarray(vector)) for vector in vectors]
 
     def rebin_errors(self, *vectors):
         """
@@ -201,35 +261,16 @@ class Rebinner(object):
 
         """
 
-        rebinned_vectors = []
-
-        for vector in vectors:  # type: np.ndarray[np.ndarray]
-
-            assert len(vector) == len(self._mask), (
-                "The vector to rebin must have the same number of elements of the"
-                "original (not-rebinned) vector"
-            )
-
-            rebinned_vector = []
-
-            for low_bound, hi_bound in zip(self._starts, self._stops):
-
-                rebinned_vector.append(np.sqrt(np.sum(vector[low_bound:hi_bound] ** 2)))
-
-            rebinned_vectors.append(np.array(rebinned_vector))
-
-        return rebinned_vectors
+        return [
+            np.sqrt(self._sum_in_bins(np.asarray(vector) ** 2)) for vector in vectors
+        ]
 
     def get_new_start_and_stop(self, old_start, old_stop):
 
         assert len(old_start) == len(self._mask) and len(old_stop) == len(self._mask)
 
-        new_start = np.zeros(len(self._starts))
-        new_stop = np.zeros(len(self._starts))
-
-        for i, (low_bound, hi_bound) in enumerate(zip(self._starts, self._stops)):
-            new_start[i] = old_start[low_bound]
-            new_stop[i] = old_stop[hi_bound - 1]
+        new_start = np.array(old_start, dtype=float)[self._starts]
+        new_stop = np.array(old_stop, dtype=float)[self._stops - 1]
 
         return new_start, new_stop
 
@@ -338,7 +379,7 @@ class TemporalBinner(TimeIntervalSet):
 
         # first we need to see if the interval provided has enough counts
 
-        _, counts = TemporalBinner._select_events(
+        counts = TemporalBinner._count_events(
             arrival_times, current_start, arrival_times[-1]
         )
 
@@ -379,7 +420,7 @@ class TemporalBinner(TimeIntervalSet):
                 while not end_fast_search:
 
                     # we calculate the sigma of the current region
-                    _, counts = TemporalBinner._select_events(
+                    counts = TemporalBinner._count_events(
                         arrival_times, current_start, current_stop
                     )
 
@@ -447,52 +488,75 @@ class TemporalBinner(TimeIntervalSet):
                 # start searching from where the fast search ended
                 pbar.increase(counts)
 
-                for time in arrival_times[start_idx:]:
+                # the candidate stops are the following events. Instead of testing them one at a
+                # time, we test them in blocks of growing size and look for the first one which
+                # reaches the sigma level, so that the getters and the significance are evaluated
+                # on arrays
 
-                    total_counts += 1
-                    pbar.increase()
-                    if total_counts < min_counts:
+                candidates = arrival_times[start_idx:]
 
-                        continue
+                n_candidates = candidates.shape[0]
 
-                    else:
+                # the candidates which do not reach the minimum counts are skipped
 
-                        # first use the background function to know the number of background counts
-                        bkg = background_getter(current_start, time)
+                first = min(max(min_counts - total_counts - 1, 0), n_candidates)
 
-                        sig = Significance(total_counts, bkg)
+                pbar.increase(first)
 
-                        if background_error_getter is not None:
+                block_size = _SIGNIFICANCE_BLOCK_SIZE
 
-                            bkg_error = background_error_getter(current_start, time)
+                while first < n_candidates:
 
-                            sigma = sig.li_and_ma_equivalent_for_gaussian_background(
-                                bkg_error
-                            )[0]
+                    last = min(first + block_size, n_candidates)
 
-                        else:
+                    times = candidates[first:last]
+
+                    # each candidate adds one event to the interval
+
+                    candidate_counts = total_counts + np.arange(first + 1, last + 1)
+
+                    sigma_exceeded = TemporalBinner._exceeds_sigma_level(
+                        current_start,
+                        times,
+                        candidate_counts,
+                        sigma_level,
+                        background_getter,
+                        background_error_getter,
+                    )
 
-                            sigma = sig.li_and_ma()[0]
+                    if not sigma_exceeded.any():
 
-                            # now test if we have enough sigma
+                        pbar.increase(last - first)
 
-                        if sigma >= sigma_level:
+                        first = last
 
-                            # if we succeeded we want to mark the time bins
-                            stops.append(time)
+                        block_size *= 2
 
-                            starts.append(current_start)
+                        continue
+
+                    # the first candidate exceeding the sigma level closes the bin
+
+                    idx = np.argmax(sigma_exceeded)
+
+                    pbar.increase(idx + 1)
+
+                    time = times[idx]
 
-                            # set up the next fast search
-                            # by looking past this interval
-                            current_start = time
+                    # if we succeeded we want to mark the time bins
+                    stops.append(time)
 
-                            current_stop = 0.5 * (arrival_times[-1] + time)
+                    starts.append(current_start)
 
-                            end_fast_search = False
+                    # set up the next fast search
+                    # by looking past this interval
+                    current_start = time
 
-                            # get out of the for loop
-                            break
+                    current_stop = 0.5 * (arrival_times[-1] + time)
+
+                    end_fast_search = False
+
+                    # get out of the block search
+                    break
 
                 # if we never exceeded the sigma level by the
                 # end of the search, we never will
@@ -648,19 +712,54 @@ class TemporalBinner(TimeIntervalSet):
             return False
 
     @staticmethod
-    def _select_events(arrival_times, start, stop):
+    def _exceeds_sigma_level(
+        start,
+        stops,
+        counts,
+        sigma_level,
+        background_getter,
+        background_error_getter=None,
+    ):
         """
-        get the events and total counts over an interval
+        Vectorized version of _check_exceeds_sigma_interval, for intervals with the same start and several stops
 
-        :param start:
-        :param stop:
-        :param events:
-        :return:
+        :param start: the start of the intervals
+        :param stops: array with the stops of the intervals
+        :param counts: array with the counts in each interval
+        :param sigma_level: the sigma level of the intervals
+        :param background_getter: function of a start and stop time that returns background counts
+        :param background_error_getter: function of a start and stop time that returns background count errors
+        :return: boolean array, True for the intervals reaching the sigma level
         """
 
-        lt_idx = start <= arrival_times
-        gt_idx = arrival_times <= stop
+        bkg = _evaluate_getter(background_getter, start, stops)
+
+        sig = Significance(counts, bkg)
+
+        if background_error_getter is not None:
+
+            bkg_error = _evaluate_getter(background_error_getter, start, stops)
+
+            sigma = sig.li_and_ma_equivalent_for_gaussian_background(bkg_error)
+
+        else:
+
+            sigma = sig.li_and_ma()
 
-        idx = np.logical_and(lt_idx, gt_idx)
+        return sigma >= sigma_level
 
-        return idx, arrival_times[idx].shape[0]
+    @staticmethod
+    def _count_events(arrival_times, start, stop):
+        """
+        get the number of events between start and stop (included). The arrival times must be sorted
+
+        :param arrival_times: the sorted arrival times
+        :param start:
+        :param stop:
+        :return: the number of events
+        """
+
+        return int(
+            np.searchsorted(arrival_times, stop, side="right")
+            - np.searchsorted(arrival_times, start, side="left")
+        )
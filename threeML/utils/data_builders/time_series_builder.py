@@ -10,6 +10,7 @@ from threeML.io.progress_bar import progress_bar
 from threeML.plugins.DispersionSpectrumLike import DispersionSpectrumLike
 from threeML.plugins.OGIPLike import OGIPLike
 from threeML.plugins.SpectrumLike import NegativeBackground, SpectrumLike
+from threeML.plugins.TimeResolvedSpectrumLike import TimeResolvedSpectrumLike
 from threeML.utils.data_builders.fermi.gbm_data import GBMCdata, GBMTTEFile
 from threeML.utils.data_builders.fermi.lat_data import LLEFile
 from threeML.utils.histogram import Histogram
@@ -608,6 +609,7 @@ class TimeSeriesBuilder(object):
         stop=None,
         interval_name="_interval",
         extract_measured_background=False,
+        lazy=False,
     ):
         """
         Create plugin(s) from either the current active selection or the time bins.
@@ -620,6 +622,7 @@ class TimeSeriesBuilder(object):
         :param stop: optional stop time of the bins
         :param extract_measured_background: Use the selected background rather than a polynomial fit to the background
         :param interval_name: the name of the interval
+        :param lazy: (only with from_bins) return a generator which creates the plugins one at a time, instead of a list
         :return: SpectrumLike plugin(s)
         """
 
@@ -696,15 +699,9 @@ class TimeSeriesBuilder(object):
                 self._time_series.bins is not None
             ), "This time series does not have any bins!"
 
-            # save the original interval if there is one
-            old_interval = copy.copy(self._active_interval)
-            old_verbose = copy.copy(self._verbose)
-
-            # we will keep it quiet to keep from being annoying
-
-            self._verbose = False
-
-            list_of_speclikes = []
+            assert issubclass(
+                self._container_type, BinnedSpectrum
+            ), "You are attempting to create a SpectrumLike plugin from the wrong data type"
 
             # get the bins from the time series
             # for event lists, these are from created bins
@@ -721,94 +718,271 @@ class TimeSeriesBuilder(object):
                 these_bins = these_bins.containing_interval(
                     start, stop, inner=False)
 
-            # loop through the intervals and create spec likes
+            # the counts, the background and the exposures of all the bins are computed
+            # at once, without changing the active time interval
 
-            with progress_bar(len(these_bins), title="Creating plugins") as p:
+            starts = these_bins.start_times
+            stops = these_bins.stop_times
 
-                for i, interval in enumerate(these_bins):
+            observed_information = self._time_series.get_information_dicts(
+                starts, stops)
 
-                    self.set_active_time_interval(interval.to_string())
+            if self._time_series.poly_fit_exists:
 
-                    assert isinstance(
-                        self._observed_spectrum, BinnedSpectrum
-                    ), "You are attempting to create a SpectrumLike plugin from the wrong data type"
+                background_information = self._time_series.get_information_dicts(
+                    starts,
+                    stops,
+                    use_poly=not extract_measured_background,
+                    extract=extract_measured_background,
+                )
 
-                    if extract_measured_background:
+            else:
 
-                        this_background_spectrum = self._measured_background_spectrum
+                custom_warnings.warn(
+                    "No background selection has been made. These plugins will contain no background!"
+                )
 
-                    else:
+                background_information = [None] * len(these_bins)
 
-                        this_background_spectrum = self._background_spectrum
+            # the plugins share the response, unless it is weighted. In that case the bins
+            # with the same weights share it
 
-                    if this_background_spectrum is None:
-                        custom_warnings.warn(
-                            "No bakckground selection has been made. This plugin will contain no background!"
-                        )
+            if self._response is None:
 
-                    try:
+                responses = [None] * len(these_bins)
 
-                        if self._response is None:
-
-                            sl = SpectrumLike(
-                                name="%s%s%d" % (self._name, interval_name, i),
-                                observation=self._observed_spectrum,
-                                background=this_background_spectrum,
-                                verbose=self._verbose,
-                                tstart=self._tstart,
-                                tstop=self._tstop,
-                            )
-
-                        else:
-
-                            if not self._use_balrog:
-
-                                sl = DispersionSpectrumLike(
-                                    name="%s%s%d" % (
-                                        self._name, interval_name, i),
-                                    observation=self._observed_spectrum,
-                                    background=this_background_spectrum,
-                                    verbose=self._verbose,
-                                    tstart=self._tstart,
-                                    tstop=self._tstop,
-                                )
-
-                            else:
-
-                                sl = gbm_drm_gen.BALROGLike(
-                                    name="%s%s%d" % (
-                                        self._name, interval_name, i),
-                                    observation=self._observed_spectrum,
-                                    background=this_background_spectrum,
-                                    verbose=self._verbose,
-                                    time=0.5 * (self._tstart + self._tstop),
-                                    tstart=self._tstart,
-                                    tstop=self._tstop,
-                                )
+            elif self._rsp_is_weighted:
 
-                        list_of_speclikes.append(sl)
+                responses = self._weighted_rsp.weight_by_counts_per_interval(
+                    these_bins)
 
-                    except (NegativeBackground):
+            else:
 
-                        custom_warnings.warn(
-                            "Something is wrong with interval %s. skipping." % interval
-                        )
+                responses = [self._response] * len(these_bins)
+
+            speclikes = self._spectrumlikes_from_information(
+                interval_name,
+                observed_information,
+                background_information,
+                responses,
+                is_poisson_background=extract_measured_background,
+            )
+
+            if lazy:
+
+                return (sl for sl in speclikes if sl is not None)
+
+            list_of_speclikes = []
+
+            with progress_bar(len(these_bins), title="Creating plugins") as p:
+
+                for sl in speclikes:
+
+                    if sl is not None:
+
+                        list_of_speclikes.append(sl)
 
                     p.increase()
 
-            # restore the old interval
+            return list_of_speclikes
 
-            if old_interval is not None:
+    def to_time_resolved_spectrumlike(
+        self,
+        start=None,
+        stop=None,
+        independent_variable=None,
+        extract_measured_background=False,
+    ):
+        """
+        Create a single TimeResolvedSpectrumLike plugin with all the time bins, which share the
+        response and fold their models at once. If the response is weighted, it is weighted by the
+        counts over all the bins.
 
-                self.set_active_time_interval(*old_interval)
+        :param start: optional start time of the bins
+        :param stop: optional stop time of the bins
+        :param independent_variable: (optional) the time IndependentVariable of the model (see TimeResolvedSpectrumLike)
+        :param extract_measured_background: Use the selected background rather than a polynomial fit to the background
+        :return: TimeResolvedSpectrumLike plugin
+        """
+
+        assert (
+            self._time_series.bins is not None
+        ), "This time series does not have any bins!"
+
+        assert (
+            self._response is not None
+        ), "A TimeResolvedSpectrumLike plugin can only be created with a response"
+
+        assert (
+            not self._use_balrog
+        ), "A TimeResolvedSpectrumLike plugin cannot be created with a BALROG response"
+
+        these_bins = self._time_series.bins  # type: TimeIntervalSet
+
+        if start is not None:
+            assert stop is not None, "must specify a start AND a stop time"
+
+        if stop is not None:
+            assert start is not None, "must specify a start AND a stop time"
+
+            these_bins = these_bins.containing_interval(start, stop, inner=False)
+
+        starts = these_bins.start_times
+        stops = these_bins.stop_times
+
+        observed_information = self._time_series.get_information_dicts(starts, stops)
+
+        counts = np.array([info["counts"] for info in observed_information])
+        exposures = np.array([info["exposure"] for info in observed_information])
+
+        background_counts = None
+        background_errors = None
+        background_exposures = None
+
+        if self._time_series.poly_fit_exists:
+
+            background_information = self._time_series.get_information_dicts(
+                starts,
+                stops,
+                use_poly=not extract_measured_background,
+                extract=extract_measured_background,
+            )
+
+            background_counts = np.array(
+                [info["counts"] for info in background_information]
+            )
+
+            if extract_measured_background:
+
+                background_exposures = np.array(
+                    [info["exposure"] for info in background_information]
+                )
 
             else:
 
-                self._active_interval = None
+                background_errors = np.array(
+                    [info["counts error"] for info in background_information]
+                )
 
-            self._verbose = old_verbose
+        else:
 
-            return list_of_speclikes
+            custom_warnings.warn(
+                "No background selection has been made. This plugin will contain no background!"
+            )
+
+        if self._rsp_is_weighted:
+
+            response = self._weighted_rsp.weight_by_counts(
+                *these_bins.to_string().split(",")
+            )
+
+        else:
+
+            response = self._response
+
+        return TimeResolvedSpectrumLike(
+            name=self._name,
+            counts=counts,
+            exposures=exposures,
+            response=response,
+            time_intervals=these_bins,
+            background_counts=background_counts,
+            background_errors=background_errors,
+            background_exposures=background_exposures,
+            independent_variable=independent_variable,
+            verbose=self._verbose,
+        )
+
+    def _spectrumlikes_from_information(
+        self,
+        interval_name,
+        observed_information,
+        background_information,
+        responses,
+        is_poisson_background,
+    ):
+        """
+        Generate the plugins of a set of intervals from their information dicts. None is
+        generated for the intervals which cannot be used
+
+        :param interval_name: the name of the intervals
+        :param observed_information: the information dicts of the observed spectra
+        :param background_information: the information dicts of the background spectra (or None)
+        :param responses: the responses of the intervals (or None)
+        :param is_poisson_background: whether the background is the measured one
+        :return: generator of plugins
+        """
+
+        for i, (observed_info, background_info, response) in enumerate(
+            zip(observed_information, background_information, responses)
+        ):
+
+            tstart = observed_info["tstart"]
+            tstop = tstart + observed_info["telapse"]
+
+            observed_spectrum = self._container_type.from_information_dict(
+                observed_info, response=response
+            )
+
+            if background_info is None:
+
+                background_spectrum = None
+
+            else:
+
+                background_spectrum = self._container_type.from_information_dict(
+                    background_info,
+                    response=response,
+                    is_poisson=is_poisson_background,
+                )
+
+            name = "%s%s%d" % (self._name, interval_name, i)
+
+            try:
+
+                if response is None:
+
+                    sl = SpectrumLike(
+                        name=name,
+                        observation=observed_spectrum,
+                        background=background_spectrum,
+                        verbose=False,
+                        tstart=tstart,
+                        tstop=tstop,
+                    )
+
+                elif not self._use_balrog:
+
+                    sl = DispersionSpectrumLike(
+                        name=name,
+                        observation=observed_spectrum,
+                        background=background_spectrum,
+                        verbose=False,
+                        tstart=tstart,
+                        tstop=tstop,
+                    )
+
+                else:
+
+                    sl = gbm_drm_gen.BALROGLike(
+                        name=name,
+                        observation=observed_spectrum,
+                        background=background_spectrum,
+                        verbose=False,
+                        time=0.5 * (tstart + tstop),
+                        tstart=tstart,
+                        tstop=tstop,
+                    )
+
+            except (NegativeBackground):
+
+                custom_warnings.warn(
+                    "Something is wrong with interval %s-%s. skipping." % (tstart, tstop)
+                )
+
+                sl = None
+
+            yield sl
 
     @classmethod
     def from_gbm_tte(
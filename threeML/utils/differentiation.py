@@ -34,9 +34,9 @@ def _get_wrapper(function, point, minima, maxima):
     scaled_maxima = maxima / orders_of_magnitude
 
     # Decide a delta for the finite differentiation
-    # The algorithm implemented in numdifftools is robust with respect to the choice
-    # of delta, as long as we are not going beyond the boundaries (which would cause
-    # the procedure to fail)
+    # The algorithm implemented in numdifftools (and the Richardson extrapolation of the batched
+    # stencils) is robust with respect to the choice of delta, as long as we are not going beyond
+    # the boundaries (which would cause the procedure to fail)
 
     scaled_deltas = np.zeros_like(scaled_point)
 
@@ -116,29 +116,184 @@ def _get_wrapper(function, point, minima, maxima):
     return wrapper, scaled_deltas, scaled_point, orders_of_magnitude, n_dim
 
 
-def get_jacobian(function, point, minima, maxima):
+def _evaluate_points(wrapper, points, client=None):
+    """
+    Evaluate the wrapper on all the provided points, serially or, if a client is provided, distributing
+    them among its engines (in which case the function must be picklable)
+
+    :param wrapper: the function to evaluate (receiving one point as an array)
+    :param points: a (n_points, n_dim) array of points
+    :param client: (optional) a ParallelClient to use to evaluate the points
+    :return: an array with the n_points values of the function
+    """
+
+    if client is not None:
+
+        values = client.execute(wrapper, list(points))
+
+    else:
+
+        values = [wrapper(x) for x in points]
+
+    return np.array(values, dtype=float)
+
+
+def _get_jacobian_stencil(scaled_point, scaled_deltas):
+    """
+    Returns the points needed to compute the Jacobian with central differences: for each dimension i,
+    the point displaced by +delta_i and by -delta_i along that dimension.
+
+    :return: a (2 * n_dim, n_dim) array of points
+    """
+
+    steps = np.diag(scaled_deltas)
+
+    return np.concatenate((scaled_point + steps, scaled_point - steps))
+
+
+def _get_hessian_stencil(scaled_point, scaled_deltas):
+    """
+    Returns the points needed to compute the Hessian with central differences: the point itself, the
+    points displaced by +delta_i and -delta_i along each dimension, and for each pair i < j the 4 points
+    displaced by (+-delta_i, +-delta_j).
+
+    :return: a (2 * n_dim**2 + 1, n_dim) array of points, and the (n_pairs, 2) array of indexes of the pairs
+    """
+
+    n_dim = scaled_point.shape[0]
+
+    steps = np.diag(scaled_deltas)
+
+    pairs = np.array(
+        [(i, j) for i in range(n_dim) for j in range(i + 1, n_dim)], dtype=int
+    ).reshape(-1, 2)
+
+    step_i = steps[pairs[:, 0]]
+    step_j = steps[pairs[:, 1]]
+
+    points = np.concatenate(
+        (
+            scaled_point[np.newaxis, :],
+            scaled_point + steps,
+            scaled_point - steps,
+            scaled_point + step_i + step_j,
+            scaled_point + step_i - step_j,
+            scaled_point - step_i + step_j,
+            scaled_point - step_i - step_j,
+        )
+    )
+
+    return points, pairs
+
+
+def _central_jacobian(values, scaled_deltas):
+    """
+    Combine the values of the function on the Jacobian stencil (see _get_jacobian_stencil) into the
+    central-difference estimate of the Jacobian
+    """
+
+    n_dim = scaled_deltas.shape[0]
+
+    f_plus = values[:n_dim]
+    f_minus = values[n_dim:]
+
+    return (f_plus - f_minus) / (2 * scaled_deltas)
+
+
+def _central_hessian(values, pairs, scaled_deltas):
+    """
+    Combine the values of the function on the Hessian stencil (see _get_hessian_stencil) into the
+    central-difference estimate of the Hessian
+    """
+
+    n_dim = scaled_deltas.shape[0]
+
+    n_pairs = pairs.shape[0]
+
+    # Unpack the values in the same order used to build the stencil
+
+    f0 = values[0]
+    f_plus = values[1 : n_dim + 1]
+    f_minus = values[n_dim + 1 : 2 * n_dim + 1]
+    f_pp, f_pm, f_mp, f_mm = values[2 * n_dim + 1 :].reshape(4, n_pairs)
+
+    hessian_matrix = np.zeros((n_dim, n_dim))
+
+    # Diagonal elements
+
+    hessian_matrix[np.diag_indices(n_dim)] = (f_plus - 2 * f0 + f_minus) / scaled_deltas ** 2
+
+    # Off-diagonal elements (the matrix is symmetric)
+
+    off_diagonal = (f_pp - f_pm - f_mp + f_mm) / (
+        4 * scaled_deltas[pairs[:, 0]] * scaled_deltas[pairs[:, 1]]
+    )
+
+    hessian_matrix[pairs[:, 0], pairs[:, 1]] = off_diagonal
+    hessian_matrix[pairs[:, 1], pairs[:, 0]] = off_diagonal
+
+    return hessian_matrix
+
+
+def _richardson(coarse, fine):
+    """
+    Richardson extrapolation of two central-difference estimates, computed with steps h (coarse) and
+    h / 2 (fine). This removes the O(h**2) term of the truncation error, leaving an O(h**4) error
+    """
+
+    return (4 * fine - coarse) / 3.0
+
+
+def get_jacobian(function, point, minima, maxima, client=None):
+    """
+    Compute the Jacobian (gradient) of the function with central differences with steps h and h / 2,
+    combined with a Richardson extrapolation. All the 4 * n_dim points of the two stencils are generated up
+    front and evaluated as a batch.
+
+    :param function: the function to differentiate (receiving the parameters as separate arguments)
+    :param point: the point where to compute the Jacobian
+    :param minima: the minima of the parameters (or nan if there is no minimum)
+    :param maxima: the maxima of the parameters (or nan if there is no maximum)
+    :param client: (optional) a ParallelClient to evaluate the stencil on its engines (default: serially)
+    :return: the Jacobian vector
+    """
 
     wrapper, scaled_deltas, scaled_point, orders_of_magnitude, n_dim = _get_wrapper(
         function, point, minima, maxima
     )
 
-    # Compute the Jacobian matrix at best_fit_values
-    jacobian_vector = nd.Jacobian(wrapper, scaled_deltas, method="central")(
-        scaled_point
+    points = np.concatenate(
+        (
+            _get_jacobian_stencil(scaled_point, scaled_deltas),
+            _get_jacobian_stencil(scaled_point, scaled_deltas / 2.0),
+        )
     )
 
-    # Transform it to numpy matrix
+    values = _evaluate_points(wrapper, points, client)
 
-    jacobian_vector = np.array(jacobian_vector)
+    jacobian_vector = _richardson(
+        _central_jacobian(values[: 2 * n_dim], scaled_deltas),
+        _central_jacobian(values[2 * n_dim :], scaled_deltas / 2.0),
+    )
 
     # Now correct back the Jacobian for the scales
 
     jacobian_vector /= orders_of_magnitude
 
-    return jacobian_vector[0]
+    return jacobian_vector
 
 
 def get_hessian(function, point, minima, maxima):
+    """
+    Compute the Hessian matrix with the adaptive algorithm of numdifftools (accurate, but it evaluates the
+    function serially many times)
+
+    :param function: the function to differentiate (receiving the parameters as separate arguments)
+    :param point: the point where to compute the Hessian
+    :param minima: the minima of the parameters (or nan if there is no minimum)
+    :param maxima: the maxima of the parameters (or nan if there is no maximum)
+    :return: the Hessian matrix
+    """
 
     wrapper, scaled_deltas, scaled_point, orders_of_magnitude, n_dim = _get_wrapper(
         function, point, minima, maxima
@@ -160,3 +315,75 @@ def get_hessian(function, point, minima, maxima):
             hessian_matrix[i, j] /= orders_of_magnitude[i] * orders_of_magnitude[j]
 
     return hessian_matrix
+
+
+def get_richardson_hessian(function, point, minima, maxima, client=None):
+    """
+    Compute the Hessian matrix with central differences with steps h and h / 2, combined with a Richardson
+    extrapolation (so the truncation error is O(h**4), as in the default algorithm of numdifftools, but
+    without its adaptive choice of the step among many candidates). All the 4 * n_dim**2 + 2 points of the
+    two stencils are generated up front and evaluated as a batch.
+
+    :param function: the function to differentiate (receiving the parameters as separate arguments)
+    :param point: the point where to compute the Hessian
+    :param minima: the minima of the parameters (or nan if there is no minimum)
+    :param maxima: the maxima of the parameters (or nan if there is no maximum)
+    :param client: (optional) a ParallelClient to evaluate the stencil on its engines (default: serially)
+    :return: the Hessian matrix
+    """
+
+    wrapper, scaled_deltas, scaled_point, orders_of_magnitude, n_dim = _get_wrapper(
+        function, point, minima, maxima
+    )
+
+    coarse_points, pairs = _get_hessian_stencil(scaled_point, scaled_deltas)
+    fine_points, _ = _get_hessian_stencil(scaled_point, scaled_deltas / 2.0)
+
+    values = _evaluate_points(
+        wrapper, np.concatenate((coarse_points, fine_points)), client
+    )
+
+    n_points = coarse_points.shape[0]
+
+    hessian_matrix = _richardson(
+        _central_hessian(values[:n_points], pairs, scaled_deltas),
+        _central_hessian(values[n_points:], pairs, scaled_deltas / 2.0),
+    )
+
+    # Now correct back the Hessian for the scales
+
+    hessian_matrix /= np.outer(orders_of_magnitude, orders_of_magnitude)
+
+    return hessian_matrix
+
+
+def get_fast_hessian(function, point, minima, maxima, client=None):
+    """
+    Compute the Hessian matrix with a fixed-step central-difference stencil. Contrary to
+    get_richardson_hessian, there is no Richardson extrapolation, so this uses only 2 * n_dim**2 + 1
+    evaluations of the function, but the truncation error is O(h**2). All the points of the stencil are
+    generated up front and evaluated as a batch.
+
+    :param function: the function to differentiate (receiving the parameters as separate arguments)
+    :param point: the point where to compute the Hessian
+    :param minima: the minima of the parameters (or nan if there is no minimum)
+    :param maxima: the maxima of the parameters (or nan if there is no maximum)
+    :param client: (optional) a ParallelClient to evaluate the stencil on its engines (default: serially)
+    :return: the Hessian matrix
+    """
+
+    wrapper, scaled_deltas, scaled_point, orders_of_magnitude, n_dim = _get_wrapper(
+        function, point, minima, maxima
+    )
+
+    points, pairs = _get_hessian_stencil(scaled_point, scaled_deltas)
+
+    values = _evaluate_points(wrapper, points, client)
+
+    hessian_matrix = _central_hessian(values, pairs, scaled_deltas)
+
+    # Now correct back the Hessian for the scales
+
+    hessian_matrix /= np.outer(orders_of_magnitude, orders_of_magnitude)
+
+    return hessian_matrix
@@ -7,8 +7,9 @@ __author__ = "grburgess"
 
 from astropy import units as u
 import numpy as np
-import scipy.integrate as integrate
 import collections
+import functools
+from astromodels.functions.function import CompositeFunction
 
 
 from threeML.utils.fitted_objects.fitted_source_handler import (
@@ -16,6 +17,78 @@ from threeML.utils.fitted_objects.fitted_source_handler import (
 )
 
 
+# Order of the Gauss-Legendre rule used in each sub-interval of the integration, and number of
+# sub-intervals per decade of energy
+
+_GAUSS_LEGENDRE_ORDER = 8
+_INTERVALS_PER_DECADE = 10
+
+_nodes, _weights = np.polynomial.legendre.leggauss(_GAUSS_LEGENDRE_ORDER)
+
+
+def integrate_in_log_space(integrand, e1, e2, **param_specification):
+    """
+    Integrate the function between e1 and e2 with a fixed-order Gauss-Legendre rule on log-spaced
+    sub-intervals. All the nodes are evaluated in one call, so that the parameters can be arrays
+    of samples: in that case they must broadcast against e1 and e2, and the integrand is evaluated
+    on an array with one more (last) axis for the nodes.
+
+    :param integrand: the function to integrate, as integrand(x, **param_specification)
+    :param e1: the lower bound(s), must be positive
+    :param e2: the upper bound(s), must be positive
+    :param param_specification: the parameters of the integrand
+    :return: the integral(s), with the broadcast shape of e1, e2 and the parameters
+    """
+
+    log_e1 = np.log(np.asarray(e1, dtype=float))
+    log_e2 = np.log(np.asarray(e2, dtype=float))
+
+    assert np.all(np.isfinite(log_e1)) and np.all(
+        np.isfinite(log_e2)
+    ), "The integration bounds must be positive"
+
+    # use the same number of sub-intervals for all the bounds, so that the nodes form a regular array
+
+    n_decades = np.max(np.abs(log_e2 - log_e1)) / np.log(10.0)
+
+    n_intervals = max(int(np.ceil(n_decades * _INTERVALS_PER_DECADE)), 1)
+
+    # nodes and weights in log space, on the last axis (we integrate f(x) x dlog(x))
+
+    width = (log_e2 - log_e1)[..., np.newaxis] / n_intervals
+
+    starts = log_e1[..., np.newaxis] + width * np.arange(n_intervals)
+
+    log_x = (
+        starts[..., np.newaxis] + width[..., np.newaxis] * (_nodes + 1.0) / 2.0
+    ).reshape(starts.shape[:-1] + (-1,))
+
+    weights = np.tile(_weights, n_intervals) * width / 2.0
+
+    x = np.exp(log_x)
+
+    if all(np.ndim(value) == 0 for value in param_specification.values()):
+
+        # scalar parameters: evaluate on a flat array of energies, which is what
+        # astromodels functions accept
+
+        values = np.asarray(integrand(x.ravel(), **param_specification)).reshape(
+            x.shape
+        )
+
+    else:
+
+        values = integrand(
+            x,
+            **dict(
+                (name, np.asarray(value)[..., np.newaxis])
+                for name, value in param_specification.items()
+            )
+        )
+
+    return np.sum(values * x * weights, axis=-1)
+
+
 class NotCompositeModelError(RuntimeError):
     pass
 
@@ -182,25 +255,22 @@ class IntegralFluxConversion(FluxConversion):
             "nufnu_flux": lambda x: x ** 3 * test_model(x),
         }
 
-        def photon_integrand(x, param_specification):
+        def photon_integrand(x, **param_specification):
             return flux_model(x, **param_specification)
 
-        def energy_integrand(x, param_specification):
+        def energy_integrand(x, **param_specification):
             return x * flux_model(x, **param_specification)
 
-        def nufnu_integrand(x, param_specification):
+        def nufnu_integrand(x, **param_specification):
             return x * x * flux_model(x, **param_specification)
 
+        # the integrals are computed on a fixed grid so that all the samples of the
+        # parameters can be integrated at once
+
         self._model_builder = {
-            "photon_flux": lambda e1, e2, **param_specification: integrate.quad(
-                photon_integrand, e1, e2, args=(param_specification)
-            )[0],
-            "energy_flux": lambda e1, e2, **param_specification: integrate.quad(
-                energy_integrand, e1, e2, args=(param_specification)
-            )[0],
-            "nufnu_flux": lambda e1, e2, **param_specification: integrate.quad(
-                nufnu_integrand, e1, e2, args=(param_specification)
-            )[0],
+            "photon_flux": functools.partial(integrate_in_log_space, photon_integrand),
+            "energy_flux": functools.partial(integrate_in_log_space, energy_integrand),
+            "nufnu_flux": functools.partial(integrate_in_log_space, nufnu_integrand),
         }
 
         super(IntegralFluxConversion, self).__init__(flux_unit, energy_unit, flux_model)
@@ -254,7 +324,6 @@ class FittedPointSourceSpectralHandler(GenericFittedSourceHandler):
 
             if self._components is not None:
 
-                model = self._components[component]["function"].evaluate_at
                 parameters = self._components[component]["function"].parameters
                 test_model = self._components[component]["function"]
                 parameter_names = self._components[component]["parameter_names"]
@@ -265,7 +334,6 @@ class FittedPointSourceSpectralHandler(GenericFittedSourceHandler):
 
         else:
 
-            model = self._point_source.spectrum.main.shape.evaluate_at
             parameters = self._point_source.spectrum.main.shape.parameters
             test_model = self._point_source.spectrum.main.shape
             parameter_names = [
@@ -307,7 +375,10 @@ class FittedPointSourceSpectralHandler(GenericFittedSourceHandler):
         if is_differential_flux:
 
             converter = DifferentialFluxConversion(
-                flux_unit, energy_unit, model, test_model
+                flux_unit,
+                energy_unit,
+                self._get_broadcastable_model(test_model),
+                test_model,
             )
 
             flux_function = converter.model
@@ -327,7 +398,10 @@ class FittedPointSourceSpectralHandler(GenericFittedSourceHandler):
         else:
 
             converter = IntegralFluxConversion(
-                flux_unit, energy_unit, model, test_model
+                flux_unit,
+                energy_unit,
+                self._get_broadcastable_model(test_model),
+                test_model,
             )
 
             flux_function = converter.model
@@ -379,6 +453,22 @@ class FittedPointSourceSpectralHandler(GenericFittedSourceHandler):
 
         return self._conversion * self._flux_unit * value
 
+    @staticmethod
+    def _get_broadcastable_model(function):
+        """
+        The evaluate method of simple functions takes the parameters as arguments, so that the propagation
+        can try to pass arrays of samples to it. Composite functions need their parameters to be set instead
+
+        :param function: an astromodels function
+        :return: the function to be used in the propagation
+        """
+
+        if isinstance(function, CompositeFunction):
+
+            return function.evaluate_at
+
+        return function.evaluate
+
     @staticmethod
     def _solve_for_component_flux(composite_model):
         """
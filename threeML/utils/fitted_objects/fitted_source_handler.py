@@ -1,16 +1,23 @@
 from builtins import map
+from builtins import range
 from builtins import zip
 from builtins import object
 
 __author__ = "grburgess"
 
-import itertools
 import functools
 import numpy as np
 
-from threeML.io.progress_bar import progress_bar
+from threeML.random_variates import (
+    RandomVariates,
+    highest_posterior_density_intervals,
+    equal_tail_intervals,
+)
+from threeML.utils.propagation import propagate_on_samples
 from astromodels import use_astromodels_memoization
 
+from threeML.config.config import threeML_config
+
 
 class GenericFittedSourceHandler(object):
     def __init__(
@@ -62,6 +69,24 @@ class GenericFittedSourceHandler(object):
         # fold the function through its independent values
         self._evaluate()
 
+    def __getstate__(self):
+
+        # the function, the propagated function and the analysis results are only needed
+        # to compute the variates. The functions might be closures, which cannot be pickled
+
+        state = self.__dict__.copy()
+
+        for name in (
+            "_function",
+            "_propagated_function",
+            "_analysis_results",
+            "_analysis",
+        ):
+
+            state[name] = None
+
+        return state
+
     def __add__(self, other):
         """
         The basics of adding are handled in the VariatesContainer
@@ -131,6 +156,21 @@ class GenericFittedSourceHandler(object):
 
                 arguments[name] = par.value
 
+        # keep the samples and the fixed values separately, so that we can evaluate
+        # the function on all samples and all independent values at once
+
+        self._sample_arguments = dict(
+            (name, value)
+            for name, value in arguments.items()
+            if isinstance(value, np.ndarray)
+        )
+
+        self._fixed_arguments = dict(
+            (name, value)
+            for name, value in arguments.items()
+            if name not in self._sample_arguments
+        )
+
         # create the propagtor
 
         self._propagated_function = self._analysis_results.propagate(
@@ -145,24 +185,47 @@ class GenericFittedSourceHandler(object):
 
         :return:
         """
+        chunk_size = threeML_config["model plot"]["point source plot"][
+            "error propagation chunk size"
+        ]
+
         # if there are independent variables
         if self._independent_variable_range:
 
-            variates = []
+            # evaluate on the whole grid of independent values at once (or chunk by chunk), with
+            # the same ordering as itertools.product
+
+            grid = [
+                values.ravel()
+                for values in np.meshgrid(
+                    *self._independent_variable_range, indexing="ij"
+                )
+            ]
+
+            n_points = grid[0].shape[0]
+
+            step = n_points if not chunk_size else int(chunk_size)
+
+            variates = None
+
+            with use_astromodels_memoization(False):
+
+                for start in range(0, n_points, max(step, 1)):
 
-            # scroll through the independent variables
-            n_iterations = np.product(self._out_shape)
+                    samples = propagate_on_samples(
+                        self._function,
+                        self._sample_arguments,
+                        *[values[start : start + step] for values in grid],
+                        **self._fixed_arguments
+                    )
 
-            with progress_bar(n_iterations, title="Propagating errors") as p:
+                    # a (points x samples) array
 
-                with use_astromodels_memoization(False):
+                    if variates is None:
 
-                    for variables in itertools.product(
-                        *self._independent_variable_range
-                    ):
-                        variates.append(self._propagated_function(*variables))
+                        variates = np.zeros((n_points, samples.shape[0]))
 
-                        p.increase()
+                    variates[start : start + step] = samples.T
 
         # otherwise just evaluate
         else:
@@ -172,7 +235,12 @@ class GenericFittedSourceHandler(object):
         # create a variates container
 
         self._propagated_variates = VariatesContainer(
-            variates, self._out_shape, self._cl, self._transform, self._equal_tailed
+            variates,
+            self._out_shape,
+            self._cl,
+            self._transform,
+            self._equal_tailed,
+            chunk_size,
         )
 
     @property
@@ -245,7 +313,9 @@ def transform(method):
 
 
 class VariatesContainer(object):
-    def __init__(self, values, out_shape, cl, transform, equal_tailed=True):
+    def __init__(
+        self, values, out_shape, cl, transform, equal_tailed=True, chunk_size=None
+    ):
         """
         A container to store an *List* of RandomVariates and transform their outputs
         to the appropriate shape. This cannot be done with normal numpy array operations
@@ -257,16 +327,22 @@ class VariatesContainer(object):
         properties. Therefore, the transform method is used which applies a function to the output properties,
         e.g., a unit association and or conversion.
 
+        Internally the samples are stored as a (points x samples) array, and the statistics are computed
+        along the sample axis for chunk_size points at a time, so that the temporary copies stay small.
 
-
-        :param values: a flat List of RandomVariates
+        :param values: a flat List of RandomVariates, or a (points x samples) array
         :param out_shape: the array shape for the output variables
         :param cl: the confidence level to calculate error intervals on
         :param transform: a method to transform the outputs
         :param equal_tailed: whether to use equal-tailed error intervals or not
+        :param chunk_size: the number of points for which the statistics are computed at once (default: all)
         """
 
-        self._values = values  # type: list
+        # a (points x samples) array
+
+        self._samples_array = np.array(
+            [np.asarray(val) for val in values], dtype=float, ndmin=2
+        )  # type: np.ndarray
 
         self._out_shape = out_shape  # type: tuple
 
@@ -276,59 +352,50 @@ class VariatesContainer(object):
 
         self._transform = transform  # type: callable
 
-        # calculate mean and median and transform them into the provided
-        # output shape
-
-        self._average = np.array([val.average for val in self._values])
-
-        self._average = self._average.reshape(self._out_shape)
+        self._chunk_size = chunk_size  # type: int
 
-        self._median = np.array([val.median for val in self._values])
+        n_points, n_samples = self._samples_array.shape
 
-        self._median = self._median.reshape(self._out_shape)
+        average = np.zeros(n_points)
+        median = np.zeros(n_points)
+        lower_error = np.zeros(n_points)
+        upper_error = np.zeros(n_points)
 
-        # construct the error intervals
+        # if equal tailed errors requested, otherwise use the hpd
 
-        upper_error = []
-        lower_error = []
-
-        # if equal tailed errors requested
         if equal_tailed:
 
-            for val in self._values:
-
-                error = val.equal_tail_interval(self._cl)
-                upper_error.append(error[1])
-                lower_error.append(error[0])
+            get_interval = equal_tail_intervals
 
         else:
 
-            # else use the hdp
-
-            for val in self._values:
+            get_interval = highest_posterior_density_intervals
 
-                error = val.highest_posterior_density_interval(self._cl)
-                upper_error.append(error[1])
-                lower_error.append(error[0])
+        step = n_points if not chunk_size else int(chunk_size)
 
-        # reshape the errors into the output shape
+        for start in range(0, n_points, max(step, 1)):
 
-        self._upper_error = np.array(upper_error).reshape(self._out_shape)
-        self._lower_error = np.array(lower_error).reshape(self._out_shape)
+            chunk = self._samples_array[start : start + step]
 
-        samples = []
+            average[start : start + step] = np.mean(chunk, axis=1)
+            median[start : start + step] = np.median(chunk, axis=1)
 
-        for val in self._values:
+            (
+                lower_error[start : start + step],
+                upper_error[start : start + step],
+            ) = get_interval(chunk, self._cl)
 
-            samples.append(val.samples)
+        # transform them into the provided output shape
 
-        n_samples = len(samples[0])
+        self._average = average.reshape(self._out_shape)
+        self._median = median.reshape(self._out_shape)
 
-        samples_shape = list(self._out_shape) + [n_samples]
+        self._upper_error = upper_error.reshape(self._out_shape)
+        self._lower_error = lower_error.reshape(self._out_shape)
 
-        self._samples_shape = tuple(samples_shape)
+        self._samples_shape = tuple(self._out_shape) + (n_samples,)
 
-        self._samples = np.array(samples).reshape(samples_shape)
+        self._samples = self._samples_array.reshape(self._samples_shape)
 
     @property
     def values(self):
@@ -336,7 +403,7 @@ class VariatesContainer(object):
         :return: the list of of RandomVariates
         """
 
-        return self._values
+        return [RandomVariates(samples) for samples in self._samples_array]
 
     @property
     @transform
@@ -399,18 +466,13 @@ class VariatesContainer(object):
             other._out_shape == self._out_shape
         ), "cannot sum together arrays with different shapes!"
 
-        # this will get the value container for the other values
-
-        other_values = other.values
-
-        summed_values = [v + vo for v, vo in zip(self._values, other_values)]
-
         return VariatesContainer(
-            summed_values,
+            self._samples_array + other._samples_array,
             self._out_shape,
             self._cl,
             self._transform,
             self._equal_tailed,
+            self._chunk_size,
         )
 
     def __radd__(self, other):
@@ -421,14 +483,4 @@ class VariatesContainer(object):
 
         else:
 
-            other_values = other.values
-
-            summed_values = [v + vo for v, vo in zip(self._values, other_values)]
-
-            return VariatesContainer(
-                summed_values,
-                self._out_shape,
-                self._cl,
-                self._transform,
-                self._equal_tailed,
-            )
+            return self.__add__(other)
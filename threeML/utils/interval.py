@@ -1,6 +1,5 @@
 import re
 import copy
-from operator import itemgetter, attrgetter
 import numpy as np
 
 
@@ -161,7 +160,8 @@ class Interval(object):
 
 class IntervalSet(object):
     """
-    A set of intervals
+    A set of intervals. The starts and stops of the intervals are stored in two arrays, and the Interval instances
+    (of type INTERVAL_TYPE) are created only when accessed (by iterating or indexing the set)
 
     """
 
@@ -169,7 +169,44 @@ class IntervalSet(object):
 
     def __init__(self, list_of_intervals=()):
 
-        self._intervals = list(list_of_intervals)
+        if isinstance(list_of_intervals, IntervalSet):
+
+            starts, stops = list_of_intervals._starts, list_of_intervals._stops
+
+        else:
+
+            intervals = list(list_of_intervals)
+
+            starts = [interval.start for interval in intervals]
+            stops = [interval.stop for interval in intervals]
+
+        self._set_starts_and_stops(starts, stops)
+
+    def _set_starts_and_stops(self, starts, stops):
+
+        self._starts = np.array(starts, dtype=float, ndmin=1)
+        self._stops = np.array(stops, dtype=float, ndmin=1)
+
+        # the arrays are shared with whoever asks for them, so they cannot be modified
+
+        self._starts.flags.writeable = False
+        self._stops.flags.writeable = False
+
+    @classmethod
+    def _from_arrays(cls, starts, stops):
+        """
+        Create a new set of this type from the arrays of starts and stops, without creating the intervals
+
+        :param starts: the starts of the intervals
+        :param stops: the stops of the intervals
+        :return: interval set
+        """
+
+        bounds = IntervalSet.__new__(IntervalSet)
+
+        bounds._set_starts_and_stops(starts, stops)
+
+        return cls.new(bounds)
 
     @classmethod
     def new(cls, *args, **kwargs):
@@ -240,12 +277,22 @@ class IntervalSet(object):
             % (len(starts), len(stops))
         )
 
-        list_of_intervals = []
+        starts = np.array(starts, dtype=float, ndmin=1)
+        stops = np.array(stops, dtype=float, ndmin=1)
 
-        for imin, imax in zip(starts, stops):
-            list_of_intervals.append(cls.new_interval(imin, imax))
+        inverted = np.flatnonzero(stops < starts)
 
-        return cls(list_of_intervals)
+        if inverted.shape[0] > 0:
+
+            # Same error as the Interval constructor
+
+            raise RuntimeError(
+                "Invalid time interval! TSTART must be before TSTOP and TSTOP-TSTART >0. "
+                "Got tstart = %s and tstop = %s"
+                % (starts[inverted[0]], stops[inverted[0]])
+            )
+
+        return cls._from_arrays(starts, stops)
 
     @classmethod
     def from_list_of_edges(cls, edges):
@@ -262,12 +309,9 @@ class IntervalSet(object):
 
         edges.sort()
 
-        list_of_intervals = []
-
-        for imin, imax in zip(edges[:-1], edges[1:]):
-            list_of_intervals.append(cls.new_interval(imin, imax))
+        edges = np.array(edges, dtype=float)
 
-        return cls(list_of_intervals)
+        return cls._from_arrays(edges[:-1], edges[1:])
 
     def merge_intersecting_intervals(self, in_place=False):
         """
@@ -278,103 +322,101 @@ class IntervalSet(object):
         :return:
         """
 
-        # get a copy of the sorted intervals
-
-        sorted_intervals = self.sort()
-
-        new_intervals = []
-
-        while len(sorted_intervals) > 1:
-
-            # pop the first interval off the stack
-
-            this_interval = sorted_intervals.pop(0)
-
-            # see if that interval overlaps with the the next one
-
-            if this_interval.overlaps_with(sorted_intervals[0]):
+        order = self._argsort()
 
-                # if so, pop the next one
+        starts = self._starts[order]
+        stops = self._stops[order]
 
-                next_interval = sorted_intervals.pop(0)
+        if starts.shape[0] > 1:
 
-                # and merge the two, appending them to the new intervals
+            # An interval starts a new group if it does not overlap with the union of all the previous ones
+            # (see Interval.overlaps_with: intervals that just touch do not overlap, unless they have the
+            # same start or stop)
 
-                new_intervals.append(this_interval.merge(next_interval))
+            max_stops = np.maximum.accumulate(stops)
 
-            else:
-
-                # otherwise just append this interval
-
-                new_intervals.append(this_interval)
-
-                # now if there is only one interval left
-                # it should not overlap with any other interval
-                # and the loop will stop
-                # otherwise, we continue
-
-        # if there was only one interval
-        # or a leftover from the merge
-        # we append it
-        if sorted_intervals:
-
-            assert (
-                len(sorted_intervals) == 1
-            ), "there should only be one interval left over, this is a bug"  # pragma: no cover
-
-            # we want to make sure that the last new interval did not
-            # overlap with the final interval
-            if new_intervals:
-
-                if new_intervals[-1].overlaps_with(sorted_intervals[0]):
-
-                    new_intervals[-1] = new_intervals[-1].merge(sorted_intervals[0])
+            new_group = (
+                (starts[1:] >= max_stops[:-1])
+                & (starts[1:] != starts[:-1])
+                & (stops[1:] != max_stops[:-1])
+            )
 
-                else:
+            first = np.concatenate(([0], np.flatnonzero(new_group) + 1))
 
-                    new_intervals.append(sorted_intervals[0])
+            new_starts = starts[first]
+            new_stops = np.maximum.reduceat(stops, first)
 
-            else:
+        else:
 
-                new_intervals.append(sorted_intervals[0])
+            new_starts, new_stops = starts, stops
 
         if in_place:
 
-            self.__init__(new_intervals)
+            self._set_starts_and_stops(new_starts, new_stops)
 
         else:
 
-            return self.new(new_intervals)
+            return self._from_arrays(new_starts, new_stops)
 
     def extend(self, list_of_intervals):
 
-        self._intervals.extend(list_of_intervals)
+        other = (
+            list_of_intervals
+            if isinstance(list_of_intervals, IntervalSet)
+            else IntervalSet(list_of_intervals)
+        )
+
+        self._set_starts_and_stops(
+            np.concatenate((self._starts, other._starts)),
+            np.concatenate((self._stops, other._stops)),
+        )
 
     def __len__(self):
 
-        return len(self._intervals)
+        return self._starts.shape[0]
 
     def __iter__(self):
 
-        for interval in self._intervals:
-            yield interval
+        for start, stop in zip(self._starts.tolist(), self._stops.tolist()):
+            yield self.new_interval(start, stop)
 
     def __getitem__(self, item):
 
-        return self._intervals[item]
+        if isinstance(item, slice):
+
+            # like for a list, return a list of intervals
+
+            return [
+                self.new_interval(start, stop)
+                for start, stop in zip(
+                    self._starts[item].tolist(), self._stops[item].tolist()
+                )
+            ]
+
+        return self.new_interval(float(self._starts[item]), float(self._stops[item]))
 
     def __eq__(self, other):
 
-        for interval_this, interval_other in zip(self.argsort(), other.argsort()):
+        if len(self) != len(other):
 
-            if not self[interval_this] == other[interval_other]:
-                return False
+            return False
 
-        return True
+        this_order = self._argsort()
+        other_order = other._argsort()
+
+        return np.array_equal(
+            self._starts[this_order], other._starts[other_order]
+        ) and np.array_equal(self._stops[this_order], other._stops[other_order])
 
     def pop(self, index):
 
-        return self._intervals.pop(index)
+        interval = self[index]
+
+        self._set_starts_and_stops(
+            np.delete(self._starts, index), np.delete(self._stops, index)
+        )
+
+        return interval
 
     def sort(self):
         """
@@ -389,7 +431,15 @@ class IntervalSet(object):
 
         else:
 
-            return self.new(np.atleast_1d(itemgetter(*self.argsort())(self._intervals)))
+            order = self._argsort()
+
+            return self._from_arrays(self._starts[order], self._stops[order])
+
+    def _argsort(self):
+
+        # a stable sort, so that intervals with the same start keep their order
+
+        return np.argsort(self._starts, kind="mergesort")
 
     def argsort(self):
         """
@@ -398,10 +448,7 @@ class IntervalSet(object):
         :return:
         """
 
-        # Gather all tstarts
-        tstarts = [x.start for x in self._intervals]
-
-        return [x[0] for x in sorted(enumerate(tstarts), key=itemgetter(1))]
+        return self._argsort().tolist()
 
     def is_contiguous(self, relative_tolerance=1e-5):
         """
@@ -411,10 +458,7 @@ class IntervalSet(object):
         :return: True or False
         """
 
-        starts = [attrgetter("start")(x) for x in self._intervals]
-        stops = [attrgetter("stop")(x) for x in self._intervals]
-
-        return np.allclose(starts[1:], stops[:-1], rtol=relative_tolerance)
+        return np.allclose(self._starts[1:], self._stops[:-1], rtol=relative_tolerance)
 
     @property
     def is_sorted(self):
@@ -423,7 +467,7 @@ class IntervalSet(object):
         :return: True or False
         """
 
-        return np.all(self.argsort() == np.arange(len(self)))
+        return bool(np.all(self._starts[1:] >= self._starts[:-1]))
 
     def containing_bin(self, value):
         """
@@ -451,12 +495,11 @@ class IntervalSet(object):
         :return:
         """
 
-        # loop only once because every call unpacks the array
         # we need to round for the comparison because we may have read from
         # strings which are rounded to six decimals
 
-        starts = np.round(self.starts, decimals=6)
-        stops = np.round(self.stops, decimals=6)
+        starts = np.round(self._starts, decimals=6)
+        stops = np.round(self._stops, decimals=6)
 
         start = np.round(start, decimals=6)
         stop = np.round(stop, decimals=6)
@@ -480,37 +523,37 @@ class IntervalSet(object):
 
         else:
 
-            return self.new(np.asarray(self._intervals)[condition])
+            return self._from_arrays(self._starts[condition], self._stops[condition])
 
     @property
     def starts(self):
         """
         Return the starts fo the set
 
-        :return: list of start times
+        :return: array of start times
         """
 
-        return [interval.start for interval in self._intervals]
+        return self._starts
 
     @property
     def stops(self):
         """
         Return the stops of the set
 
-        :return:
+        :return: array of stop times
         """
 
-        return [interval.stop for interval in self._intervals]
+        return self._stops
 
     @property
     def mid_points(self):
 
-        return np.array([interval.mid_point for interval in self._intervals])
+        return (self._starts + self._stops) / 2.0
 
     @property
     def widths(self):
 
-        return np.array([interval._get_width() for interval in self._intervals])
+        return self._stops - self._starts
 
     @property
     def absolute_start(self):
@@ -519,7 +562,7 @@ class IntervalSet(object):
         :return:
         """
 
-        return min(self.starts)
+        return float(np.min(self._starts))
 
     @property
     def absolute_stop(self):
@@ -528,7 +571,7 @@ class IntervalSet(object):
         :return:
         """
 
-        return max(self.stops)
+        return float(np.max(self._stops))
 
     @property
     def edges(self):
@@ -539,16 +582,7 @@ class IntervalSet(object):
 
         if self.is_contiguous() and self.is_sorted:
 
-            edges = [
-                interval.start
-                for interval in itemgetter(*self.argsort())(self._intervals)
-            ]
-            edges.append(
-                [
-                    interval.stop
-                    for interval in itemgetter(*self.argsort())(self._intervals)
-                ][-1]
-            )
+            edges = np.append(self._starts, self._stops[-1])
 
         else:
 
@@ -566,7 +600,12 @@ class IntervalSet(object):
         :return:
         """
 
-        return ",".join([interval.to_string() for interval in self._intervals])
+        return ",".join(
+            [
+                "%f-%f" % (start, stop)
+                for start, stop in zip(self._starts.tolist(), self._stops.tolist())
+            ]
+        )
 
     @property
     def bin_stack(self):
@@ -578,4 +617,4 @@ class IntervalSet(object):
         :return:
         """
 
-        return np.vstack((self.starts, self.stops)).T
+        return np.vstack((self._starts, self._stops)).T
@@ -0,0 +1,167 @@
+from builtins import range
+import numpy as np
+
+# Number of samples used to check the results of the broadcast evaluation against a direct evaluation
+
+_N_CHECKS = 3
+
+
+def _merge(*dictionaries):
+
+    merged = {}
+
+    for dictionary in dictionaries:
+
+        merged.update(dictionary)
+
+    return merged
+
+
+def propagate_on_samples(function, samples, *args, **kwargs):
+    """
+    Evaluate the function for all the samples of (some of) its arguments and for all the values of the
+    independent variables, in as few calls as possible.
+
+    The function is first called once with the samples on the first axis, broadcast against the independent
+    variables, which is possible if the function is written in terms of numpy operations. If that fails, or if
+    the results are not consistent with a direct evaluation on a few samples, the function is called once per
+    sample on all the values of the independent variables, and as a last resort once per sample and per value.
+
+    :param function: the function to evaluate
+    :param samples: a dictionary argument name -> array of samples (all with the same length)
+    :param args: the independent variables, as scalars or arrays which can be broadcast together
+    :param kwargs: other keyword arguments for the function, passed as they are
+    :return: an array with shape (n_samples,) + the shape of the independent variables
+    """
+
+    names = list(samples.keys())
+    sample_arrays = [np.asarray(samples[name]) for name in names]
+
+    points_shape = (
+        np.broadcast(*[np.asarray(arg) for arg in args]).shape if len(args) > 0 else ()
+    )
+
+    if len(names) == 0:
+
+        # Nothing to propagate
+
+        result = np.asarray(function(*args, **kwargs), dtype=float)
+
+        return np.broadcast_to(result, points_shape)[np.newaxis, ...].copy()
+
+    n_samples = sample_arrays[0].shape[0]
+
+    def sample_arguments(i):
+
+        return dict((name, array[i]) for name, array in zip(names, sample_arrays))
+
+    def evaluate_one_sample(i):
+
+        result = function(*args, **_merge(sample_arguments(i), kwargs))
+
+        return np.broadcast_to(np.asarray(result, dtype=float), points_shape)
+
+    # First attempt: everything in one call
+
+    result = _evaluate_broadcasting(
+        function, names, sample_arrays, args, kwargs, points_shape
+    )
+
+    if result is not None:
+
+        try:
+
+            checked_samples = np.linspace(0, n_samples - 1, _N_CHECKS).astype(int)
+
+            for i in np.unique(checked_samples):
+
+                if not np.allclose(
+                    result[i], evaluate_one_sample(i), equal_nan=True
+                ):
+
+                    result = None
+
+                    break
+
+        except Exception:
+
+            result = None
+
+    if result is not None:
+
+        return result
+
+    # Second attempt: one call per sample
+
+    results = np.zeros((n_samples,) + points_shape)
+
+    try:
+
+        results[0] = evaluate_one_sample(0)
+
+    except Exception:
+
+        # The function only accepts scalars
+
+        return _evaluate_point_by_point(
+            function, sample_arguments, n_samples, args, kwargs, points_shape
+        )
+
+    for i in range(1, n_samples):
+
+        results[i] = evaluate_one_sample(i)
+
+    return results
+
+
+def _evaluate_broadcasting(
+    function, names, sample_arrays, args, kwargs, points_shape
+):
+
+    n_samples = sample_arrays[0].shape[0]
+
+    # Samples on the first axis, independent variables on the others
+
+    broadcast_samples = dict(
+        (name, array.reshape((n_samples,) + (1,) * len(points_shape)))
+        for name, array in zip(names, sample_arrays)
+    )
+
+    broadcast_args = [np.asarray(arg)[np.newaxis, ...] for arg in args]
+
+    try:
+
+        result = np.asarray(
+            function(*broadcast_args, **_merge(broadcast_samples, kwargs)), dtype=float
+        )
+
+    except Exception:
+
+        return None
+
+    if result.shape != (n_samples,) + points_shape:
+
+        return None
+
+    return result
+
+
+def _evaluate_point_by_point(
+    function, sample_arguments, n_samples, args, kwargs, points_shape
+):
+
+    args = np.broadcast_arrays(*[np.asarray(arg) for arg in args])
+
+    results = np.zeros((n_samples,) + points_shape)
+
+    for i in range(n_samples):
+
+        this_sample = _merge(sample_arguments(i), kwargs)
+
+        for idx in np.ndindex(*points_shape):
+
+            results[(i,) + idx] = function(
+                *[arg[idx] for arg in args], **this_sample
+            )
+
+    return results
@@ -40,7 +40,7 @@ class ChannelSet(IntervalSet):
     @property
     def channels_widths(self):
 
-        return np.array([channel.channel_width for channel in self._intervals])
+        return self.widths
 
 
 class Quality(object):
@@ -802,10 +802,21 @@ class BinnedSpectrumWithDispersion(BinnedSpectrum):
 
         pha_information = time_series.get_information_dict(use_poly, extract)
 
-        is_poisson = True
+        return cls.from_information_dict(
+            pha_information, response=response, is_poisson=not use_poly
+        )
 
-        if use_poly:
-            is_poisson = False
+    @classmethod
+    def from_information_dict(cls, pha_information, response=None, is_poisson=True):
+        """
+        Build a spectrum from an information dict of a time series (see
+        TimeSeries.get_information_dict and TimeSeries.get_information_dicts)
+
+        :param pha_information: the information dict
+        :param response: the response of the spectrum
+        :param is_poisson: whether the counts are Poisson distributed
+        :return:
+        """
 
         return cls(
             instrument=pha_information["instrument"],
@@ -21,7 +21,62 @@ from threeML.utils.statistics.likelihood_functions import (
 _known_noise_models = {}
 
 
+def _poisson_log_like_derivative(observed_counts, background_counts, model_counts):
+    """
+    Derivative of the Poisson log-likelihood with respect to the expected source counts in each channel,
+    i.e., o / (m + b) - 1 (or -1 where there are no observed counts).
+
+    For the profile likelihoods the background b is the profiled one. Since it maximizes the likelihood for the
+    current model, its dependence on the model does not contribute to the derivative (envelope theorem).
+
+    :param observed_counts: observed counts
+    :param background_counts: (expected or profiled) background counts in the source region
+    :param model_counts: expected source counts
+    :return: array with the derivative for each channel
+    """
+
+    derivative = -np.ones_like(model_counts)
+
+    idx = observed_counts > 0
+
+    derivative[idx] += observed_counts[idx] / (
+        model_counts[idx] + background_counts[idx]
+    )
+
+    return derivative
+
+
+def _get_random_state(random_generator):
+    """
+    Returns the numpy Generator to use for the randomization, or the numpy.random module (which has the same
+    interface for what we need) if none is given
+
+    :param random_generator: a numpy Generator or None
+    """
+
+    return np.random if random_generator is None else random_generator
+
+
+def _get_shape(n_simulations, expected_counts):
+    """
+    Returns the shape of the randomized counts: the same as the expected counts, or (n_simulations, n_channels)
+    when drawing n_simulations spectra at once
+
+    :param n_simulations: number of simulations drawn at once, or None for a single one
+    :param expected_counts: the expected counts
+    """
+
+    shape = np.shape(expected_counts)
+
+    return shape if n_simulations is None else (n_simulations,) + shape
+
+
 class BinnedStatistic(object):
+
+    # whether get_current_derivative is implemented by the statistic
+
+    has_derivative = False
+
     def __init__(self, spectrum_plugin):
         """
         
@@ -36,13 +91,44 @@ class BinnedStatistic(object):
     def get_current_value(self):
         RuntimeError("must be implemented in subclass")
 
-    def get_randomized_source_counts(self, source_model_counts):
+    def get_current_pointwise_value(self):
+        """
+        Return the log-likelihood of each of the current channels (their sum is the value returned by
+        get_current_value) and the background model, or None if the statistic cannot be split into channels
+
+        :return: (array, background model or None) or None
+        """
+        return None
+
+    def get_current_derivative(self):
+        """
+        Return the derivative of the log-likelihood with respect to the expected source counts in each of the
+        current channels, or None if it is not available for this statistic
+
+        :return: array or None
+        """
+        return None
+
+    def get_randomized_source_counts(
+        self, source_model_counts, n_simulations=None, random_generator=None
+    ):
+        """
+        Randomize the expected source counts according to the noise model
+
+        :param source_model_counts: the expected source counts in each channel
+        :param n_simulations: if provided, return an array (n_simulations, n_channels) with as many independent
+        randomizations
+        :param random_generator: (optional) the numpy Generator to use
+        :return: the randomized counts
+        """
         return None
 
     def get_randomized_source_errors(self):
         return None
 
-    def get_randomized_background_counts(self):
+    def get_randomized_background_counts(
+        self, n_simulations=None, random_generator=None
+    ):
         return None
 
     def get_randomized_background_errors(self):
@@ -50,7 +136,15 @@ class BinnedStatistic(object):
 
 
 class GaussianObservedStatistic(BinnedStatistic):
+
+    has_derivative = True
+
     def get_current_value(self):
+        chi2_, _ = self.get_current_pointwise_value()
+
+        return np.sum(chi2_), None
+
+    def get_current_pointwise_value(self):
         chi2_ = half_chi2(
             self._spectrum_plugin.current_observed_counts,
             self._spectrum_plugin.current_observed_count_errors,
@@ -59,16 +153,27 @@ class GaussianObservedStatistic(BinnedStatistic):
 
         assert np.all(np.isfinite(chi2_))
 
-        return np.sum(chi2_) * (-1), None
+        return chi2_ * (-1), None
 
-    def get_randomized_source_counts(self, source_model_counts):
+    def get_current_derivative(self):
+        return (
+            self._spectrum_plugin.current_observed_counts
+            - self._spectrum_plugin.get_model()
+        ) / self._spectrum_plugin.current_observed_count_errors ** 2
+
+    def get_randomized_source_counts(
+        self, source_model_counts, n_simulations=None, random_generator=None
+    ):
         idx = self._spectrum_plugin.observed_count_errors > 0
 
-        randomized_source_counts = np.zeros_like(source_model_counts)
+        randomized_source_counts = np.zeros(
+            _get_shape(n_simulations, source_model_counts)
+        )
 
-        randomized_source_counts[idx] = np.random.normal(
+        randomized_source_counts[..., idx] = _get_random_state(random_generator).normal(
             loc=source_model_counts[idx],
             scale=self._spectrum_plugin.observed_count_errors[idx],
+            size=_get_shape(n_simulations, source_model_counts[idx]),
         )
 
         # Issue a warning if the generated background is less than zero, and fix it by placing it at zero
@@ -92,7 +197,15 @@ class GaussianObservedStatistic(BinnedStatistic):
 
 
 class PoissonObservedIdealBackgroundStatistic(BinnedStatistic):
+
+    has_derivative = True
+
     def get_current_value(self):
+        loglike, _ = self.get_current_pointwise_value()
+
+        return np.sum(loglike), None
+
+    def get_current_pointwise_value(self):
         # In this likelihood the background becomes part of the model, which means that
         # the uncertainty in the background is completely neglected
 
@@ -104,25 +217,45 @@ class PoissonObservedIdealBackgroundStatistic(BinnedStatistic):
             model_counts,
         )
 
-        return np.sum(loglike), None
+        return loglike, None
+
+    def get_current_derivative(self):
+        return _poisson_log_like_derivative(
+            self._spectrum_plugin.current_observed_counts,
+            self._spectrum_plugin.current_scaled_background_counts,
+            self._spectrum_plugin.get_model(),
+        )
 
-    def get_randomized_source_counts(self, source_model_counts):
+    def get_randomized_source_counts(
+        self, source_model_counts, n_simulations=None, random_generator=None
+    ):
         # Randomize expectations for the source
         # we want the unscalled background counts
 
         # TODO: check with giacomo if this is correct!
 
-        randomized_source_counts = np.random.poisson(
-            source_model_counts + self._spectrum_plugin._background_counts
+        expected_counts = source_model_counts + self._spectrum_plugin._background_counts
+
+        randomized_source_counts = _get_random_state(random_generator).poisson(
+            expected_counts, size=_get_shape(n_simulations, expected_counts)
         )
 
         return randomized_source_counts
 
-    def get_randomized_background_counts(self):
+    def get_randomized_background_counts(
+        self, n_simulations=None, random_generator=None
+    ):
         # No randomization for the background in this case
 
         randomized_background_counts = self._spectrum_plugin._background_counts
 
+        if n_simulations is not None:
+
+            randomized_background_counts = np.broadcast_to(
+                randomized_background_counts,
+                _get_shape(n_simulations, randomized_background_counts),
+            )
+
         return randomized_background_counts
 
 
@@ -152,14 +285,21 @@ class PoissonObservedModeledBackgroundStatistic(BinnedStatistic):
 
         return total_log_like, None
 
-    def get_randomized_source_counts(self, source_model_counts):
+    def get_randomized_source_counts(
+        self, source_model_counts, n_simulations=None, random_generator=None
+    ):
+
+        assert (
+            n_simulations is None
+        ), "Simulations with a modeled background can only be generated one at a time"
+
         # first generate random source counts from the plugin
 
-        self._synthetic_background_plugin = (
-            self._spectrum_plugin.background_plugin.get_simulated_dataset()
+        self._synthetic_background_plugin = self._spectrum_plugin.background_plugin.get_simulated_dataset(
+            random_generator=random_generator
         )
 
-        randomized_source_counts = np.random.poisson(
+        randomized_source_counts = _get_random_state(random_generator).poisson(
             source_model_counts + self._synthetic_background_plugin.observed_counts
         )
 
@@ -181,7 +321,15 @@ class PoissonObservedModeledBackgroundStatistic(BinnedStatistic):
 
 
 class PoissonObservedNoBackgroundStatistic(BinnedStatistic):
+
+    has_derivative = True
+
     def get_current_value(self):
+        loglike, _ = self.get_current_pointwise_value()
+
+        return np.sum(loglike), None
+
+    def get_current_pointwise_value(self):
         # In this likelihood the background becomes part of the model, which means that
         # the uncertainty in the background is completely neglected
 
@@ -195,33 +343,63 @@ class PoissonObservedNoBackgroundStatistic(BinnedStatistic):
             model_counts,
         )
 
-        return np.sum(loglike), None
+        return loglike, None
 
-    def get_randomized_source_counts(self, source_model_counts):
+    def get_current_derivative(self):
+        model_counts = self._spectrum_plugin.get_model()
+
+        return _poisson_log_like_derivative(
+            self._spectrum_plugin.current_observed_counts,
+            np.zeros_like(model_counts),
+            model_counts,
+        )
+
+    def get_randomized_source_counts(
+        self, source_model_counts, n_simulations=None, random_generator=None
+    ):
         # Randomize expectations for the source
         # we want the unscalled background counts
 
-        randomized_source_counts = np.random.poisson(source_model_counts)
+        randomized_source_counts = _get_random_state(random_generator).poisson(
+            source_model_counts, size=_get_shape(n_simulations, source_model_counts)
+        )
 
         return randomized_source_counts
 
 
 class PoissonObservedPoissonBackgroundStatistic(BinnedStatistic):
+
+    has_derivative = True
+
     def get_current_value(self):
+        loglike, bkg_model = self.get_current_pointwise_value()
+
+        return np.sum(loglike), bkg_model
+
+    def get_current_pointwise_value(self):
         # Scale factor between source and background spectrum
 
         model_counts = self._spectrum_plugin.get_model()
 
-        loglike, bkg_model = poisson_observed_poisson_background(
+        return poisson_observed_poisson_background(
             self._spectrum_plugin.current_observed_counts,
             self._spectrum_plugin.current_background_counts,
             self._spectrum_plugin.scale_factor,
             model_counts,
         )
 
-        return np.sum(loglike), bkg_model
+    def get_current_derivative(self):
+        _, background_model_counts = self.get_current_value()
+
+        return _poisson_log_like_derivative(
+            self._spectrum_plugin.current_observed_counts,
+            background_model_counts,
+            self._spectrum_plugin.get_model(),
+        )
 
-    def get_randomized_source_counts(self, source_model_counts):
+    def get_randomized_source_counts(
+        self, source_model_counts, n_simulations=None, random_generator=None
+    ):
         # Since we use a profile likelihood, the background model is conditional on the source model, so let's
         # get it from the likelihood function
 
@@ -231,36 +409,60 @@ class PoissonObservedPoissonBackgroundStatistic(BinnedStatistic):
 
         # Randomize expectations for the source
 
-        randomized_source_counts = np.random.poisson(
-            source_model_counts + background_model_counts
+        expected_counts = source_model_counts + background_model_counts
+
+        randomized_source_counts = _get_random_state(random_generator).poisson(
+            expected_counts, size=_get_shape(n_simulations, expected_counts)
         )
 
         return randomized_source_counts
 
-    def get_randomized_background_counts(self):
+    def get_randomized_background_counts(
+        self, n_simulations=None, random_generator=None
+    ):
         # Randomize expectations for the background
 
         _, background_model_counts = self.get_current_value()
 
-        randomized_background_counts = np.random.poisson(background_model_counts)
+        randomized_background_counts = _get_random_state(random_generator).poisson(
+            background_model_counts,
+            size=_get_shape(n_simulations, background_model_counts),
+        )
 
         return randomized_background_counts
 
 
 class PoissonObservedGaussianBackgroundStatistic(BinnedStatistic):
+
+    has_derivative = True
+
     def get_current_value(self):
+        loglike, bkg_model = self.get_current_pointwise_value()
+
+        return np.sum(loglike), bkg_model
+
+    def get_current_pointwise_value(self):
         expected_model_counts = self._spectrum_plugin.get_model()
 
-        loglike, bkg_model = poisson_observed_gaussian_background(
+        return poisson_observed_gaussian_background(
             self._spectrum_plugin.current_observed_counts,
             self._spectrum_plugin.current_background_counts,
             self._spectrum_plugin.current_background_count_errors,
             expected_model_counts,
         )
 
-        return np.sum(loglike), bkg_model
+    def get_current_derivative(self):
+        _, background_model_counts = self.get_current_value()
+
+        return _poisson_log_like_derivative(
+            self._spectrum_plugin.current_observed_counts,
+            background_model_counts,
+            self._spectrum_plugin.get_model(),
+        )
 
-    def get_randomized_source_counts(self, source_model_counts):
+    def get_randomized_source_counts(
+        self, source_model_counts, n_simulations=None, random_generator=None
+    ):
         # Since we use a profile likelihood, the background model is conditional on the source model, so let's
         # get it from the likelihood function
 
@@ -270,13 +472,17 @@ class PoissonObservedGaussianBackgroundStatistic(BinnedStatistic):
 
         # Randomize expectations for the source
 
-        randomized_source_counts = np.random.poisson(
-            source_model_counts + background_model_counts
+        expected_counts = source_model_counts + background_model_counts
+
+        randomized_source_counts = _get_random_state(random_generator).poisson(
+            expected_counts, size=_get_shape(n_simulations, expected_counts)
         )
 
         return randomized_source_counts
 
-    def get_randomized_background_counts(self):
+    def get_randomized_background_counts(
+        self, n_simulations=None, random_generator=None
+    ):
         # Now randomize the expectations.
 
         _, background_model_counts = self.get_current_value()
@@ -286,11 +492,16 @@ class PoissonObservedGaussianBackgroundStatistic(BinnedStatistic):
         # it is only allowed when the background counts are zero as well.
         idx = self._spectrum_plugin.background_count_errors > 0
 
-        randomized_background_counts = np.zeros_like(background_model_counts)
+        randomized_background_counts = np.zeros(
+            _get_shape(n_simulations, background_model_counts)
+        )
 
-        randomized_background_counts[idx] = np.random.normal(
+        randomized_background_counts[..., idx] = _get_random_state(
+            random_generator
+        ).normal(
             loc=background_model_counts[idx],
             scale=self._spectrum_plugin.background_count_errors[idx],
+            size=_get_shape(n_simulations, background_model_counts[idx]),
         )
 
         # Issue a warning if the generated background is less than zero, and fix it by placing it at zero
@@ -158,15 +158,16 @@ def poisson_observed_poisson_background(
 
     # TODO: check this with simulations
 
-    # Just a name change to make writing formulas a little easier
-
-    alpha = exposure_ratio
     # b = background_counts
     # o = observed_counts
     # M = expected_model_counts
 
     n = len(expected_model_counts)
 
+    # The exposure ratio can be a single number or one number per channel
+
+    alphas = exposure_ratio * np.ones(n)
+
     loglike = np.empty(n, dtype=np.float64)
     B_mle = np.empty(n, dtype=np.float64)
 
@@ -175,6 +176,10 @@ def poisson_observed_poisson_background(
 
     for idx in range(n):
 
+        # Just a name change to make writing formulas a little easier
+
+        alpha = alphas[idx]
+
         o_plus_b = observed_counts[idx] + background_counts[idx]
 
         sqr = np.sqrt(
@@ -204,7 +209,7 @@ def poisson_observed_poisson_background(
             - logfactorial(observed_counts[idx])
         )
 
-    return loglike, B_mle * alpha
+    return loglike, B_mle * alphas
 
 
 @njit(fastmath=True)
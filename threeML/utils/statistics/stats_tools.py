@@ -9,6 +9,7 @@ from math import sqrt
 import numpy as np
 import pandas as pd
 import scipy.interpolate
+import scipy.special
 import scipy.stats
 import warnings
 from scipy.special import erfinv
@@ -52,8 +53,43 @@ def bic(log_like, n_parameters, n_data_points):
     return val
 
 
-def waic(bayesian_trace):
-    raise NotImplementedError("Coming soon to a theater near you.")
+def waic(log_likes):
+    """
+    The Watanabe-Akaike information criterion (Gelman, Hwang & Vehtari 2014):
+
+    lppd = sum_i log( 1/S sum_s p(y_i|parameters_s) )
+
+    p_WAIC = sum_i var_s( log p(y_i|parameters_s) )
+
+    WAIC = -2 * (lppd - p_WAIC)
+
+    :param log_likes: an array (n_samples, n_points) with the log-likelihood of each data point (e.g. each channel of
+    a spectrum) for each sample of the posterior
+    :return waic, effective number of free parameters:
+    """
+
+    log_likes = np.asarray(log_likes, dtype=float)
+
+    if log_likes.ndim == 1:
+
+        log_likes = log_likes[:, np.newaxis]
+
+    n_samples = log_likes.shape[0]
+
+    lppd = np.sum(scipy.special.logsumexp(log_likes, axis=0) - np.log(n_samples))
+
+    pwaic = np.sum(np.var(log_likes, axis=0, ddof=1))
+
+    elpd_waic = lppd - pwaic
+
+    if not np.isfinite(pwaic) or not np.isfinite(elpd_waic):
+
+        elpd_waic = 0
+        pwaic = 0
+
+        warnings.warn("WAIC was NAN. Recording zero, but you should examine your fit.")
+
+    return -2 * elpd_waic, pwaic
 
 
 def dic(bayes_analysis):
@@ -95,6 +131,58 @@ def dic(bayes_analysis):
     return -2 * elpd_dic, pdic
 
 
+def integrated_autocorrelation_time(chain, c=5.0):
+    """
+    Estimate the integrated autocorrelation time of the chains of an ensemble sampler, for each parameter.
+
+    The autocorrelation function of each walker is computed with a FFT and averaged over the walkers, then it is
+    summed up to the smallest window M such that M >= c * tau (Sokal 1989, Goodman & Weare 2010)
+
+    :param chain: an array of samples with shape (n_steps, n_walkers, n_parameters), or (n_steps, n_parameters)
+    for a single chain
+    :param c: the constant defining the size of the summation window
+    :return: an array with the autocorrelation time for each parameter (in steps)
+    """
+
+    chain = np.asarray(chain, dtype=float)
+
+    if chain.ndim == 2:
+
+        chain = chain[:, np.newaxis, :]
+
+    n_steps = chain.shape[0]
+
+    # zero-pad to a power of 2 to avoid the periodic boundary of the FFT
+
+    n_fft = 2 ** int(np.ceil(np.log2(2 * n_steps)))
+
+    deviations = chain - np.mean(chain, axis=0)
+
+    transform = np.fft.rfft(deviations, n=n_fft, axis=0)
+
+    acf = np.fft.irfft(transform * np.conjugate(transform), n=n_fft, axis=0)[:n_steps]
+
+    # normalize each walker, ignoring the ones which never moved
+
+    variance = acf[0]
+
+    acf = acf / np.where(variance > 0, variance, 1.0)
+
+    acf = np.mean(acf, axis=1)
+
+    taus = 2.0 * np.cumsum(acf, axis=0) - 1.0
+
+    # first window satisfying M >= c * tau (or the whole chain if none does)
+
+    in_window = np.arange(n_steps)[:, np.newaxis] < c * taus
+
+    window = np.where(
+        np.all(in_window, axis=0), n_steps - 1, np.argmin(in_window, axis=0)
+    )
+
+    return taus[window, np.arange(taus.shape[1])]
+
+
 def sqrt_sum_of_squares(arg):
     """
     :param arg: and array of number to be squared and summed
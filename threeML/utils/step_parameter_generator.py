@@ -1,13 +1,213 @@
 __author__ = "grburgess <J. Michael Burgess>"
 
+import collections
+import re
+
+from astromodels import Function1D, FunctionMeta, Parameter
+from astromodels.core.tree import Node
+from astromodels.functions import function as astromodels_function
 from astromodels.functions.functions import DiracDelta, StepFunctionUpper
+import astropy.units as u
 import numpy as np
 
 
+# the classes of the piecewise constant functions, by number of intervals. They are created
+# the first time they are needed
+
+_piecewise_constant_classes = {}
+
+_piecewise_constant_name = re.compile(r"^PiecewiseConstant([1-9][0-9]*)$")
+
+
+class _KnownFunctions(dict):
+    """
+    The dictionary of the functions known to astromodels, which creates the class of a piecewise
+    constant function when it is looked up by its name (PiecewiseConstant<n_intervals>), as
+    astromodels does when it reads back a model saved in another session
+    """
+
+    def __contains__(self, function_name):
+
+        return dict.__contains__(self, function_name) or self._add_piecewise_constant(
+            function_name
+        )
+
+    def __missing__(self, function_name):
+
+        if self._add_piecewise_constant(function_name):
+
+            return dict.__getitem__(self, function_name)
+
+        raise KeyError(function_name)
+
+    def _add_piecewise_constant(self, function_name):
+
+        match = _piecewise_constant_name.match(str(function_name))
+
+        if match is None:
+
+            return False
+
+        # this registers the class in this dictionary
+
+        piecewise_constant_function(int(match.group(1)))
+
+        return dict.__contains__(self, function_name)
+
+
+if not isinstance(astromodels_function._known_functions, _KnownFunctions):
+
+    astromodels_function._known_functions = _KnownFunctions(
+        astromodels_function._known_functions
+    )
+
+
+def _piecewise_constant_init(self):
+
+    parameters = collections.OrderedDict()
+
+    for i in range(1, self.n_intervals + 1):
+
+        parameters["lower_bound_%d" % i] = Parameter(
+            "lower_bound_%d" % i,
+            i - 1.0,
+            desc="Lower bound of interval %d" % i,
+            free=False,
+        )
+
+        parameters["upper_bound_%d" % i] = Parameter(
+            "upper_bound_%d" % i,
+            float(i),
+            desc="Upper bound of interval %d" % i,
+            free=False,
+        )
+
+        parameters["value_%d" % i] = Parameter(
+            "value_%d" % i, 1.0, desc="Value in interval %d" % i
+        )
+
+    Function1D.__init__(
+        self, type(self)._name, type(self)._function_definition, parameters
+    )
+
+
+def _piecewise_constant_set_units(self, x_unit, y_unit):
+
+    for i in range(1, self.n_intervals + 1):
+
+        # the bounds have the same unit as x, the values the same unit as y
+
+        self.parameters["lower_bound_%d" % i].unit = x_unit
+        self.parameters["upper_bound_%d" % i].unit = x_unit
+        self.parameters["value_%d" % i].unit = y_unit
+
+
+def _piecewise_constant_evaluate(self, x, *parameters):
+
+    # the parameters come as lower_bound_1, upper_bound_1, value_1, lower_bound_2, ...
+    # (as quantities when called with units)
+
+    to_array = u.Quantity if isinstance(x, u.Quantity) else np.array
+
+    lower_bounds = to_array(parameters[0::3])
+    upper_bounds = to_array(parameters[1::3])
+    values = to_array(parameters[2::3])
+
+    # the interval with the last lower bound not larger than x, which contains x
+    # unless x falls beyond its upper bound (or before the first interval)
+
+    idx = np.searchsorted(lower_bounds, x, side="right") - 1
+
+    inside = (idx >= 0) & (x < upper_bounds[idx])
+
+    # the multiplication keeps the units right
+
+    return values[idx] * inside
+
+
+def _piecewise_constant_reduce(self):
+
+    # the class is created by a function, so it is looked up from the number of intervals
+    # instead of by name during unpickling
+
+    _, _, state = Node.__reduce__(self)
+
+    return _new_piecewise_constant, (self.n_intervals,), state
+
+
+def _new_piecewise_constant(n_intervals):
+
+    cls = piecewise_constant_function(n_intervals)
+
+    return cls.__new__(cls)
+
+
+def _make_piecewise_constant_class(n_intervals):
+
+    doc = (
+        r"""
+        description :
+
+            A function which is constant on each of %d intervals, lower_bound_i - upper_bound_i,
+            and 0 outside of them. The upper bounds are open. The intervals must be sorted and
+            must not overlap.
+
+        latex : n.a.
+
+        parameters : {}
+
+        """
+        % n_intervals
+    )
+
+    return FunctionMeta(
+        "PiecewiseConstant%d" % n_intervals,
+        (Function1D,),
+        {
+            "__doc__": doc,
+            "__module__": __name__,
+            "n_intervals": n_intervals,
+            "_custom_init_": _piecewise_constant_init,
+            "_set_units": _piecewise_constant_set_units,
+            "evaluate": _piecewise_constant_evaluate,
+            "__reduce__": _piecewise_constant_reduce,
+        },
+    )
+
+
+def piecewise_constant_function(n_intervals):
+    """
+    Get the astromodels function class which is constant on each of n_intervals
+    intervals, and 0 outside of them. Its parameters are lower_bound_i, upper_bound_i
+    (fixed) and value_i for i = 1, ..., n_intervals. It gives the same values as a sum
+    of n_intervals StepFunctionUpper, but it is evaluated with a single search over
+    the bounds.
+
+    The class (named PiecewiseConstant<n_intervals>) is created the first time it is
+    needed. astromodels creates it as well when it reads back a model using it, as long
+    as threeML has been imported.
+
+    :param n_intervals: the number of intervals
+    :return: the function class
+    """
+
+    n_intervals = int(n_intervals)
+
+    assert n_intervals > 0, "The number of intervals must be positive"
+
+    if n_intervals not in _piecewise_constant_classes:
+
+        _piecewise_constant_classes[n_intervals] = _make_piecewise_constant_class(
+            n_intervals
+        )
+
+    return _piecewise_constant_classes[n_intervals]
+
+
 def step_generator(intervals, parameter):
     """
 
-    Generates sum of step or dirac delta functions for the given intervals
+    Generates a piecewise constant function or a sum of dirac delta functions for the given intervals
     and parameter. This can be used to link time-independent parameters
     of a model to time.
 
@@ -15,8 +215,10 @@ def step_generator(intervals, parameter):
     the TOA of photons, then a sum of dirac deltas is returned with their centers
     at the times provided
 
-    If the intervals are 2-D (start, stop), sum of step functions is created with
-    the bounds at the start and stop times of the interval.
+    If the intervals are 2-D (start, stop), a piecewise constant function (see
+    piecewise_constant_function) is created with the bounds at the start and stop times
+    of the intervals. If the intervals are not sorted or overlap, a sum of step functions
+    with the same parameters is created instead.
 
     The parameter is used to set the bounds and initial value, min, max of the
     non-zero points of the functions
@@ -55,15 +257,20 @@ def step_generator(intervals, parameter):
 
     if is_2d:
 
-        # For 2D intervals, we grab a step function
+        # For 2D intervals, we grab a single piecewise constant function, which needs
+        # sorted intervals which do not overlap. Otherwise, we build a sum of step functions
 
-        func = StepFunctionUpper()
+        if np.all(intervals[1:, 0] >= intervals[:-1, 1]):
 
-        # Sum up the functions
+            func = piecewise_constant_function(n_intervals)()
 
-        for i in range(n_intervals - 1):
+        else:
+
+            func = StepFunctionUpper()
+
+            for i in range(n_intervals - 1):
 
-            func += StepFunctionUpper()
+                func += StepFunctionUpper()
 
         # Go through and iterate over intervals to set the parameter values
 
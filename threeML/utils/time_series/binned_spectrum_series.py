@@ -188,6 +188,19 @@ class BinnedSpectrumSeries(TimeSeries):
 
         return total_counts
 
+    def count_per_channel_over_intervals(self, starts, stops):
+        """
+        return the counts per channel in each of a set of intervals
+
+        :param starts: array of interval starts
+        :param stops: array of interval stops
+        :return: matrix of counts with shape (number of intervals, number of channels)
+        """
+
+        bins = self._select_bins_over_intervals(starts, stops)
+
+        return bins.dot(self._binned_spectrum_set.counts_per_bin)
+
     def _select_bins(self, start, stop):
         """
         return an index of the selected bins
@@ -200,6 +213,20 @@ class BinnedSpectrumSeries(TimeSeries):
             start, stop, as_mask=True
         )
 
+    def _select_bins_over_intervals(self, starts, stops):
+        """
+        return the selected bins of each of a set of intervals
+
+        :param starts: array of interval starts
+        :param stops: array of interval stops
+        :return: matrix with shape (number of intervals, number of bins), 1 for the selected bins
+        """
+
+        return np.array(
+            [self._select_bins(start, stop) for start, stop in zip(starts, stops)],
+            dtype=float,
+        ).reshape(len(starts), -1)
+
     def _adjust_to_true_intervals(self, time_intervals):
         """
 
@@ -434,3 +461,16 @@ class BinnedSpectrumSeries(TimeSeries):
         mask = self._select_bins(start, stop)
 
         return self._binned_spectrum_set.exposure_per_bin[mask].sum()
+
+    def exposure_over_intervals(self, starts, stops):
+        """
+        calculate the exposure of each of a set of intervals
+
+        :param starts: array of interval starts
+        :param stops: array of interval stops
+        :return: array of exposures
+        """
+
+        bins = self._select_bins_over_intervals(starts, stops)
+
+        return bins.dot(self._binned_spectrum_set.exposure_per_bin)
@@ -381,6 +381,71 @@ class EventList(TimeSeries):
 
         return np.logical_and(start <= self._arrival_times, self._arrival_times <= stop)
 
+    def _select_events_over_intervals(self, starts, stops):
+        """
+        find the events of each of a set of intervals with a single sort of the events
+
+        :param starts: array of interval starts
+        :param stops: array of interval stops
+        :return: (order, lo, hi), where the events of the interval i are order[lo[i]:hi[i]]
+        """
+
+        arrival_times = self._arrival_times
+
+        if np.all(arrival_times[1:] >= arrival_times[:-1]):
+
+            order = np.arange(arrival_times.shape[0])
+
+        else:
+
+            order = np.argsort(arrival_times, kind="mergesort")
+
+        sorted_times = arrival_times[order]
+
+        lo = np.searchsorted(sorted_times, starts, side="left")
+        hi = np.maximum(np.searchsorted(sorted_times, stops, side="right"), lo)
+
+        return order, lo, hi
+
+    def count_per_channel_over_intervals(self, starts, stops):
+        """
+        return the counts per channel in each of a set of intervals, in one pass over the events
+
+        :param starts: array of interval starts
+        :param stops: array of interval stops
+        :return: matrix of counts with shape (number of intervals, number of channels)
+        """
+
+        order, lo, hi = self._select_events_over_intervals(starts, stops)
+
+        n_channels = self._n_channels
+
+        channels = self._measurement[order].astype(np.int64) - self._first_channel
+
+        # the events of an interval are a slice of the sorted events, so their counts
+        # are the difference of the cumulative counts per channel at the two ends of the
+        # slice. We only need the cumulative counts at the ends of the slices, so we
+        # histogram the events in the segments between them
+
+        ends, end_idx = np.unique(np.concatenate((lo, hi)), return_inverse=True)
+
+        segments = np.searchsorted(ends, np.arange(channels.shape[0]), side="right")
+
+        valid = np.logical_and(channels >= 0, channels < n_channels)
+
+        histogram = np.bincount(
+            segments[valid] * n_channels + channels[valid],
+            minlength=(ends.shape[0] + 1) * n_channels,
+        ).reshape(-1, n_channels)
+
+        cumulative = np.cumsum(histogram, axis=0)
+
+        n_intervals = lo.shape[0]
+
+        counts = cumulative[end_idx[n_intervals:]] - cumulative[end_idx[:n_intervals]]
+
+        return counts.astype(float)
+
     def _fit_polynomials(self):
         """
 
@@ -722,6 +787,30 @@ class EventListWithDeadTime(EventList):
 
         return (stop - start) - interval_deadtime
 
+    def exposure_over_intervals(self, starts, stops):
+        """
+        calculate the exposure of each of a set of intervals, in one pass over the events
+
+        :param starts: array of interval starts
+        :param stops: array of interval stops
+        :return: array of exposures
+        """
+
+        starts = np.asarray(starts, dtype=float)
+        stops = np.asarray(stops, dtype=float)
+
+        if self._dead_time is None:
+
+            return stops - starts
+
+        order, lo, hi = self._select_events_over_intervals(starts, stops)
+
+        cumulative_dead_time = np.concatenate(
+            ([0.0], np.cumsum(self._dead_time[order]))
+        )
+
+        return (stops - starts) - (cumulative_dead_time[hi] - cumulative_dead_time[lo])
+
     def set_active_time_intervals(self, *args):
         """Set the time interval(s) to be used during the analysis.
 
@@ -909,6 +998,40 @@ class EventListWithDeadTimeFraction(EventList):
 
         return interval - interval_deadtime
 
+    def exposure_over_intervals(self, starts, stops):
+        """
+        calculate the exposure of each of a set of intervals, in one pass over the events
+
+        :param starts: array of interval starts
+        :param stops: array of interval stops
+        :return: array of exposures
+        """
+
+        starts = np.asarray(starts, dtype=float)
+        stops = np.asarray(stops, dtype=float)
+
+        if self._dead_time_fraction is None:
+
+            return stops - starts
+
+        order, lo, hi = self._select_events_over_intervals(starts, stops)
+
+        cumulative_fraction = np.concatenate(
+            ([0.0], np.cumsum(self._dead_time_fraction[order]))
+        )
+
+        # as for a single interval, the mean fraction is undefined without events
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+
+            mean_fraction = old_div(
+                cumulative_fraction[hi] - cumulative_fraction[lo], hi - lo
+            )
+
+        interval = stops - starts
+
+        return interval - mean_fraction * interval
+
     def set_active_time_intervals(self, *args):
         """Set the time interval(s) to be used during the analysis.
 
@@ -184,9 +184,21 @@ class Polynomial(object):
         :param xmax: stop of the interval
         :return: interval error
         """
-        c = self._eval_basis(xmax) - self._eval_basis(xmin)
-        tmp = c.dot(self._cov_matrix)
-        err2 = tmp.dot(c)
+
+        if np.ndim(xmin) == 0 and np.ndim(xmax) == 0:
+
+            c = self._eval_basis(xmax) - self._eval_basis(xmin)
+            tmp = c.dot(self._cov_matrix)
+            err2 = tmp.dot(c)
+
+        else:
+
+            # one interval for each element of the (broadcasted) bounds
+
+            c = self._eval_basis(np.asarray(xmax)[..., np.newaxis]) - self._eval_basis(
+                np.asarray(xmin)[..., np.newaxis]
+            )
+            err2 = np.sum(c.dot(self._cov_matrix) * c, axis=-1)
 
         return np.sqrt(err2)
 
@@ -327,6 +327,69 @@ class TimeSeries(object):
 
         raise RuntimeError("Must be implemented in sub class")
 
+    def count_per_channel_over_intervals(self, starts, stops):
+        """
+        return the counts per channel in each of a set of intervals. Sub classes can
+        override this with a computation made in one pass over the data
+
+        :param starts: array of interval starts
+        :param stops: array of interval stops
+        :return: matrix of counts with shape (number of intervals, number of channels)
+        """
+
+        counts = np.zeros((len(starts), self._n_channels))
+
+        for i, (start, stop) in enumerate(zip(starts, stops)):
+
+            counts[i] = self.count_per_channel_over_interval(start, stop)
+
+        return counts
+
+    def exposure_over_intervals(self, starts, stops):
+        """
+        calculate the exposure of each of a set of intervals. Sub classes can
+        override this with a computation made in one pass over the data
+
+        :param starts: array of interval starts
+        :param stops: array of interval stops
+        :return: array of exposures
+        """
+
+        return np.array(
+            [
+                self.exposure_over_interval(start, stop)
+                for start, stop in zip(starts, stops)
+            ],
+            dtype=float,
+        )
+
+    def poly_count_per_channel_over_intervals(self, starts, stops):
+        """
+        integrate the background polynomials of each channel over a set of intervals
+
+        :param starts: array of interval starts
+        :param stops: array of interval stops
+        :return: (counts, errors), matrices with shape (number of intervals, number of channels)
+        """
+
+        if not self._poly_fit_exists:
+            raise RuntimeError("A polynomial fit to the channels does not exist!")
+
+        starts = np.asarray(starts, dtype=float)
+        stops = np.asarray(stops, dtype=float)
+
+        poly_counts = np.zeros((starts.shape[0], self._n_channels))
+        poly_count_err = np.zeros((starts.shape[0], self._n_channels))
+
+        for chan in range(self._n_channels):
+
+            poly_counts[:, chan] = self._polynomials[chan].integral(starts, stops)
+            poly_count_err[:, chan] = self._polynomials[chan].integral_error(
+                starts, stops
+            )
+
+        return poly_counts, poly_count_err
+
     def set_polynomial_fit_interval(self, *time_intervals, **options):
         """Set the time interval to fit the background.
         Multiple intervals can be input as separate arguments
@@ -494,6 +557,97 @@ class TimeSeries(object):
 
             exposure = self._exposure
 
+        return self._build_information_dict(
+            self._time_intervals.absolute_start_time,
+            self._time_intervals.absolute_stop_time,
+            counts,
+            counts_err,
+            rates,
+            rate_err,
+            exposure,
+        )
+
+    def get_information_dicts(self, starts, stops, use_poly=False, extract=False):
+        """
+        Return the information dicts (see get_information_dict) that each of a set of
+        intervals would give if it were the only selected interval. The counts, the
+        background counts and the exposures of all the intervals are computed at once,
+        and the current time selection is not changed
+
+        :param starts: array of interval starts
+        :param stops: array of interval stops
+        :param use_poly: (bool) choose to build from the polynomial fits
+        :param extract: (bool) use the counts of the polynomial fit intervals
+        :return: list of dicts
+        """
+
+        starts = np.asarray(starts, dtype=float)
+        stops = np.asarray(stops, dtype=float)
+
+        if extract:
+
+            all_counts = np.tile(self._poly_selected_counts, (starts.shape[0], 1))
+            all_counts_err = None
+            all_exposures = np.full(starts.shape[0], self._poly_exposure)
+
+            all_rates = old_div(all_counts, self._poly_exposure)
+
+        elif use_poly:
+
+            all_counts, all_counts_err = self.poly_count_per_channel_over_intervals(
+                starts, stops
+            )
+            all_exposures = self.exposure_over_intervals(starts, stops)
+
+            # removing negative counts
+
+            idx = all_counts < 0.0
+
+            all_counts[idx] = 0.0
+            all_counts_err[idx] = 0.0
+
+            all_rates = old_div(all_counts, all_exposures[:, np.newaxis])
+
+        else:
+
+            all_counts = self.count_per_channel_over_intervals(starts, stops)
+            all_counts_err = None
+            all_exposures = self.exposure_over_intervals(starts, stops)
+
+            all_rates = old_div(all_counts, all_exposures[:, np.newaxis])
+
+        container_dicts = []
+
+        for i in range(starts.shape[0]):
+
+            if all_counts_err is None:
+
+                counts_err = None
+                rate_err = None
+
+            else:
+
+                counts_err = all_counts_err[i]
+                rate_err = old_div(counts_err, all_exposures[i])
+
+            container_dicts.append(
+                self._build_information_dict(
+                    starts[i],
+                    stops[i],
+                    all_counts[i],
+                    counts_err,
+                    all_rates[i],
+                    rate_err,
+                    all_exposures[i],
+                )
+            )
+
+        return container_dicts
+
+    def _build_information_dict(
+        self, tstart, tstop, counts, counts_err, rates, rate_err, exposure
+    ):
+
         if self._native_quality is None:
 
             quality = np.zeros_like(counts, dtype=int)
@@ -506,11 +660,8 @@ class TimeSeries(object):
 
         container_dict["instrument"] = self._instrument
         container_dict["telescope"] = self._mission
-        container_dict["tstart"] = self._time_intervals.absolute_start_time
-        container_dict["telapse"] = (
-            self._time_intervals.absolute_stop_time
-            - self._time_intervals.absolute_start_time
-        )
+        container_dict["tstart"] = tstart
+        container_dict["telapse"] = tstop - tstart
         container_dict["channel"] = np.arange(self._n_channels) + self._first_channel
         container_dict["counts"] = counts
         container_dict["counts error"] = counts_err